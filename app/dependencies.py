@@ -1,21 +1,44 @@
-from fastapi import Depends
-from sqlalchemy.orm import Session
-from app.config import get_db,SessionLocal
+from fastapi import Request
+from app import config
+from app.services.status_ingest import StatusIngestor
 from app.services.whatsapp_service import WhatsAppService
 
-def get_db_session():
+async def get_async_db_session():
     """
-    Dependency function to get database session
+    Dependency function to get an async database session
     """
-    # return get_db
-    db = SessionLocal()
-    try:
+    async with config.AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
-def get_whatsapp_service():
+def get_async_session_factory():
     """
-    Dependency function to get WhatsApp service instance
+    Dependency function to get the async session factory, for handlers whose
+    database work outlives the request (e.g. streaming responses)
     """
-    return  WhatsAppService()
\ No newline at end of file
+    return config.AsyncSessionLocal
+
+def get_whatsapp_service(request: Request):
+    """
+    Dependency function to get the app-scoped WhatsApp service instance
+    """
+    service = getattr(request.app.state, "whatsapp_service", None)
+    if service is None:
+        # Built on first use so configuration errors surface per request; the
+        # client comes from lifespan, or is created lazily by the service
+        service = WhatsAppService(
+            client=getattr(request.app.state, "http_client", None),
+            log_writer=getattr(request.app.state, "log_writer", None)
+        )
+        request.app.state.whatsapp_service = service
+    return service
+
+def get_status_ingestor(request: Request):
+    """
+    Dependency function to get the app-scoped webhook status buffer
+    """
+    ingestor = getattr(request.app.state, "status_ingestor", None)
+    if ingestor is None:
+        ingestor = StatusIngestor(config.AsyncSessionLocal, log_writer=getattr(request.app.state, "log_writer", None))
+        ingestor.start()
+        request.app.state.status_ingestor = ingestor
+    return ingestor
\ No newline at end of file
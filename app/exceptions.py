@@ -1,14 +1,50 @@
 from fastapi import HTTPException, status
+from typing import Optional
 
 class WhatsAppAPIException(HTTPException):
     """
     Exception raised when there is an error with the WhatsApp API
     """
-    def __init__(self, detail: str = "WhatsApp API error occurred"):
+    def __init__(
+        self,
+        detail: str = "WhatsApp API error occurred",
+        log_message: Optional[str] = None,
+        api_status_code: Optional[int] = None,
+        retry_after: Optional[float] = None,
+        retryable: bool = False
+    ):
         super().__init__(
             status_code=status.HTTP_502_BAD_GATEWAY,
             detail=detail
         )
+        # Error text recorded on the message log, the Graph API status, the
+        # Retry-After hint and whether the failure is transient
+        self.log_message = log_message or detail
+        self.api_status_code = api_status_code
+        self.retry_after = retry_after
+        self.retryable = retryable
+
+class CircuitOpenException(WhatsAppAPIException):
+    """
+    Exception raised without calling the Graph API because the circuit of
+    every usable sender is open
+    """
+    def __init__(self, retry_after: float, detail: Optional[str] = None):
+        super().__init__(
+            detail=detail or f"WhatsApp API unavailable, not retrying for {retry_after:.0f}s",
+            retry_after=retry_after,
+            retryable=True
+        )
+        self.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+
+class SuppressedRecipientException(WhatsAppAPIException):
+    """
+    Exception raised without calling the Graph API because the recipient is
+    on the suppression list
+    """
+    def __init__(self, phone_number: str):
+        super().__init__(detail=f"Recipient {phone_number} is suppressed")
+        self.status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
 
 class InvalidPhoneNumberException(HTTPException):
     """
@@ -20,6 +56,60 @@ class InvalidPhoneNumberException(HTTPException):
             detail=detail
         )
 
+class DuplicateRequestException(HTTPException):
+    """
+    Exception raised when a request with the same idempotency key is still
+    being processed
+    """
+    def __init__(self, detail: str = "A request with this idempotency key is in progress", log_id: Optional[int] = None):
+        super().__init__(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=detail
+        )
+        self.log_id = log_id
+
+class MessageNotFoundException(HTTPException):
+    """
+    Exception raised when no message log matches a lookup
+    """
+    def __init__(self, detail: str = "Message not found"):
+        super().__init__(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=detail
+        )
+
+class InvalidCursorException(HTTPException):
+    """
+    Exception raised when a pagination cursor cannot be decoded
+    """
+    def __init__(self, detail: str = "Invalid pagination cursor"):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=detail
+        )
+
+class InvalidMessageException(HTTPException):
+    """
+    Exception raised when a message specification is incomplete or refers to
+    an unknown template
+    """
+    def __init__(self, detail: str = "Invalid message"):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=detail
+        )
+
+class WebhookVerificationException(HTTPException):
+    """
+    Exception raised when a webhook request cannot be verified as coming
+    from the Graph API
+    """
+    def __init__(self, detail: str = "Webhook verification failed"):
+        super().__init__(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=detail
+        )
+
 class ConfigurationException(HTTPException):
     """
     Exception raised when there's a configuration error
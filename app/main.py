@@ -1,12 +1,25 @@
 from fastapi import FastAPI, Request, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
 from app.routes import whatsapp
-from app.models import Base
-from app.config import engine, settings
-from app.exceptions import WhatsAppAPIException, InvalidPhoneNumberException, ConfigurationException, DatabaseException
+from app import config
+from app.config import settings
+from app.exceptions import WhatsAppAPIException, InvalidPhoneNumberException, ConfigurationException, DatabaseException, DuplicateRequestException, InvalidCursorException, InvalidMessageException, WebhookVerificationException, MessageNotFoundException
+from app.metrics import metrics
+from app.migrations import init_schema
+from app.services.http_client import create_http_client, get_pool_stats
+from app.services.log_maintenance import LogMaintenance
+from app.services.log_writer import LogWriter
+from app.services.message_queue import MessageWorkerPool
+from app.services.message_scheduler import MessageScheduler
+from app.services.message_stats import message_stats
+from app.services.status_ingest import StatusIngestor
+from app.services.suppression import SuppressionRefresher, suppression_list
+from app.services.whatsapp_service import WhatsAppService
+from app.utils import phone_number_cache
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -14,11 +27,72 @@ async def lifespan(app: FastAPI):
     Lifespan context manager for FastAPI
     Sets up database tables and performs startup operations
     """
-    # Create database tables
-    Base.metadata.create_all(bind=engine)
-    print("Database tables created or verified")
+    # Create database tables, unless app.server already did so before
+    # starting the workers
+    if settings.schema_init:
+        async with config.async_engine.begin() as conn:
+            await conn.run_sync(init_schema)
+        print("Database tables created or verified")
+
+    # One pooled HTTP client shared by every request for the app's lifetime
+    app.state.http_client = create_http_client()
+
+    # Loads and then incrementally syncs the in-memory suppression list
+    suppression_refresher = SuppressionRefresher(suppression_list, config.AsyncSessionLocal)
+    suppression_refresher.start()
+
+    # Hourly rollup, partition creation and retention; also seeds and
+    # periodically corrects the in-process stats counters from the rollup
+    log_maintenance = LogMaintenance(config.async_engine, stats=message_stats)
+    log_maintenance.start()
+
+    # Write-behind buffer for the logs of synchronous sends
+    app.state.log_writer = None
+    if settings.log_write_behind:
+        if LogWriter.supports(config.async_engine.dialect.name):
+            app.state.log_writer = LogWriter(config.AsyncSessionLocal)
+            app.state.log_writer.start()
+        else:
+            print("Write-behind message logs need Postgres; writing logs synchronously")
+
+    # Buffered writer for webhook status events, flushing the log writer
+    # first so statuses of write-behind sends find their rows
+    app.state.status_ingestor = StatusIngestor(config.AsyncSessionLocal, log_writer=app.state.log_writer)
+    app.state.status_ingestor.start()
+
+    # Background workers delivering enqueued messages
+    worker_pool = None
+    scheduler = None
+    if settings.queue_enabled:
+        try:
+            app.state.whatsapp_service = WhatsAppService(
+                client=app.state.http_client, log_writer=app.state.log_writer
+            )
+            worker_pool = MessageWorkerPool(app.state.whatsapp_service, config.AsyncSessionLocal)
+            worker_pool.start()
+            print(f"Started {worker_pool.workers} message queue workers")
+            # Hands scheduled messages to the workers when they fall due
+            if settings.scheduler_enabled:
+                scheduler = MessageScheduler(app.state.whatsapp_service, config.AsyncSessionLocal)
+                scheduler.start()
+        except ConfigurationException as e:
+            print(f"Message queue workers not started: {e.detail}")
     yield
     # Shutdown operations can go here
+    if scheduler is not None:
+        await scheduler.stop()
+    if worker_pool is not None:
+        await worker_pool.stop()
+    # Flush buffered log writes while the database is still reachable
+    if app.state.log_writer is not None:
+        await app.state.log_writer.stop()
+    await app.state.status_ingestor.stop()
+    await log_maintenance.stop()
+    await suppression_refresher.stop()
+    app.state.status_ingestor = None
+    app.state.whatsapp_service = None
+    await app.state.http_client.aclose()
+    await config.async_engine.dispose()
     print("Application shutting down")
 
 # Initialize FastAPI app with lifespan
@@ -26,7 +100,8 @@ app = FastAPI(
     title=settings.app_name,
     description="FastAPI application to send messages via WhatsApp Business API",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -56,6 +131,41 @@ async def invalid_phone_exception_handler(request: Request, exc: InvalidPhoneNum
         content={"success": False, "message": exc.detail}
     )
 
+@app.exception_handler(DuplicateRequestException)
+async def duplicate_request_exception_handler(request: Request, exc: DuplicateRequestException):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"success": False, "message": exc.detail, "log_id": exc.log_id}
+    )
+
+@app.exception_handler(MessageNotFoundException)
+async def message_not_found_exception_handler(request: Request, exc: MessageNotFoundException):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"success": False, "message": exc.detail}
+    )
+
+@app.exception_handler(InvalidCursorException)
+async def invalid_cursor_exception_handler(request: Request, exc: InvalidCursorException):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"success": False, "message": exc.detail}
+    )
+
+@app.exception_handler(InvalidMessageException)
+async def invalid_message_exception_handler(request: Request, exc: InvalidMessageException):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"success": False, "message": exc.detail}
+    )
+
+@app.exception_handler(WebhookVerificationException)
+async def webhook_verification_exception_handler(request: Request, exc: WebhookVerificationException):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"success": False, "message": exc.detail}
+    )
+
 @app.exception_handler(ConfigurationException)
 async def config_exception_handler(request: Request, exc: ConfigurationException):
     return JSONResponse(
@@ -82,6 +192,18 @@ async def root():
         "logs_endpoint": "/api/v1/whatsapp/logs"
     }
 
+@app.get("/metrics", tags=["Root"], include_in_schema=False)
+async def prometheus_metrics():
+    """
+    Prometheus metrics: send stage latencies, error counts, pool, queue and phone number cache gauges
+    """
+    metrics.sample_pools(
+        get_pool_stats(getattr(app.state, "http_client", None)), config.async_engine.sync_engine.pool
+    )
+    metrics.sample_queue(message_stats.counts)
+    metrics.sample_phone_cache(phone_number_cache.stats())
+    return Response(metrics.render(), media_type=CONTENT_TYPE_LATEST)
+
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run("app.main:app", host="localhost", port=8000, reload=settings.debug)
\ No newline at end of file
+    from app.server import main
+    main()
\ No newline at end of file
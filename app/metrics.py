@@ -0,0 +1,91 @@
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from sqlalchemy.pool import Pool
+from typing import Any, Dict, Optional
+
+# Stages of a send: rate_limit and api_call are timed per Graph API attempt,
+# validate per single-number validation, insert and commit per synchronous send
+SEND_STAGES = ("validate", "insert", "rate_limit", "api_call", "commit")
+
+# Errors counted on the send path; a transport error is counted as
+# RequestError only, although it surfaces as a WhatsAppAPIException
+ERROR_TYPES = ("WhatsAppAPIException", "InvalidPhoneNumberException", "RequestError")
+
+# Sub-millisecond buckets for validation and commits up to slow Graph API calls
+STAGE_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Metrics:
+    """
+    Prometheus metrics of the send path, kept in their own registry
+
+    Labelled children are resolved once, so timing a stage or counting an
+    error costs a dict lookup and a locked add. Pool, queue and phone number
+    cache gauges are sampled when the metrics are rendered rather than on
+    every change.
+    """
+    def __init__(self, registry: Optional[CollectorRegistry] = None):
+        self.registry = registry or CollectorRegistry()
+        stage_seconds = Histogram(
+            "whatsapp_send_stage_seconds", "Time spent in each stage of sending a message",
+            ["stage"], buckets=STAGE_BUCKETS, registry=self.registry
+        )
+        errors = Counter(
+            "whatsapp_send_errors",
+            "Send path errors: Graph API rejections, invalid phone numbers and transport errors",
+            ["error"], registry=self.registry
+        )
+        self.stages = {stage: stage_seconds.labels(stage) for stage in SEND_STAGES}
+        self.errors = {error: errors.labels(error) for error in ERROR_TYPES}
+        self.http_pool = Gauge(
+            "whatsapp_http_pool_connections", "Graph API client connections by state",
+            ["state"], registry=self.registry
+        )
+        self.db_pool = Gauge(
+            "whatsapp_db_pool_connections", "Async database pool connections by state",
+            ["state"], registry=self.registry
+        )
+        self.queue_depth = Gauge(
+            "whatsapp_queue_depth", "Queued messages by status, from the in-process stats counters",
+            ["status"], registry=self.registry
+        )
+        self.phone_cache = Gauge(
+            "whatsapp_phone_cache", "Phone number validation cache: lookups by result and entries held",
+            ["value"], registry=self.registry
+        )
+
+    def stage(self, name: str):
+        """
+        Context manager timing one stage into its histogram
+        """
+        return self.stages[name].time()
+
+    def count_error(self, error: str) -> None:
+        self.errors[error].inc()
+
+    def sample_pools(self, http_pool_stats: Dict[str, Any], db_pool: Optional[Pool] = None) -> None:
+        """
+        Set the pool gauges from ``get_pool_stats`` and a SQLAlchemy pool
+        """
+        for state in ("active", "idle"):
+            self.http_pool.labels(state).set(http_pool_stats[state])
+        # Only sized pools (not SQLite's) report their checkouts
+        if db_pool is not None and hasattr(db_pool, "checkedout"):
+            self.db_pool.labels("checked_out").set(db_pool.checkedout())
+            self.db_pool.labels("checked_in").set(db_pool.checkedin())
+            self.db_pool.labels("overflow").set(max(0, db_pool.overflow()))
+
+    def sample_queue(self, counts: Dict[str, int]) -> None:
+        for status in ("pending", "sending"):
+            self.queue_depth.labels(status).set(counts.get(status, 0))
+
+    def sample_phone_cache(self, cache_stats: Dict[str, Any]) -> None:
+        """
+        Set the phone number cache gauges from ``PhoneNumberCache.stats``
+        """
+        for value in ("hits", "misses", "size"):
+            self.phone_cache.labels(value).set(cache_stats[value])
+
+    def render(self) -> bytes:
+        return generate_latest(self.registry)
+
+# Metrics of this process, rendered by the /metrics endpoint
+metrics = Metrics()
@@ -0,0 +1,107 @@
+from sqlalchemy import bindparam, inspect, select, text, update
+from sqlalchemy.engine import Connection
+
+from app.models import Base, MessageLog
+from app.utils import json_string_to_dict
+
+# Indexes superseded by wider ones in the current models
+OBSOLETE_INDEXES = {
+    "message_logs": ["idx_message_logs_status_created", "ix_message_logs_phone_number"],
+}
+
+def backfill_wa_message_ids(connection: Connection, batch_size: int = 1000) -> int:
+    """
+    Copy the Graph message ID out of ``response_data`` into ``wa_message_id``
+
+    Walks the table in primary key order one batch at a time, so memory use
+    stays flat and each batch is a single executemany. Each batch is committed
+    on its own, so locks are held per batch rather than for the whole table;
+    pass a connection that is not inside ``engine.begin()``. Run by
+    ``python -m app.migrations`` only, never on app startup.
+
+    Returns:
+        Number of rows backfilled
+    """
+    table = MessageLog.__table__
+    last_id = 0
+    backfilled = 0
+    while True:
+        rows = connection.execute(
+            select(table.c.id, table.c.response_data)
+            .where(table.c.id > last_id, table.c.wa_message_id.is_(None), table.c.response_data.is_not(None))
+            .order_by(table.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return backfilled
+        last_id = rows[-1].id
+
+        params = []
+        for row in rows:
+            messages = json_string_to_dict(row.response_data).get("messages") or [{}]
+            if messages[0].get("id"):
+                params.append({"b_id": row.id, "b_wamid": messages[0]["id"]})
+        if params:
+            connection.execute(
+                update(table).where(table.c.id == bindparam("b_id")).values(wa_message_id=bindparam("b_wamid")),
+                params
+            )
+            backfilled += len(params)
+        connection.commit()
+
+def upgrade_schema(connection: Connection) -> None:
+    """
+    Bring tables created by an older release up to the current models
+
+    ``create_all`` only creates missing tables, so columns and indexes added
+    to existing models are applied here. New columns must be nullable or have
+    a server default, which keeps every step additive and idempotent. Data
+    backfills are left to ``python -m app.migrations``, so startup only runs DDL.
+    """
+    inspector = inspect(connection)
+    existing_tables = set(inspector.get_table_names())
+
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=connection.dialect)}"
+            if column.server_default is not None:
+                default = column.server_default.arg
+                ddl += f" DEFAULT {getattr(default, 'text', None) or repr(str(default))}"
+                if not column.nullable:
+                    ddl += " NOT NULL"
+            connection.execute(text(ddl))
+
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index_name in OBSOLETE_INDEXES.get(table.name, []):
+            if index_name in existing_indexes:
+                connection.execute(text(f"DROP INDEX {index_name}"))
+
+def init_schema(connection: Connection) -> None:
+    """
+    Create missing tables (partitioned where configured) and upgrade existing ones
+    """
+    from app.partitioning import create_partitioned_logs
+
+    create_partitioned_logs(connection)
+    Base.metadata.create_all(connection)
+    upgrade_schema(connection)
+
+if __name__ == "__main__":
+    from app.config import engine
+
+    with engine.begin() as connection:
+        init_schema(connection)
+    # Outside the schema transaction, committed batch by batch; idempotent, so
+    # it also completes a backfill interrupted in an earlier run
+    with engine.connect() as connection:
+        backfilled = backfill_wa_message_ids(connection)
+    print(f"Database schema is up to date ({backfilled} message IDs backfilled)")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Index
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, Text, Index, true
 from sqlalchemy.sql import func
 from app.config import Base
 
@@ -9,18 +9,58 @@ class MessageLog(Base):
     __tablename__ = "message_logs"
     
     id = Column(Integer, primary_key=True, index=True)
-    phone_number = Column(String(20), index=True, nullable=False)
+    phone_number = Column(String(20), nullable=False)
     message = Column(Text, nullable=False)
-    status = Column(String(20), nullable=False)  # sent, failed, pending
+    payload = Column(Text, nullable=True)  # Compiled message content as JSON, NULL for the default text
+    status = Column(String(20), nullable=False)  # sent, failed, pending, sending, scheduled
     response_data = Column(Text, nullable=True)  # Store API response as JSON string
+    wa_message_id = Column(String(128), nullable=True, unique=True, index=True)  # Graph message ID (wamid)
     error_message = Column(Text, nullable=True)
+    locked_until = Column(DateTime, nullable=True)  # Send lease while status is sending
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    next_attempt_at = Column(DateTime, nullable=True)  # Earliest retry of a pending message
+    scheduled_at = Column(DateTime, nullable=True)  # When a scheduled message is handed to the queue (UTC)
+    idempotency_key = Column(String(255), nullable=True, unique=True, index=True)
     created_at = Column(DateTime, default=func.now(), nullable=False)
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), nullable=False)
     
-    # Create indexes for common queries
+    # Create indexes for common queries; every one ends in (created_at, id)
+    # so filtered log pages and the queue claim can walk them as keysets
     __table_args__ = (
-        Index('idx_message_logs_status_created', status, created_at),
+        Index('idx_message_logs_created_id', created_at, id),
+        Index('idx_message_logs_status_created_id', status, created_at, id),
+        Index('idx_message_logs_phone_created_id', phone_number, created_at, id),
+        # The scheduler reads the next due messages off this index
+        Index('idx_message_logs_status_scheduled_id', status, scheduled_at, id),
     )
 
     def __repr__(self):
-        return f"<MessageLog(id={self.id}, phone_number={self.phone_number}, status={self.status})>"
\ No newline at end of file
+        return f"<MessageLog(id={self.id}, phone_number={self.phone_number}, status={self.status})>"
+
+class SuppressedNumber(Base):
+    """
+    Recipient that must not be messaged: opted out, or learned to be undeliverable
+    """
+    __tablename__ = "suppressed_numbers"
+    
+    phone_number = Column(String(20), primary_key=True)  # E.164
+    reason = Column(String(20), nullable=False)  # opt_out, invalid
+    active = Column(Boolean, nullable=False, default=True, server_default=true())  # False once lifted
+    created_at = Column(DateTime, default=func.now(), nullable=False)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<SuppressedNumber(phone_number={self.phone_number}, reason={self.reason}, active={self.active})>"
+
+class MessageStatsHourly(Base):
+    """
+    Hourly message counts by status, maintained from ``message_logs`` for dashboards
+    """
+    __tablename__ = "message_stats_hourly"
+    
+    hour = Column(DateTime, primary_key=True)  # Start of the hour the messages were created in
+    status = Column(String(20), primary_key=True)
+    count = Column(Integer, nullable=False)
+
+    def __repr__(self):
+        return f"<MessageStatsHourly(hour={self.hour}, status={self.status}, count={self.count})>"
\ No newline at end of file
@@ -0,0 +1,245 @@
+import re
+from datetime import datetime, timedelta
+from sqlalchemy import Index, MetaData, PrimaryKeyConstraint, Table, delete, func, insert, inspect, select, text
+from sqlalchemy.engine import Connection
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.models import MessageLog, MessageStatsHourly
+
+PARTITION_NAME = re.compile(r"^message_logs_p(\d{4})_(\d{2})(?:_(\d{2}))?$")
+
+# Serializes maintenance across processes sharing a database
+MAINTENANCE_LOCK_ID = 0x6D73676C  # "msgl"
+
+# Partitioned unique indexes must include created_at, so idempotency keys and
+# wamids are made unique on their own through this unpartitioned table, kept
+# in step by a trigger in the same transaction as the row write. A duplicate
+# raises a unique violation (IntegrityError) exactly like the plain indexes.
+KEY_TABLE = "message_log_keys"
+KEY_GUARD_DDL = (
+    f"""
+    CREATE TABLE IF NOT EXISTS {KEY_TABLE} (
+        kind VARCHAR(16) NOT NULL,
+        key VARCHAR(255) NOT NULL,
+        created_at TIMESTAMP NOT NULL,
+        PRIMARY KEY (kind, key)
+    )
+    """,
+    f"CREATE INDEX IF NOT EXISTS idx_{KEY_TABLE}_created_at ON {KEY_TABLE} (created_at)",
+    f"""
+    CREATE OR REPLACE FUNCTION {KEY_TABLE}_guard() RETURNS trigger AS $$
+    BEGIN
+        IF NEW.idempotency_key IS NOT NULL
+           AND (TG_OP = 'INSERT' OR NEW.idempotency_key IS DISTINCT FROM OLD.idempotency_key) THEN
+            INSERT INTO {KEY_TABLE} (kind, key, created_at) VALUES ('idempotency', NEW.idempotency_key, NEW.created_at);
+        END IF;
+        IF NEW.wa_message_id IS NOT NULL
+           AND (TG_OP = 'INSERT' OR NEW.wa_message_id IS DISTINCT FROM OLD.wa_message_id) THEN
+            INSERT INTO {KEY_TABLE} (kind, key, created_at) VALUES ('wamid', NEW.wa_message_id, NEW.created_at);
+        END IF;
+        IF TG_OP = 'UPDATE' AND OLD.idempotency_key IS DISTINCT FROM NEW.idempotency_key THEN
+            DELETE FROM {KEY_TABLE} WHERE kind = 'idempotency' AND key = OLD.idempotency_key;
+        END IF;
+        IF TG_OP = 'UPDATE' AND OLD.wa_message_id IS DISTINCT FROM NEW.wa_message_id THEN
+            DELETE FROM {KEY_TABLE} WHERE kind = 'wamid' AND key = OLD.wa_message_id;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    f"DROP TRIGGER IF EXISTS {KEY_TABLE}_guard ON {MessageLog.__tablename__}",
+    f"""
+    CREATE TRIGGER {KEY_TABLE}_guard
+    AFTER INSERT OR UPDATE OF idempotency_key, wa_message_id ON {MessageLog.__tablename__}
+    FOR EACH ROW EXECUTE FUNCTION {KEY_TABLE}_guard()
+    """,
+)
+
+def partition_bounds(day: datetime, interval: str) -> Tuple[str, datetime, datetime]:
+    """
+    Name and [start, end) range of the partition holding ``day``
+    """
+    if interval == "daily":
+        start = datetime(day.year, day.month, day.day)
+        return f"message_logs_p{start:%Y_%m_%d}", start, start + timedelta(days=1)
+    start = datetime(day.year, day.month, 1)
+    end = datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return f"message_logs_p{start:%Y_%m}", start, end
+
+def create_partitioned_logs(connection: Connection) -> bool:
+    """
+    Create ``message_logs`` as a table range-partitioned by ``created_at``
+
+    Only applies on Postgres with ``log_partitioning`` set and before the
+    table exists; an existing table has to be migrated by hand. Postgres
+    requires the partition key in every unique index, so the primary key
+    becomes (id, created_at) and the idempotency key and wamid indexes
+    include ``created_at``. Two concurrent requests with the same key get
+    different ``created_at`` values, so those indexes alone would let both
+    rows in; global uniqueness is enforced by the ``message_log_keys`` guard
+    table instead, at the cost of a second index write per keyed row.
+
+    Returns:
+        Whether the partitioned table was created
+    """
+    if not settings.log_partitioning or connection.dialect.name != "postgresql":
+        return False
+    if inspect(connection).has_table(MessageLog.__tablename__):
+        return False
+
+    partitioned_logs_table().create(connection)
+    for statement in KEY_GUARD_DDL:
+        connection.execute(text(statement))
+    ensure_partitions(connection)
+    return True
+
+def partitioned_logs_table() -> Table:
+    """
+    Copy of the ``message_logs`` table definition, partitioned by ``created_at``
+    """
+    table = MessageLog.__table__.to_metadata(MetaData())
+    table.c.id.autoincrement = True
+    table.c.created_at.primary_key = True
+    table.append_constraint(PrimaryKeyConstraint(table.c.id, table.c.created_at))
+    for index in list(table.indexes):
+        if index.unique:
+            table.indexes.discard(index)
+            Index(index.name, *index.columns, table.c.created_at, unique=True)
+    table.dialect_options["postgresql"]["partition_by"] = "RANGE (created_at)"
+    return table
+
+def is_partitioned(connection: Connection) -> bool:
+    if connection.dialect.name != "postgresql":
+        return False
+    return bool(connection.scalar(
+        text("SELECT count(*) FROM pg_partitioned_table JOIN pg_class ON pg_class.oid = partrelid WHERE relname = :name"),
+        {"name": MessageLog.__tablename__}
+    ))
+
+def list_partitions(connection: Connection) -> List[str]:
+    return list(connection.scalars(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON pg_inherits.inhparent = parent.oid "
+            "JOIN pg_class child ON pg_inherits.inhrelid = child.oid "
+            "WHERE parent.relname = :name ORDER BY child.relname"
+        ),
+        {"name": MessageLog.__tablename__}
+    ))
+
+def ensure_partitions(connection: Connection, now: Optional[datetime] = None) -> List[str]:
+    """
+    Create the current partition and ``log_partitions_ahead`` future ones
+
+    Returns:
+        Names of the partitions that were created
+    """
+    now = now or datetime.utcnow()
+    existing = set(list_partitions(connection))
+    created = []
+    day = now
+    for _ in range(settings.log_partitions_ahead + 1):
+        name, start, end = partition_bounds(day, settings.log_partitioning)
+        if name not in existing:
+            connection.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {MessageLog.__tablename__} "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            ))
+            created.append(name)
+        day = end
+    return created
+
+def drop_expired_partitions(connection: Connection, now: Optional[datetime] = None) -> List[str]:
+    """
+    Drop partitions whose whole range is older than ``log_retention_days``,
+    together with the guard table entries of their rows
+
+    Returns:
+        Names of the partitions that were dropped
+    """
+    if not settings.log_retention_days:
+        return []
+    cutoff = (now or datetime.utcnow()) - timedelta(days=settings.log_retention_days)
+    dropped = []
+    for name in list_partitions(connection):
+        match = PARTITION_NAME.match(name)
+        if match is None:
+            continue
+        year, month, day = match.groups()
+        interval = "daily" if day else "monthly"
+        _, start, end = partition_bounds(datetime(int(year), int(month), int(day or 1)), interval)
+        if end <= cutoff:
+            connection.execute(
+                text(f"DELETE FROM {KEY_TABLE} WHERE created_at >= :start AND created_at < :end"),
+                {"start": start, "end": end}
+            )
+            connection.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+    return dropped
+
+def hour_bucket(connection: Connection):
+    """
+    SQL expression truncating ``created_at`` to the hour
+    """
+    if connection.dialect.name == "sqlite":
+        # Matches the format SQLAlchemy stores SQLite datetimes in
+        return func.strftime("%Y-%m-%d %H:00:00.000000", MessageLog.created_at)
+    return func.date_trunc("hour", MessageLog.created_at)
+
+def refresh_hourly_rollup(connection: Connection, since: Optional[datetime] = None) -> None:
+    """
+    Recompute the hourly rollup from ``since`` onwards
+
+    Statuses keep changing for a while after a message is created (delivered,
+    read), so recent hours are recomputed rather than incremented. Without
+    ``since`` the rollup is rebuilt completely.
+    """
+    bucket = hour_bucket(connection).label("hour")
+    counts = select(bucket, MessageLog.status, func.count()).group_by(bucket, MessageLog.status)
+    clear = delete(MessageStatsHourly)
+    if since is not None:
+        since = since.replace(minute=0, second=0, microsecond=0)
+        counts = counts.where(MessageLog.created_at >= since)
+        clear = clear.where(MessageStatsHourly.hour >= since)
+    connection.execute(clear)
+    connection.execute(
+        insert(MessageStatsHourly).from_select(
+            [MessageStatsHourly.hour, MessageStatsHourly.status, MessageStatsHourly.count], counts
+        )
+    )
+
+def rollup_status_totals(connection: Connection) -> Dict[str, int]:
+    """
+    Message counts per status summed over the hourly rollup
+
+    Reads the small rollup table instead of aggregating ``message_logs``.
+    """
+    rows = connection.execute(
+        select(MessageStatsHourly.status, func.sum(MessageStatsHourly.count)).group_by(MessageStatsHourly.status)
+    )
+    return {status: int(count) for status, count in rows}
+
+def run_log_maintenance(connection: Connection, now: Optional[datetime] = None) -> bool:
+    """
+    Roll up recent hours, then create and drop partitions
+
+    On Postgres a transaction-scoped advisory lock makes sure only one
+    process does this at a time.
+
+    Returns:
+        Whether maintenance ran (False if another process holds the lock)
+    """
+    now = now or datetime.utcnow()
+    if connection.dialect.name == "postgresql" and not connection.scalar(
+        text("SELECT pg_try_advisory_xact_lock(:lock_id)"), {"lock_id": MAINTENANCE_LOCK_ID}
+    ):
+        return False
+
+    has_rollup = connection.scalar(select(MessageStatsHourly.hour).limit(1)) is not None
+    refresh_hourly_rollup(connection, now - timedelta(hours=settings.rollup_lookback_hours) if has_rollup else None)
+
+    if settings.log_partitioning and is_partitioned(connection):
+        ensure_partitions(connection, now)
+        drop_expired_partitions(connection, now)
+    return True
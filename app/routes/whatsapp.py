@@ -1,14 +1,31 @@
-from fastapi import APIRouter, Depends, Query, status
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
-from typing import List
-from app.config import get_db
+import csv
+import io
+import hmac
+import json
+from fastapi import APIRouter, Depends, Header, Query, Request, status
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from sqlalchemy import Select, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from typing import List, Dict, Any, Optional
+from datetime import datetime, timedelta
 
-from app.schemas import MessageRequest, MessageResponse, MessageLogSchema
+from app.schemas import (
+    MessageRequest, MessageResponse, MessageLogSchema,
+    BulkMessageRequest, BulkMessageResponse, BulkRecipientResult, TemplateDefinition, MediaUploadRequest,
+    HourlyStatsSchema, SuppressionRequest
+)
 from app.services.whatsapp_service import WhatsAppService
-from app.dependencies import get_db_session, get_whatsapp_service
-from app.exceptions import InvalidPhoneNumberException, WhatsAppAPIException
-from app.models import MessageLog
+from app.services.message_templates import CompiledMessage, MessageTemplate, compile_message, template_registry
+from app.services.response_cache import response_cache
+from app.services.status_ingest import StatusIngestor, parse_status_events
+from app.config import settings
+from app.dependencies import get_async_db_session, get_async_session_factory, get_whatsapp_service, get_status_ingestor
+from app.exceptions import (
+    InvalidPhoneNumberException, WhatsAppAPIException, DuplicateRequestException,
+    ConfigurationException, WebhookVerificationException, MessageNotFoundException
+)
+from app.models import MessageLog, MessageStatsHourly
+from app.utils import validate_phone_number, normalize_phone_numbers, encode_cursor, decode_cursor, verify_webhook_signature
 
 router = APIRouter(
     prefix="/whatsapp",
@@ -18,22 +35,33 @@ router = APIRouter(
 @router.get("/send_message", response_model=MessageResponse)
 async def send_whatsapp_message(
     phone_number: str = Query(..., description="Recipient's phone number with country code"),
-    db: Session = Depends(get_db),
+    enqueue: bool = Query(False, description="Queue the message and return 202 instead of waiting for delivery"),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=200),
+    db: AsyncSession = Depends(get_async_db_session),
     whatsapp_service: WhatsAppService = Depends(get_whatsapp_service)
 ):
     """
     Send a test message to the specified WhatsApp number
     
     - **phone_number**: The recipient's phone number with country code
+    - **enqueue**: Return 202 with the log ID and deliver in the background
     
     Returns the WhatsApp API response or an error message
     """
-    # Create a message request with the phone number
-    message_request = MessageRequest(phone_number=phone_number)
+    # Validate once (memoized) and build the request without re-running the
+    # model validator; invalid numbers surface as a 400
+    message_request = MessageRequest.model_construct(
+        phone_number=validate_phone_number(phone_number), enqueue=enqueue
+    )
+    whatsapp_service.ensure_not_suppressed(message_request.phone_number)
     
     try:
+        # Queued messages wait out an open circuit instead of failing
+        if message_request.enqueue or whatsapp_service.should_spill_over():
+            return await _enqueue_single(db, whatsapp_service, message_request.phone_number, idempotency_key)
+        
         # Send the message
-        result = await whatsapp_service.send_message(db, message_request.phone_number)
+        result = await whatsapp_service.send_message(db, message_request.phone_number, idempotency_key)
         
         # Get the message ID from the response if available
         message_id = None
@@ -55,6 +83,10 @@ async def send_whatsapp_message(
         # Re-raise to let FastAPI handle it
         raise e
     
+    except DuplicateRequestException as e:
+        # Re-raise to let FastAPI handle it
+        raise e
+    
     except Exception as e:
         # Catch any other exceptions
         return JSONResponse(
@@ -65,19 +97,32 @@ async def send_whatsapp_message(
 @router.post("/send_message", response_model=MessageResponse)
 async def send_whatsapp_message_post(
     request: MessageRequest,
-    db: Session = Depends(get_db_session),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=200),
+    db: AsyncSession = Depends(get_async_db_session),
     whatsapp_service: WhatsAppService = Depends(get_whatsapp_service)
 ):
     """
-    Send a test message to the specified WhatsApp number (POST method)
+    Send a message to the specified WhatsApp number (POST method)
     
     - **phone_number**: The recipient's phone number with country code
+    - **message**: Text, template or media message; the test message if omitted
+    - **enqueue**: Return 202 with the log ID and deliver in the background
+    - **scheduled_at**: Return 202 and deliver at this time
     
     Returns the WhatsApp API response or an error message
     """
+    whatsapp_service.ensure_not_suppressed(request.phone_number)
+    message = await _compile_request_message(request.message, whatsapp_service)
+    
     try:
+        # Queued messages wait out an open circuit instead of failing
+        if request.enqueue or request.scheduled_at is not None or whatsapp_service.should_spill_over():
+            return await _enqueue_single(
+                db, whatsapp_service, request.phone_number, idempotency_key, message, request.scheduled_at
+            )
+        
         # Send the message
-        result = await whatsapp_service.send_message(db, request.phone_number)
+        result = await whatsapp_service.send_message(db, request.phone_number, idempotency_key, message)
         
         # Get the message ID from the response if available
         message_id = None
@@ -99,6 +144,10 @@ async def send_whatsapp_message_post(
         # Re-raise to let FastAPI handle it
         raise e
     
+    except DuplicateRequestException as e:
+        # Re-raise to let FastAPI handle it
+        raise e
+    
     except Exception as e:
         # Catch any other exceptions
         return JSONResponse(
@@ -106,19 +155,458 @@ async def send_whatsapp_message_post(
             content={"success": False, "message": f"Unexpected error: {str(e)}"}
         )
 
-@router.get("/logs", response_model=List[MessageLogSchema])
+@router.post("/send_bulk", response_model=BulkMessageResponse)
+async def send_whatsapp_bulk(
+    request: BulkMessageRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=200),
+    db: AsyncSession = Depends(get_async_db_session),
+    whatsapp_service: WhatsAppService = Depends(get_whatsapp_service)
+):
+    """
+    Send a message to many WhatsApp numbers concurrently
+    
+    - **phone_numbers**: The recipients' phone numbers with country code
+    - **message**: Text, template or media message; the test message if omitted
+    - **enqueue**: Return 202 with the log IDs and deliver in the background
+    - **scheduled_at**, **send_until**: Return 202 and deliver at that time,
+      or spread evenly over the window
+    
+    Invalid and suppressed numbers are reported per recipient instead of
+    failing the whole request, and duplicates are sent only once.
+    """
+    # Validate every number in one pass, keeping the first occurrence only,
+    # and drop suppressed recipients before any I/O
+    recipients, invalid_numbers = normalize_phone_numbers(request.phone_numbers)
+    recipients, suppressed = whatsapp_service.suppression.partition(recipients)
+    message = await _compile_request_message(request.message, whatsapp_service)
+    invalid = [
+        BulkRecipientResult(phone_number=phone_number, success=False, error=error)
+        for phone_number, error in invalid_numbers.items()
+    ] + [
+        BulkRecipientResult(phone_number=phone_number, success=False, error="Recipient is suppressed")
+        for phone_number in suppressed
+    ]
+    
+    try:
+        if request.enqueue or request.scheduled_at is not None or whatsapp_service.should_spill_over():
+            log_ids = await whatsapp_service.enqueue_messages(
+                db, recipients, idempotency_key, message, request.scheduled_at, request.send_until
+            )
+            queued = [
+                BulkRecipientResult(phone_number=phone_number, success=True, log_id=log_id)
+                for phone_number, log_id in zip(recipients, log_ids)
+            ]
+            response = BulkMessageResponse(
+                success=not invalid,
+                total=len(queued) + len(invalid),
+                sent=0,
+                queued=len(queued),
+                failed=len(invalid),
+                results=queued + invalid
+            )
+            return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=response.model_dump())
+        
+        sent_results = await whatsapp_service.send_bulk(db, recipients, idempotency_key, message)
+    except DuplicateRequestException as e:
+        raise e
+    except Exception as e:
+        return JSONResponse(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            content={"success": False, "message": f"Unexpected error: {str(e)}"}
+        )
+    
+    results = [BulkRecipientResult(**result) for result in sent_results] + invalid
+    sent = sum(1 for result in results if result.success)
+    return BulkMessageResponse(
+        success=sent == len(results),
+        total=len(results),
+        sent=sent,
+        failed=len(results) - sent,
+        results=results
+    )
+
+# Columns included in log exports
+EXPORT_COLUMNS = (
+    MessageLog.id,
+    MessageLog.phone_number,
+    MessageLog.message,
+    MessageLog.status,
+    MessageLog.wa_message_id,
+    MessageLog.error_message,
+    MessageLog.attempts,
+    MessageLog.created_at,
+    MessageLog.updated_at,
+)
+
+# Columns of the log list, read as plain rows instead of ORM objects
+LOG_COLUMNS = tuple(getattr(MessageLog, field) for field in MessageLogSchema.model_fields)
+HOURLY_STATS_COLUMNS = tuple(getattr(MessageStatsHourly, field) for field in HourlyStatsSchema.model_fields)
+
+def _cached_read_responses(model: Any) -> Dict[Any, Dict[str, Any]]:
+    """
+    OpenAPI responses of a read endpoint served by the response cache, which
+    returns the serialized rows itself rather than through ``response_model``
+    """
+    return {
+        200: {
+            "model": model,
+            "headers": {"ETag": {"description": "Tag of the body, for If-None-Match", "schema": {"type": "string"}}}
+        },
+        304: {"description": "Unchanged since the ETag sent in If-None-Match"}
+    }
+
+def _filter_logs(
+    query: Select,
+    status_filter: Optional[str],
+    phone_number: Optional[str],
+    created_after: Optional[datetime],
+    created_before: Optional[datetime]
+) -> Select:
+    """
+    Apply the common message log filters to a query
+    """
+    if status_filter:
+        query = query.where(MessageLog.status == status_filter)
+    if phone_number:
+        query = query.where(MessageLog.phone_number == validate_phone_number(phone_number))
+    if created_after:
+        query = query.where(MessageLog.created_at >= created_after)
+    if created_before:
+        query = query.where(MessageLog.created_at < created_before)
+    return query
+
+def _csv_chunk(rows: List[Any]) -> str:
+    """
+    Render rows as a chunk of CSV text
+    """
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+def _json_default(value: Any) -> str:
+    """
+    JSON fallback for values such as datetimes
+    """
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+async def _compile_request_message(content, whatsapp_service: WhatsAppService) -> CompiledMessage:
+    """
+    Compile the message of a request once, before any recipient is handled
+    
+    A local ``file`` is uploaded first (or taken from the media ID cache), so
+    every recipient references the same media ID.
+    """
+    if content is not None and content.file:
+        media_id = await whatsapp_service.media.upload(content.file)
+        content = content.model_copy(update={"media_id": media_id, "file": None})
+    return compile_message(content.model_dump(exclude_none=True) if content is not None else None)
+
+async def _enqueue_single(
+    db: AsyncSession,
+    whatsapp_service: WhatsAppService,
+    phone_number: str,
+    idempotency_key: Optional[str],
+    message: Optional[CompiledMessage] = None,
+    scheduled_at: Optional[datetime] = None
+) -> JSONResponse:
+    """
+    Queue (or schedule) one message for background delivery and acknowledge with 202
+    """
+    log_ids = await whatsapp_service.enqueue_messages(db, [phone_number], idempotency_key, message, scheduled_at)
+    response = MessageResponse(
+        success=True,
+        message=(
+            f"Message queued for delivery to {phone_number}" if scheduled_at is None
+            else f"Message scheduled for delivery to {phone_number} at {scheduled_at.isoformat()}Z"
+        ),
+        log_id=log_ids[0]
+    )
+    return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=response.model_dump())
+
+@router.get("/logs", response_model=None, responses=_cached_read_responses(List[MessageLogSchema]))
 async def get_message_logs(
+    request: Request,
     limit: int = Query(10, ge=1, le=100),
-    skip: int = Query(0, ge=0),
-    db: Session = Depends(get_db_session)
+    skip: int = Query(0, ge=0, deprecated=True, description="Offset paging; use cursor instead"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page"),
+    status_filter: Optional[str] = Query(None, alias="status", description="Only logs with this status"),
+    phone_number: Optional[str] = Query(None, description="Only logs for this recipient"),
+    created_after: Optional[datetime] = Query(None, description="Only logs created at or after this time"),
+    created_before: Optional[datetime] = Query(None, description="Only logs created before this time"),
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     """
-    Get recent WhatsApp message logs
+    Get recent WhatsApp message logs, newest first
     
     - **limit**: Maximum number of logs to retrieve (default: 10)
-    - **skip**: Number of logs to skip (default: 0)
+    - **cursor**: Continue after the last log of the previous page
+    - **status**, **phone_number**, **created_after**, **created_before**: Filters
+    
+    Pages are keyed on (created_at, id), so deep pages cost the same as the
+    first one. When more logs exist, the cursor for the next page is returned
+    in the X-Next-Cursor header.
     
-    Returns a list of message logs
+    Pages are served from the response cache for up to RESPONSE_CACHE_TTL
+    seconds and carry an ETag; polling with If-None-Match returns 304 when
+    nothing changed.
     """
-    logs = db.query(MessageLog).order_by(MessageLog.created_at.desc()).offset(skip).limit(limit).all()
-    return logs
\ No newline at end of file
+    async def build():
+        query = _filter_logs(select(*LOG_COLUMNS), status_filter, phone_number, created_after, created_before)
+        if cursor:
+            cursor_created_at, cursor_id = decode_cursor(cursor)
+            query = query.where(tuple_(MessageLog.created_at, MessageLog.id) < tuple_(cursor_created_at, cursor_id))
+        elif skip:
+            query = query.offset(skip)
+        
+        # Fetch one extra row to learn whether another page exists
+        result = await db.execute(
+            query.order_by(MessageLog.created_at.desc(), MessageLog.id.desc()).limit(limit + 1)
+        )
+        logs = result.all()
+        headers = {}
+        if len(logs) > limit:
+            logs = logs[:limit]
+            headers["X-Next-Cursor"] = encode_cursor(logs[-1].created_at, logs[-1].id)
+        return [log._asdict() for log in logs], headers
+    
+    return await response_cache.respond(request, build)
+
+@router.get("/messages/{wamid}", response_model=MessageLogSchema)
+async def get_message_by_wamid(
+    wamid: str,
+    db: AsyncSession = Depends(get_async_db_session)
+):
+    """
+    Get the message log for a WhatsApp message ID (wamid)
+    
+    Uses the unique index on ``wa_message_id``, as do webhook status updates.
+    """
+    message_log = await db.scalar(select(MessageLog).where(MessageLog.wa_message_id == wamid))
+    if message_log is None:
+        raise MessageNotFoundException(f"No message with ID {wamid}")
+    return message_log
+
+@router.get("/logs/export")
+async def export_message_logs(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$", description="ndjson or csv"),
+    status_filter: Optional[str] = Query(None, alias="status", description="Only logs with this status"),
+    phone_number: Optional[str] = Query(None, description="Only logs for this recipient"),
+    created_after: Optional[datetime] = Query(None, description="Only logs created at or after this time"),
+    created_before: Optional[datetime] = Query(None, description="Only logs created before this time"),
+    session_factory: async_sessionmaker = Depends(get_async_session_factory)
+):
+    """
+    Stream all matching message logs as NDJSON or CSV, oldest first
+    
+    - **format**: ndjson (default) or csv
+    - **status**, **phone_number**, **created_after**, **created_before**: Filters
+    
+    Rows are read through a server-side cursor and written out chunk by
+    chunk, so memory stays constant regardless of the export size.
+    """
+    query = _filter_logs(
+        select(*EXPORT_COLUMNS), status_filter, phone_number, created_after, created_before
+    ).order_by(MessageLog.created_at, MessageLog.id)
+    
+    async def generate_rows():
+        # The session lives as long as the stream, not the request handler
+        async with session_factory() as db:
+            result = await db.stream(query.execution_options(yield_per=settings.export_batch_size))
+            if export_format == "csv":
+                yield _csv_chunk([[column.key for column in EXPORT_COLUMNS]])
+            async for rows in result.partitions():
+                if export_format == "csv":
+                    yield _csv_chunk(rows)
+                else:
+                    yield "".join(
+                        json.dumps(dict(row._mapping), default=_json_default) + "\n" for row in rows
+                    )
+    
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        generate_rows(),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=message_logs.{export_format}"}
+    )
+
+@router.get("/pool_stats", response_model=Dict[str, Any])
+async def get_pool_stats(
+    whatsapp_service: WhatsAppService = Depends(get_whatsapp_service)
+):
+    """
+    Get connection pool statistics of the shared Graph API HTTP client
+    """
+    return whatsapp_service.pool_stats()
+
+@router.get("/rate_limits", response_model=Dict[str, Any])
+async def get_rate_limits(
+    whatsapp_service: WhatsAppService = Depends(get_whatsapp_service)
+):
+    """
+    Get the client-side pacing state per sender
+    """
+    return whatsapp_service.rate_limit_stats()
+
+@router.get("/senders", response_model=Dict[str, Any])
+async def get_senders(
+    whatsapp_service: WhatsAppService = Depends(get_whatsapp_service)
+):
+    """
+    Get the routing policy and the load and health of each sender number
+    """
+    return whatsapp_service.sender_stats()
+
+@router.get("/suppressions", response_model=Dict[str, Any])
+async def get_suppressions(
+    whatsapp_service: WhatsAppService = Depends(get_whatsapp_service)
+):
+    """
+    Get the size and sync state of the in-memory suppression list
+    """
+    return whatsapp_service.suppression.stats()
+
+@router.post("/suppressions", response_model=Dict[str, Any])
+async def add_suppressions(
+    request: SuppressionRequest,
+    db: AsyncSession = Depends(get_async_db_session),
+    whatsapp_service: WhatsAppService = Depends(get_whatsapp_service)
+):
+    """
+    Stop messaging the given numbers, e.g. after an opt-out
+    
+    Takes effect in this process at once and in other processes on their
+    next refresh (SUPPRESSION_REFRESH_INTERVAL).
+    """
+    phone_numbers, invalid_numbers = normalize_phone_numbers(request.phone_numbers)
+    if phone_numbers:
+        await whatsapp_service.suppression.add(db, phone_numbers, request.reason)
+    return {"suppressed": len(phone_numbers), "invalid": invalid_numbers}
+
+@router.delete("/suppressions/{phone_number}", response_model=Dict[str, Any])
+async def remove_suppression(
+    phone_number: str,
+    db: AsyncSession = Depends(get_async_db_session),
+    whatsapp_service: WhatsAppService = Depends(get_whatsapp_service)
+):
+    """
+    Allow messaging a suppressed number again
+    """
+    phone_number = validate_phone_number(phone_number)
+    if not await whatsapp_service.suppression.remove(db, [phone_number]):
+        raise MessageNotFoundException(f"{phone_number} is not suppressed")
+    return {"success": True, "phone_number": phone_number}
+
+@router.get("/templates", response_model=List[TemplateDefinition])
+async def list_templates():
+    """
+    Get the message templates registered for sending
+    """
+    return [template.to_dict() for template in template_registry.all()]
+
+@router.post("/templates", response_model=TemplateDefinition, status_code=status.HTTP_201_CREATED)
+async def register_template(definition: TemplateDefinition):
+    """
+    Register an approved WhatsApp template, replacing one with the same name
+    
+    The template is compiled once here; sends only supply its parameters.
+    """
+    template = template_registry.register(MessageTemplate(**definition.model_dump()))
+    return template.to_dict()
+
+@router.post("/media", response_model=Dict[str, Any])
+async def upload_media(
+    request: MediaUploadRequest,
+    whatsapp_service: WhatsAppService = Depends(get_whatsapp_service)
+):
+    """
+    Upload a file from the media root and return its media ID
+    
+    Files with the same content are uploaded once; later calls return the
+    cached media ID until it nears expiry.
+    """
+    media_id = await whatsapp_service.media.upload(request.path, request.mime_type)
+    return {"media_id": media_id, **whatsapp_service.media.stats()}
+
+@router.get("/webhook", response_class=PlainTextResponse)
+async def verify_webhook(
+    mode: str = Query(..., alias="hub.mode"),
+    verify_token: str = Query(..., alias="hub.verify_token"),
+    challenge: str = Query(..., alias="hub.challenge")
+):
+    """
+    Answer the Graph API webhook subscription check by echoing the challenge
+    """
+    if not settings.whatsapp_webhook_verify_token:
+        raise ConfigurationException("Webhook verify token not configured. Please set WHATSAPP_WEBHOOK_VERIFY_TOKEN.")
+    if mode != "subscribe" or not hmac.compare_digest(verify_token, settings.whatsapp_webhook_verify_token):
+        raise WebhookVerificationException()
+    return PlainTextResponse(challenge)
+
+@router.post("/webhook")
+async def receive_webhook(
+    request: Request,
+    signature: Optional[str] = Header(None, alias="X-Hub-Signature-256"),
+    ingestor: StatusIngestor = Depends(get_status_ingestor)
+):
+    """
+    Receive Graph API notifications and acknowledge them immediately
+    
+    Delivery, read and failure statuses are buffered and written to the
+    message logs in batches by the status ingestor.
+    """
+    if not settings.whatsapp_app_secret:
+        raise ConfigurationException("Webhook app secret not configured. Please set WHATSAPP_APP_SECRET.")
+    body = await request.body()
+    if not verify_webhook_signature(body, signature, settings.whatsapp_app_secret):
+        raise WebhookVerificationException("Invalid webhook signature")
+    
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        payload = {}
+    if isinstance(payload, dict):
+        ingestor.add(parse_status_events(payload))
+    return {"success": True}
+
+@router.get("/stats", response_model=Dict[str, Any])
+async def get_stats(
+    whatsapp_service: WhatsAppService = Depends(get_whatsapp_service)
+):
+    """
+    Get message counts per status and send/failure rates over the last minutes
+    
+    Served from in-process counters without touching the database; the
+    counts are reconciled from the hourly rollup every
+    LOG_MAINTENANCE_INTERVAL seconds.
+    """
+    return whatsapp_service.stats.snapshot()
+
+@router.get("/stats/hourly", response_model=None, responses=_cached_read_responses(List[HourlyStatsSchema]))
+async def get_hourly_stats(
+    request: Request,
+    since: Optional[datetime] = Query(None, description="First hour to include (default: 24 hours ago)"),
+    until: Optional[datetime] = Query(None, description="Only hours before this time"),
+    status_filter: Optional[str] = Query(None, alias="status", description="Only counts for this status"),
+    db: AsyncSession = Depends(get_async_db_session)
+):
+    """
+    Get message counts per hour and status from the precomputed rollup
+    
+    The rollup is refreshed every LOG_MAINTENANCE_INTERVAL seconds, so the
+    current hour may lag slightly behind the logs. Responses are cached like
+    those of the log list.
+    """
+    async def build():
+        query = select(*HOURLY_STATS_COLUMNS).where(
+            MessageStatsHourly.hour >= (since or datetime.utcnow() - timedelta(hours=24))
+        )
+        if until is not None:
+            query = query.where(MessageStatsHourly.hour < until)
+        if status_filter is not None:
+            query = query.where(MessageStatsHourly.status == status_filter)
+        result = await db.execute(query.order_by(MessageStatsHourly.hour, MessageStatsHourly.status))
+        return [row._asdict() for row in result], {}
+    
+    return await response_cache.respond(request, build)
\ No newline at end of file
@@ -1,15 +1,34 @@
-from pydantic import BaseModel, Field, validator
-from typing import Optional, Dict, Any
+from pydantic import BaseModel, ConfigDict, Field, validator
+from typing import Optional, Dict, Any, List, Literal
 from datetime import datetime
-import phonenumbers
-from app.utils import validate_phone_number
+from app.utils import to_naive_utc, validate_phone_number
 from app.exceptions import InvalidPhoneNumberException
+from app.config import settings
+
+class MessageContent(BaseModel):
+    """
+    Message to send: free-form text, a registered template, or media
+    """
+    type: Literal["text", "template", "image", "document"] = "text"
+    text: Optional[str] = Field(None, max_length=4096, description="Body of a text message")
+    preview_url: bool = Field(False, description="Render a link preview for text messages")
+    template: Optional[str] = Field(None, description="Name of a registered template")
+    parameters: List[str] = Field([], description="Template body parameters, in order")
+    header: Optional[str] = Field(None, description="Template header text or media link")
+    media_id: Optional[str] = Field(None, description="ID of uploaded media")
+    link: Optional[str] = Field(None, description="Public URL of the media")
+    file: Optional[str] = Field(None, description="Path under MEDIA_ROOT to upload and send")
+    caption: Optional[str] = Field(None, max_length=1024, description="Media caption")
+    filename: Optional[str] = Field(None, description="File name shown for documents")
 
 class MessageRequest(BaseModel):
     """
     Request model for sending WhatsApp messages
     """
     phone_number: str = Field(..., description="Recipient's phone number with country code")
+    message: Optional[MessageContent] = Field(None, description="Message to send, the test message if omitted")
+    enqueue: bool = Field(False, description="Queue the message and return 202 instead of waiting for delivery")
+    scheduled_at: Optional[datetime] = Field(None, description="Send at this time instead of now; returns 202")
     
     @validator('phone_number')
     def validate_phone(cls, value):
@@ -19,6 +38,11 @@ class MessageRequest(BaseModel):
         except InvalidPhoneNumberException as e:
             raise ValueError(str(e))
 
+    @validator('scheduled_at')
+    def validate_scheduled_at(cls, value):
+        """Store schedule times as naive UTC; naive input is taken as UTC"""
+        return to_naive_utc(value) if value is not None else None
+
 class MessageResponse(BaseModel):
     """
     Response model for WhatsApp message API
@@ -26,17 +50,114 @@ class MessageResponse(BaseModel):
     success: bool
     message: str
     message_id: Optional[str] = None
+    log_id: Optional[int] = None
     details: Optional[Dict[str, Any]] = None
 
+class BulkMessageRequest(BaseModel):
+    """
+    Request model for sending the message to many recipients
+    """
+    phone_numbers: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.bulk_max_recipients,
+        description="Recipients' phone numbers with country code"
+    )
+    message: Optional[MessageContent] = Field(None, description="Message to send, the test message if omitted")
+    enqueue: bool = Field(False, description="Queue the messages and return 202 instead of waiting for delivery")
+    scheduled_at: Optional[datetime] = Field(
+        None, description="Send at this time, or start of the send window; returns 202"
+    )
+    send_until: Optional[datetime] = Field(
+        None, description="End of the send window; sends are spread evenly from scheduled_at"
+    )
+
+    @validator('scheduled_at', 'send_until')
+    def validate_schedule_times(cls, value):
+        """Store schedule times as naive UTC; naive input is taken as UTC"""
+        return to_naive_utc(value) if value is not None else None
+
+    @validator('send_until')
+    def validate_send_window(cls, value, values):
+        """A send window needs a start before its end"""
+        if value is not None:
+            if values.get('scheduled_at') is None:
+                raise ValueError("send_until requires scheduled_at")
+            if value <= values['scheduled_at']:
+                raise ValueError("send_until must be after scheduled_at")
+        return value
+
+class SuppressionRequest(BaseModel):
+    """
+    Request model for adding numbers to the suppression list
+    """
+    phone_numbers: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.bulk_max_recipients,
+        description="Phone numbers with country code"
+    )
+    reason: Literal["opt_out", "invalid"] = Field("opt_out", description="Why the numbers must not be messaged")
+
+class BulkRecipientResult(BaseModel):
+    """
+    Outcome of a bulk send for a single recipient
+    """
+    phone_number: str
+    success: bool
+    log_id: Optional[int] = None
+    message_id: Optional[str] = None
+    error: Optional[str] = None
+
+class BulkMessageResponse(BaseModel):
+    """
+    Response model for the bulk send API
+    """
+    success: bool
+    total: int
+    sent: int
+    queued: int = 0
+    failed: int
+    results: List[BulkRecipientResult]
+
+class TemplateDefinition(BaseModel):
+    """
+    Approved WhatsApp template to register for sending
+    """
+    name: str = Field(..., min_length=1, max_length=512)
+    language: str = Field("en_US", description="Template language code")
+    body_parameters: int = Field(0, ge=0, description="Number of body parameters")
+    header_format: Optional[Literal["text", "image", "document"]] = Field(
+        None, description="Format of a variable header, if the template has one"
+    )
+
+class MediaUploadRequest(BaseModel):
+    """
+    Request model for uploading a media file ahead of sending
+    """
+    path: str = Field(..., description="Path of the file under MEDIA_ROOT")
+    mime_type: Optional[str] = Field(None, description="MIME type, guessed from the file name if omitted")
+
+class HourlyStatsSchema(BaseModel):
+    """
+    Schema for one bucket of the hourly message rollup
+    """
+    model_config = ConfigDict(from_attributes=True)
+
+    hour: datetime
+    status: str
+    count: int
+
 class MessageLogSchema(BaseModel):
     """
     Schema for message log data
     """
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     phone_number: str
     message: str
     status: str
-    created_at: datetime
-    
-    class Config:
-        orm_mode = True
\ No newline at end of file
+    wa_message_id: Optional[str] = None
+    scheduled_at: Optional[datetime] = None
+    created_at: datetime
\ No newline at end of file
@@ -0,0 +1,61 @@
+"""
+Production entry point running the API in several worker processes
+
+The schema is created and upgraded once, here, before any worker starts;
+the workers are started with SCHEMA_INIT=false so they skip it. Uvicorn
+spawns each worker as a fresh interpreter, so every worker builds its own
+settings, database engine and pooled HTTP client, and nothing is shared
+across processes. WEB_CONCURRENCY is passed on so each worker sizes its
+database pool to its share of DB_MAX_CONNECTIONS.
+
+Usage:
+    python -m app.server [--workers 4] [--host 0.0.0.0] [--port 8000]
+    python -m app.server --reload    # single process, for development
+"""
+import argparse
+import os
+
+from app import config
+from app.config import settings
+
+def init_schema_once() -> None:
+    """
+    Create and upgrade the schema from the parent, then drop its connections
+    """
+    from app.migrations import init_schema
+
+    with config.engine.begin() as connection:
+        init_schema(connection)
+    config.engine.dispose()
+    print("Database tables created or verified")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=settings.web_concurrency or os.cpu_count() or 1)
+    parser.add_argument("--reload", action="store_true", default=settings.debug, help="restart on code changes (one process)")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    if args.reload:
+        uvicorn.run("app.main:app", host=args.host, port=args.port, reload=True, log_level=args.log_level)
+        return
+
+    if settings.schema_init:
+        init_schema_once()
+    os.environ["SCHEMA_INIT"] = "false"
+    os.environ["WEB_CONCURRENCY"] = str(args.workers)
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        log_level=args.log_level,
+        proxy_headers=True
+    )
+
+if __name__ == "__main__":
+    main()
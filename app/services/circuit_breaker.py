@@ -0,0 +1,133 @@
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from app.config import settings
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open circuit breaker for one Graph API sender
+
+    The circuit opens when ``failure_threshold`` calls fail in a row, or when
+    at least ``failure_rate`` of the last ``window`` calls failed (once
+    ``min_calls`` have been made). While it is open, calls are refused without
+    touching the network. After ``open_seconds`` it lets ``half_open_probes``
+    calls through. A successful probe closes the circuit; a failed probe opens
+    it again.
+    """
+    def __init__(
+        self,
+        failure_threshold: Optional[int] = None,
+        failure_rate: Optional[float] = None,
+        window: Optional[int] = None,
+        min_calls: Optional[int] = None,
+        open_seconds: Optional[float] = None,
+        half_open_probes: Optional[int] = None
+    ):
+        self.failure_threshold = failure_threshold if failure_threshold is not None else settings.circuit_failure_threshold
+        self.failure_rate = failure_rate if failure_rate is not None else settings.circuit_failure_rate
+        self.window = window if window is not None else settings.circuit_window
+        self.min_calls = min_calls if min_calls is not None else settings.circuit_min_calls
+        self.open_seconds = open_seconds if open_seconds is not None else settings.circuit_open_seconds
+        self.half_open_probes = half_open_probes if half_open_probes is not None else settings.circuit_half_open_probes
+        self._outcomes: Deque[bool] = deque(maxlen=self.window)  # True for failures
+        self._failures = 0
+        self._consecutive_failures = 0
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() >= self._opened_at + self.open_seconds:
+            self._state = HALF_OPEN
+            self._probes = 0
+        return self._state
+
+    def retry_after(self) -> float:
+        """
+        Seconds until an open circuit lets probes through
+        """
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self._opened_at + self.open_seconds - time.monotonic())
+
+    def available(self) -> bool:
+        """
+        Whether a call would currently be let through, without reserving it
+        """
+        state = self.state
+        return state == CLOSED or (state == HALF_OPEN and self._probes < self.half_open_probes)
+
+    def acquire(self) -> bool:
+        """
+        Let a call through, counting it as a probe while half-open
+        """
+        if not self.available():
+            return False
+        if self._state == HALF_OPEN:
+            self._probes += 1
+        return True
+
+    def release(self) -> None:
+        """
+        Give back a call that was let through but ended without an outcome
+        """
+        if self._state == HALF_OPEN and self._probes > 0:
+            self._probes -= 1
+
+    def record_success(self) -> None:
+        self._consecutive_failures = 0
+        if self._state == HALF_OPEN:
+            self._close()
+            return
+        self._record(False)
+
+    def record_failure(self) -> None:
+        self._consecutive_failures += 1
+        if self._state == HALF_OPEN:
+            self._open()
+            return
+        self._record(True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "recent_calls": len(self._outcomes),
+            "recent_failures": self._failures,
+            "retry_after": round(self.retry_after(), 3),
+            "times_opened": self.times_opened
+        }
+
+    def _record(self, failed: bool) -> None:
+        """
+        Add an outcome to the window and open the circuit if it trips
+        
+        The failure rate is checked after every outcome, since the call that
+        brings the window up to ``min_calls`` may be a success.
+        """
+        if len(self._outcomes) == self.window and self._outcomes[0]:
+            self._failures -= 1
+        self._outcomes.append(failed)
+        self._failures += failed
+        if self._state == CLOSED and (
+            self._consecutive_failures >= self.failure_threshold
+            or (len(self._outcomes) >= self.min_calls and self._failures >= self.failure_rate * len(self._outcomes))
+        ):
+            self._open()
+
+    def _open(self) -> None:
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self.times_opened += 1
+
+    def _close(self) -> None:
+        self._state = CLOSED
+        self._outcomes.clear()
+        self._failures = 0
+        self._consecutive_failures = 0
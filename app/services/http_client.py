@@ -0,0 +1,58 @@
+import importlib.util
+import httpx
+from typing import Dict, Any, Optional
+
+from app.config import settings
+
+def create_http_client() -> httpx.AsyncClient:
+    """
+    Create the shared, pooled HTTP client used for Graph API calls
+
+    The client keeps connections alive between sends and multiplexes requests
+    over HTTP/2 when the optional ``h2`` package is installed.
+    """
+    limits = httpx.Limits(
+        max_connections=settings.http_max_connections,
+        max_keepalive_connections=settings.http_max_keepalive_connections,
+        keepalive_expiry=settings.http_keepalive_expiry
+    )
+    timeout = httpx.Timeout(
+        settings.http_timeout,
+        connect=settings.http_connect_timeout,
+        pool=settings.http_pool_timeout
+    )
+    # HTTP/2 needs the h2 package; fall back to HTTP/1.1 keep-alive without it
+    http2 = settings.http2_enabled and importlib.util.find_spec("h2") is not None
+
+    return httpx.AsyncClient(limits=limits, timeout=timeout, http2=http2)
+
+def get_pool_stats(client: Optional[httpx.AsyncClient]) -> Dict[str, Any]:
+    """
+    Return a snapshot of the connection pool behind an httpx client
+    """
+    stats = {
+        "http2": False,
+        "max_connections": settings.http_max_connections,
+        "max_keepalive_connections": settings.http_max_keepalive_connections,
+        "connections": 0,
+        "active": 0,
+        "idle": 0,
+        "http2_connections": 0,
+        "closed": client is None or client.is_closed
+    }
+    if client is None:
+        return stats
+
+    # httpx does not expose pool state publicly, so read it from httpcore
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    stats["http2"] = bool(getattr(pool, "_http2", False))
+    for connection in getattr(pool, "connections", []):
+        stats["connections"] += 1
+        if connection.is_idle():
+            stats["idle"] += 1
+        else:
+            stats["active"] += 1
+        if "HTTP/2" in connection.info():
+            stats["http2_connections"] += 1
+
+    return stats
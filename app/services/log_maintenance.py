@@ -0,0 +1,63 @@
+import asyncio
+import logging
+from sqlalchemy.ext.asyncio import AsyncEngine
+from typing import Optional
+
+from app.config import settings
+from app.partitioning import rollup_status_totals, run_log_maintenance
+from app.services.message_stats import MessageStats
+from app.services.response_cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+class LogMaintenance:
+    """
+    Periodic upkeep of ``message_logs``: hourly rollup and partitions
+
+    With ``stats``, each pass also reconciles the in-process counters from
+    the freshly refreshed rollup, in the same transaction and so under the
+    same advisory lock; no pass aggregates the whole log table for them.
+    """
+    def __init__(self, engine: AsyncEngine, interval: Optional[float] = None, stats: Optional[MessageStats] = None):
+        self.engine = engine
+        self.interval = interval or settings.log_maintenance_interval
+        self.stats = stats
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run(), name="message-log-maintenance")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def run_once(self) -> bool:
+        """
+        Run one maintenance pass in its own transaction
+
+        Returns:
+            Whether it ran (False if another process was already running it)
+        """
+        totals = None
+        async with self.engine.begin() as conn:
+            ran = await conn.run_sync(run_log_maintenance)
+            if ran and self.stats is not None:
+                totals = await conn.run_sync(rollup_status_totals)
+        if ran:
+            # The hourly stats endpoint serves the rollup just rewritten
+            response_cache.invalidate()
+        if totals is not None:
+            self.stats.reconcile(totals)
+        return ran
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Message log maintenance failed")
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,174 @@
+import asyncio
+import logging
+from collections import deque
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from app.config import settings
+from app.models import MessageLog
+from app.services.response_cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+class LogWriter:
+    """
+    Write-behind buffer for message log inserts and status transitions
+
+    Log IDs are handed out from blocks reserved on the ``message_logs`` ID
+    sequence, so a send knows its row ID without a round-trip. Creations and
+    updates are kept in memory; an update to a row that is not yet written is
+    folded into its insert, so a typical send costs one row in one
+    executemany. Buffered writes are flushed every ``flush_interval``
+    seconds or once ``max_pending`` rows are waiting.
+
+    Rows still in memory are lost if the process is killed, so the writer is
+    opt-in and only used where the database row is a record rather than the
+    source of truth (queued and idempotent sends are always written through).
+    """
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        flush_interval: Optional[float] = None,
+        max_pending: Optional[int] = None,
+        id_block_size: Optional[int] = None,
+        id_source: Optional[Callable[[int], Awaitable[List[int]]]] = None
+    ):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval or settings.log_flush_interval
+        self.max_pending = max_pending or settings.log_flush_max_pending
+        self.id_block_size = id_block_size or settings.log_id_block_size
+        # Async callable returning ``n`` unused IDs; the Postgres sequence by default
+        self.id_source = id_source or self._reserve_sequence_block
+        self._ids: Deque[int] = deque()
+        self._id_lock = asyncio.Lock()
+        self._inserts: Dict[int, Dict[str, Any]] = {}
+        self._updates: Dict[int, Dict[str, Any]] = {}
+        self._flush_lock = asyncio.Lock()
+        self._flush_requested = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.flushed_rows = 0
+
+    @staticmethod
+    def supports(dialect_name: str) -> bool:
+        """
+        Whether the default ID source works on a database
+        """
+        return dialect_name == "postgresql"
+
+    async def create(self, **values: Any) -> int:
+        """
+        Buffer a new message log and return its ID
+        """
+        async with self._id_lock:
+            if not self._ids:
+                self._ids.extend(await self.id_source(self.id_block_size))
+            log_id = self._ids.popleft()
+
+        # created_at/updated_at are left to the column defaults, so buffered rows
+        # carry the database clock like every other row (stamped at flush time)
+        self._inserts[log_id] = {"id": log_id, "attempts": 0, **values}
+        self._check_pending()
+        return log_id
+
+    def update(self, log_id: int, **values: Any) -> None:
+        """
+        Buffer a change to a message log created through this writer
+        """
+        row = self._inserts.get(log_id)
+        if row is not None:
+            row.update(values)
+        else:
+            self._updates.setdefault(log_id, {"id": log_id}).update(values)
+            self._check_pending()
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run(), name="message-log-writer")
+
+    async def stop(self) -> None:
+        """
+        Stop the periodic flush and write everything still buffered
+        """
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Lost %d buffered message log writes on shutdown", self.pending)
+
+    @property
+    def pending(self) -> int:
+        return len(self._inserts) + len(self._updates)
+
+    async def flush(self) -> int:
+        """
+        Write all buffered rows in one transaction
+
+        Returns:
+            Number of rows inserted or updated
+        """
+        async with self._flush_lock:
+            inserts, self._inserts = self._inserts, {}
+            updates, self._updates = self._updates, {}
+            if not inserts and not updates:
+                return 0
+            try:
+                async with self.session_factory() as db:
+                    if inserts:
+                        await db.execute(insert(MessageLog), list(inserts.values()))
+                    if updates:
+                        await db.execute(update(MessageLog), list(updates.values()))
+                    await db.commit()
+            except Exception:
+                self._requeue(inserts, updates)
+                raise
+            response_cache.invalidate()
+            self.flushed_rows += len(inserts) + len(updates)
+            return len(inserts) + len(updates)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending_inserts": len(self._inserts),
+            "pending_updates": len(self._updates),
+            "reserved_ids": len(self._ids),
+            "flushed_rows": self.flushed_rows
+        }
+
+    def _requeue(self, inserts: Dict[int, Dict[str, Any]], updates: Dict[int, Dict[str, Any]]) -> None:
+        """
+        Put the rows of a failed flush back, keeping changes made meanwhile
+        """
+        for log_id, values in updates.items():
+            self._updates[log_id] = {**values, **self._updates.get(log_id, {})}
+        for log_id, row in inserts.items():
+            # Updates buffered while the insert was in flight belong to it again
+            row.update(self._updates.pop(log_id, {}))
+            self._inserts[log_id] = row
+
+    def _check_pending(self) -> None:
+        if self.pending >= self.max_pending:
+            self._flush_requested.set()
+
+    async def _reserve_sequence_block(self, size: int) -> List[int]:
+        async with self.session_factory() as db:
+            sequence = func.pg_get_serial_sequence(MessageLog.__tablename__, "id")
+            result = await db.scalars(
+                select(func.nextval(sequence)).select_from(func.generate_series(1, size))
+            )
+            return sorted(result)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Failed to flush buffered message log writes")
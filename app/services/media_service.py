@@ -0,0 +1,164 @@
+import asyncio
+import hashlib
+import httpx
+import mimetypes
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+from app.config import settings
+from app.exceptions import WhatsAppAPIException, InvalidMessageException
+from app.services.retry import is_retryable_request_error, is_retryable_response
+
+def file_sha256(path: Path, chunk_size: int) -> str:
+    """
+    Content hash of a file, read in fixed-size chunks
+    """
+    digest = hashlib.sha256()
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as file:
+        while True:
+            read = file.readinto(buffer)
+            if not read:
+                break
+            digest.update(view[:read])
+    return digest.hexdigest()
+
+class MediaService:
+    """
+    Uploads media to the Graph API once per distinct file content
+
+    Files are streamed from ``media_root`` rather than read into memory, and
+    the returned media IDs are cached by content hash until shortly before
+    the Graph API expires them. Concurrent uploads of the same content share
+    a single request.
+    """
+    def __init__(
+        self,
+        whatsapp_service,
+        media_root: Optional[str] = None,
+        cache_ttl: Optional[float] = None,
+        chunk_size: Optional[int] = None
+    ):
+        self.whatsapp_service = whatsapp_service
+        self.media_root = Path(media_root or settings.media_root).resolve()
+        self.cache_ttl = cache_ttl if cache_ttl is not None else settings.media_cache_ttl
+        self.chunk_size = chunk_size or settings.media_chunk_size
+        self.endpoint = f"{whatsapp_service.api_url}/{whatsapp_service.phone_number_id}/media"
+        self._headers = {"Authorization": f"Bearer {whatsapp_service.access_token}"}
+        # (sha256, mime type) -> (media id, expiry on the monotonic clock)
+        self._media_ids: Dict[Tuple[str, str], Tuple[str, float]] = {}
+        # (path, size, mtime) -> sha256, so unchanged files are hashed once
+        self._hashes: Dict[Tuple[str, int, int], str] = {}
+        self._inflight: Dict[Tuple[str, str], "asyncio.Future[str]"] = {}
+        self.uploads = 0
+        self.cache_hits = 0
+
+    def resolve(self, relative_path: str) -> Path:
+        """
+        Absolute path of a file under ``media_root``
+
+        Raises:
+            InvalidMessageException: If the path escapes the root or does not exist
+        """
+        path = (self.media_root / relative_path).resolve()
+        if not path.is_relative_to(self.media_root):
+            raise InvalidMessageException("Media path must be inside the media root")
+        if not path.is_file():
+            raise InvalidMessageException(f"Media file not found: {relative_path}")
+        return path
+
+    async def upload(self, relative_path: str, mime_type: Optional[str] = None) -> str:
+        """
+        Media ID for a file under ``media_root``, uploading it if needed
+
+        Raises:
+            InvalidMessageException: If the file is missing or of unknown type
+            WhatsAppAPIException: If the upload fails
+        """
+        path = self.resolve(relative_path)
+        mime_type = mime_type or mimetypes.guess_type(path.name)[0]
+        if mime_type is None:
+            raise InvalidMessageException(f"Unknown media type for {relative_path}")
+
+        key = (await self._content_hash(path), mime_type)
+        cached = self._media_ids.get(key)
+        if cached is not None and cached[1] > time.monotonic():
+            self.cache_hits += 1
+            return cached[0]
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.cache_hits += 1
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            media_id = await self._post_media(path, mime_type)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting
+            future.exception()
+            raise
+        else:
+            self._media_ids[key] = (media_id, time.monotonic() + self.cache_ttl)
+            future.set_result(media_id)
+            return media_id
+        finally:
+            del self._inflight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "cached_media": sum(1 for _, expires_at in self._media_ids.values() if expires_at > now),
+            "uploads": self.uploads,
+            "cache_hits": self.cache_hits
+        }
+
+    async def _content_hash(self, path: Path) -> str:
+        stat = path.stat()
+        stat_key = (str(path), stat.st_size, stat.st_mtime_ns)
+        digest = self._hashes.get(stat_key)
+        if digest is None:
+            # Hashing is blocking file I/O; keep it off the event loop
+            digest = await asyncio.to_thread(file_sha256, path, self.chunk_size)
+            self._hashes[stat_key] = digest
+        return digest
+
+    async def _post_media(self, path: Path, mime_type: str) -> str:
+        """
+        Stream one file to the Graph API ``/media`` endpoint
+
+        Raises:
+            WhatsAppAPIException: If the request fails or the API rejects it
+        """
+        self.uploads += 1
+        try:
+            # httpx streams the multipart body from the open file in chunks
+            with open(path, "rb") as file:
+                response = await self.whatsapp_service.client.post(
+                    self.endpoint,
+                    data={"messaging_product": "whatsapp", "type": mime_type},
+                    files={"file": (path.name, file, mime_type)},
+                    headers=self._headers
+                )
+        except httpx.RequestError as e:
+            raise WhatsAppAPIException(
+                f"Error uploading media: {str(e)}",
+                log_message=f"Request Error: {str(e)}",
+                retryable=is_retryable_request_error(e)
+            )
+
+        if response.status_code != 200:
+            raise WhatsAppAPIException(
+                f"WhatsApp API error: {response.status_code} - {response.text}",
+                log_message=f"API Error: {response.status_code} - {response.text}",
+                api_status_code=response.status_code,
+                retryable=is_retryable_response(response.status_code)
+            )
+        return response.json()["id"]
@@ -0,0 +1,164 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from typing import List, Optional
+
+from app.config import settings
+from app.models import MessageLog
+from app.services.response_cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+def lease_deadline() -> datetime:
+    """
+    Time until which a message being sent is owned by its sender
+
+    Rows whose lease has expired are handed back to the queue, so a process
+    that dies mid-send does not strand its messages.
+    """
+    return datetime.utcnow() + timedelta(seconds=settings.queue_lease_seconds)
+
+async def claim_pending_messages(db: AsyncSession, limit: int) -> List[MessageLog]:
+    """
+    Atomically lease up to ``limit`` pending messages to the caller
+
+    On Postgres the rows are picked with ``FOR UPDATE SKIP LOCKED``, so any
+    number of workers and processes can claim concurrently without blocking
+    each other or claiming the same row twice.
+    """
+    claimable = (
+        select(MessageLog.id)
+        .where(
+            MessageLog.status == "pending",
+            or_(MessageLog.next_attempt_at.is_(None), MessageLog.next_attempt_at <= datetime.utcnow())
+        )
+        .order_by(MessageLog.created_at, MessageLog.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    result = await db.scalars(
+        update(MessageLog)
+        .where(MessageLog.id.in_(claimable.scalar_subquery()))
+        .values(status="sending", locked_until=lease_deadline())
+        .returning(MessageLog)
+        .execution_options(synchronize_session=False)
+    )
+    claimed = result.all()
+    await db.commit()
+    if claimed:
+        response_cache.invalidate()
+    return claimed
+
+async def release_expired_leases(db: AsyncSession) -> int:
+    """
+    Return messages whose sender died mid-send to the pending queue
+
+    Returns:
+        Number of messages released
+    """
+    result = await db.execute(
+        update(MessageLog)
+        .where(MessageLog.status == "sending", MessageLog.locked_until < datetime.utcnow())
+        .values(status="pending", locked_until=None)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    if result.rowcount:
+        response_cache.invalidate()
+    return result.rowcount
+
+class MessageWorkerPool:
+    """
+    Pool of async workers delivering messages from the ``message_logs`` queue
+    """
+    def __init__(
+        self,
+        whatsapp_service,
+        session_factory: async_sessionmaker,
+        workers: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        poll_interval: Optional[float] = None
+    ):
+        self.whatsapp_service = whatsapp_service
+        self.session_factory = session_factory
+        self.workers = workers or settings.queue_workers
+        self.batch_size = batch_size or settings.queue_batch_size
+        self.poll_interval = poll_interval or settings.queue_poll_interval
+        self._tasks: List[asyncio.Task] = []
+        self._reaper: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    def start(self) -> None:
+        """
+        Start the worker tasks and the lease reaper
+        """
+        self._tasks = [
+            asyncio.create_task(self._run_worker(), name=f"message-worker-{i}")
+            for i in range(self.workers)
+        ]
+        self._reaper = asyncio.create_task(self._run_reaper(), name="message-lease-reaper")
+
+    async def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop all workers, letting in-flight batches finish within ``timeout``
+
+        Messages of batches cut off by the timeout are recovered via their lease.
+        """
+        self._stopping = True
+        if self._reaper is not None:
+            self._reaper.cancel()
+        self.whatsapp_service.notify_enqueued()
+
+        if self._tasks:
+            _, pending = await asyncio.wait(
+                self._tasks, timeout=timeout if timeout is not None else settings.queue_shutdown_timeout
+            )
+            for task in pending:
+                task.cancel()
+        await asyncio.gather(*self._tasks, *filter(None, [self._reaper]), return_exceptions=True)
+        self._tasks = []
+        self._reaper = None
+
+    async def run_once(self) -> int:
+        """
+        Claim and deliver a single batch
+
+        Returns:
+            Number of messages delivered
+        """
+        async with self.session_factory() as db:
+            claimed = await claim_pending_messages(db, self.batch_size)
+            if claimed:
+                await self.whatsapp_service.deliver_claimed(db, claimed)
+            return len(claimed)
+
+    async def _run_worker(self) -> None:
+        while not self._stopping:
+            try:
+                delivered = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Message worker failed to process a batch")
+                delivered = 0
+
+            # Keep draining while there is work, otherwise sleep until woken
+            if delivered < self.batch_size and not self._stopping:
+                await self.whatsapp_service.wait_for_enqueue(self.poll_interval)
+
+    async def _run_reaper(self) -> None:
+        while True:
+            await asyncio.sleep(settings.queue_lease_seconds / 2)
+            try:
+                async with self.session_factory() as db:
+                    released = await release_expired_leases(db)
+                if released:
+                    logger.warning("Released %d messages with expired send leases", released)
+                    self.whatsapp_service.stats.record("pending", "sending", released)
+                    self.whatsapp_service.notify_enqueued()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Failed to release expired message leases")
@@ -0,0 +1,160 @@
+import asyncio
+import heapq
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from typing import List, Optional, Tuple
+
+from app.config import settings
+from app.models import MessageLog
+from app.services.response_cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+def spread_times(start: datetime, end: Optional[datetime], count: int) -> List[datetime]:
+    """
+    Send times for ``count`` messages spaced evenly over [start, end)
+
+    Without ``end`` every message is due at ``start``.
+    """
+    if end is None or count <= 1:
+        return [start] * count
+    step = (end - start) / count
+    return [start + step * index for index in range(count)]
+
+async def load_due_schedule(db: AsyncSession, until: datetime, limit: int) -> List[Tuple[datetime, int]]:
+    """
+    The earliest scheduled messages due before ``until``, as (time, id)
+    """
+    result = await db.execute(
+        select(MessageLog.scheduled_at, MessageLog.id)
+        .where(MessageLog.status == "scheduled", MessageLog.scheduled_at < until)
+        .order_by(MessageLog.scheduled_at, MessageLog.id)
+        .limit(limit)
+    )
+    return [tuple(row) for row in result]
+
+async def release_scheduled_messages(db: AsyncSession, log_ids: List[int]) -> int:
+    """
+    Hand scheduled messages to the queue as pending
+
+    Only rows still scheduled are moved, so processes releasing the same
+    messages concurrently move each one once.
+
+    Returns:
+        Number of messages released
+    """
+    result = await db.execute(
+        update(MessageLog)
+        .where(MessageLog.id.in_(log_ids), MessageLog.status == "scheduled")
+        .values(status="pending", next_attempt_at=None)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    if result.rowcount:
+        response_cache.invalidate()
+    return result.rowcount
+
+class MessageScheduler:
+    """
+    Moves scheduled messages into the outbound queue when they fall due
+
+    Only the next ``batch_size`` messages due within ``horizon`` seconds are
+    kept, in a heap ordered by send time, so memory stays flat however many
+    future sends are booked. The window is reloaded from the
+    (status, scheduled_at, id) index every ``refresh_interval`` seconds, when
+    the heap runs dry after a full load, and when this process schedules new
+    messages. Due messages become pending and are sent by the queue workers.
+    """
+    def __init__(
+        self,
+        whatsapp_service,
+        session_factory: async_sessionmaker,
+        horizon: Optional[float] = None,
+        refresh_interval: Optional[float] = None,
+        batch_size: Optional[int] = None
+    ):
+        self.whatsapp_service = whatsapp_service
+        self.session_factory = session_factory
+        self.horizon = horizon or settings.scheduler_horizon_seconds
+        self.refresh_interval = min(refresh_interval or settings.scheduler_refresh_interval, self.horizon)
+        self.batch_size = batch_size or settings.scheduler_batch_size
+        self._heap: List[Tuple[datetime, int]] = []
+        self._next_load: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run(), name="message-scheduler")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def pending(self) -> int:
+        """
+        Scheduled messages currently held in memory
+        """
+        return len(self._heap)
+
+    async def load(self, now: datetime) -> None:
+        """
+        Replace the in-memory window with the next due messages
+        """
+        async with self.session_factory() as db:
+            entries = await load_due_schedule(db, now + timedelta(seconds=self.horizon), self.batch_size)
+        # Rows come back in (time, id) order, which already satisfies the heap invariant
+        self._heap = entries
+        if len(entries) == self.batch_size:
+            # More may be due within the horizon; reload once this batch is released
+            self._next_load = min(entries[-1][0], now + timedelta(seconds=self.refresh_interval))
+        else:
+            self._next_load = now + timedelta(seconds=self.refresh_interval)
+
+    async def run_once(self, now: Optional[datetime] = None) -> int:
+        """
+        Reload the window if due and release every message whose time has come
+
+        Returns:
+            Number of messages released to the queue
+        """
+        now = now or datetime.utcnow()
+        if self._next_load is None or now >= self._next_load:
+            await self.load(now)
+
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap)[1])
+        if not due:
+            return 0
+
+        released = 0
+        for start in range(0, len(due), settings.bulk_db_batch_size):
+            async with self.session_factory() as db:
+                released += await release_scheduled_messages(db, due[start:start + settings.bulk_db_batch_size])
+        if released:
+            self.whatsapp_service.stats.record("pending", "scheduled", released)
+            self.whatsapp_service.notify_enqueued()
+        return released
+
+    def _sleep_time(self, now: datetime) -> float:
+        wake_at = self._next_load or now
+        if self._heap:
+            wake_at = min(wake_at, self._heap[0][0])
+        return max(0.0, (wake_at - now).total_seconds())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Message scheduler failed to release due messages")
+                self._next_load = None
+            timeout = self._sleep_time(datetime.utcnow()) if self._next_load is not None else self.refresh_interval
+            if await self.whatsapp_service.wait_for_schedule(timeout):
+                # Newly scheduled messages may be due before anything held
+                self._next_load = None
@@ -0,0 +1,107 @@
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from app.config import settings
+
+# Outcomes tracked in the sliding window
+WINDOW_EVENTS = ("sent", "failed")
+
+class SlidingWindowCounter:
+    """
+    Event counts over the last ``window`` seconds in per-second buckets
+
+    Recording is O(1); buckets older than the window are reset lazily when
+    their slot is reused.
+    """
+    def __init__(self, window: int):
+        self.window = window
+        self._counts = [0] * window
+        self._seconds = [0] * window
+
+    def add(self, count: int = 1, now: Optional[float] = None) -> None:
+        second = int(time.time() if now is None else now)
+        slot = second % self.window
+        if self._seconds[slot] != second:
+            self._seconds[slot] = second
+            self._counts[slot] = 0
+        self._counts[slot] += count
+
+    def total(self, seconds: int, now: Optional[float] = None) -> int:
+        """
+        Events in the last ``seconds`` seconds, including the current one
+        """
+        current = int(time.time() if now is None else now)
+        oldest = current - min(seconds, self.window) + 1
+        return sum(
+            count for second, count in zip(self._seconds, self._counts) if oldest <= second <= current
+        )
+
+    def per_minute(self, now: Optional[float] = None) -> List[int]:
+        """
+        Events in each whole minute of the window, oldest first
+        """
+        current = int(time.time() if now is None else now)
+        minutes = [0] * (self.window // 60)
+        current_minute = current // 60
+        for second, count in zip(self._seconds, self._counts):
+            age = current_minute - second // 60
+            if 0 <= age < len(minutes) and second <= current:
+                minutes[-1 - age] += count
+        return minutes
+
+class MessageStats:
+    """
+    In-process message counters maintained on every status transition
+
+    ``counts`` mirrors the number of message logs per status; it is seeded
+    and periodically corrected from the hourly rollup by the log maintenance
+    pass (which also picks up transitions made by other processes and by the
+    webhook). Reading the stats never touches the database.
+    """
+    def __init__(self, window_minutes: Optional[int] = None):
+        window = 60 * (window_minutes or settings.stats_window_minutes)
+        self.counts: Dict[str, int] = {}
+        self.windows = {event: SlidingWindowCounter(window) for event in WINDOW_EVENTS}
+        self.reconciled_at: Optional[datetime] = None
+
+    def record(self, new_status: str, old_status: Optional[str] = None, count: int = 1) -> None:
+        """
+        Count ``count`` messages moving from ``old_status`` (None for new
+        messages) to ``new_status``
+        """
+        if count <= 0:
+            return
+        if old_status is not None:
+            self.counts[old_status] = max(0, self.counts.get(old_status, 0) - count)
+        self.counts[new_status] = self.counts.get(new_status, 0) + count
+        window = self.windows.get(new_status)
+        if window is not None:
+            window.add(count)
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.time()
+        window_start = int(now) // 60 - self.windows["sent"].window // 60 + 1
+        per_minute = {event: window.per_minute(now) for event, window in self.windows.items()}
+        return {
+            "counts": dict(self.counts),
+            "last_minute": {event: window.total(60, now) for event, window in self.windows.items()},
+            "per_minute": [
+                {
+                    "minute": datetime.utcfromtimestamp((window_start + index) * 60).isoformat(),
+                    **{event: per_minute[event][index] for event in WINDOW_EVENTS}
+                }
+                for index in range(len(per_minute["sent"]))
+            ],
+            "reconciled_at": self.reconciled_at.isoformat() if self.reconciled_at else None
+        }
+
+    def reconcile(self, counts: Dict[str, int]) -> None:
+        """
+        Replace the status counts with totals read from the database
+        """
+        self.counts = dict(counts)
+        self.reconciled_at = datetime.utcnow()
+
+# Counters shared by every service instance in this process
+message_stats = MessageStats()
@@ -0,0 +1,207 @@
+import json
+from typing import Dict, Any, List, Optional
+
+from app.config import settings
+from app.exceptions import InvalidMessageException
+
+DEFAULT_MESSAGE = "Hello, this is a test message from our TMBC bot!"
+
+MEDIA_TYPES = ("image", "document")
+TEMPLATE_HEADER_FORMATS = ("text", "image", "document")
+
+class CompiledMessage:
+    """
+    Message payload serialized once, with only the recipient left open
+
+    The content (everything but ``to``) is encoded to JSON when the message is
+    compiled; each send splices the recipient into the cached bytes instead of
+    rebuilding and re-encoding the whole payload.
+    """
+    __slots__ = ("content", "summary", "_prefix")
+
+    def __init__(self, content: Dict[str, Any], summary: str):
+        self.content = content
+        self.summary = summary
+        body = json.dumps(
+            {"messaging_product": "whatsapp", "recipient_type": "individual", **content},
+            separators=(",", ":")
+        )
+        self._prefix = (body[:-1] + ',"to":').encode()
+
+    def render(self, recipient_phone: str) -> bytes:
+        """
+        Request body for one recipient
+        """
+        return self._prefix + json.dumps(recipient_phone).encode() + b"}"
+
+    def to_json(self) -> str:
+        """
+        Content as stored on the message log, for queued delivery
+        """
+        return json.dumps(self.content, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, stored: str, summary: str = "") -> "CompiledMessage":
+        return cls(json.loads(stored), summary)
+
+def text_message(body: str, preview_url: bool = False) -> CompiledMessage:
+    """
+    Free-form text message
+    """
+    return CompiledMessage({"type": "text", "text": {"preview_url": preview_url, "body": body}}, body)
+
+def media_message(
+    media_type: str,
+    media_id: Optional[str] = None,
+    link: Optional[str] = None,
+    caption: Optional[str] = None,
+    filename: Optional[str] = None
+) -> CompiledMessage:
+    """
+    Image or document message, referencing an uploaded media ID or a public link
+    """
+    if media_type not in MEDIA_TYPES:
+        raise InvalidMessageException(f"Unsupported media type: {media_type}")
+    if bool(media_id) == bool(link):
+        raise InvalidMessageException("Exactly one of media_id or link is required")
+    if filename and media_type != "document":
+        raise InvalidMessageException("filename is only supported for documents")
+
+    media = {"id": media_id} if media_id else {"link": link}
+    if caption:
+        media["caption"] = caption
+    if filename:
+        media["filename"] = filename
+    return CompiledMessage({"type": media_type, media_type: media}, caption or f"[{media_type}] {media_id or link}")
+
+class MessageTemplate:
+    """
+    Approved WhatsApp message template
+
+    Name, language and header are encoded into the template skeleton when it
+    is registered; a send only supplies the body parameters (and the header
+    value for templates with a variable header).
+    """
+    def __init__(
+        self,
+        name: str,
+        language: str = "en_US",
+        body_parameters: int = 0,
+        header_format: Optional[str] = None
+    ):
+        if header_format is not None and header_format not in TEMPLATE_HEADER_FORMATS:
+            raise InvalidMessageException(f"Unsupported template header format: {header_format}")
+        self.name = name
+        self.language = language
+        self.body_parameters = body_parameters
+        self.header_format = header_format
+        self._skeleton = {"name": name, "language": {"code": language}}
+
+    def compile(self, parameters: Optional[List[str]] = None, header: Optional[str] = None) -> CompiledMessage:
+        """
+        Fill in the parameters of one send
+
+        Raises:
+            InvalidMessageException: If the parameters do not match the template
+        """
+        parameters = parameters or []
+        if len(parameters) != self.body_parameters:
+            raise InvalidMessageException(
+                f"Template {self.name} expects {self.body_parameters} parameters, got {len(parameters)}"
+            )
+        if bool(header) != (self.header_format is not None):
+            raise InvalidMessageException(
+                f"Template {self.name} " + ("requires a header value" if self.header_format else "has no variable header")
+            )
+
+        components = []
+        if header:
+            if self.header_format == "text":
+                header_parameter = {"type": "text", "text": header}
+            else:
+                header_parameter = {"type": self.header_format, self.header_format: {"link": header}}
+            components.append({"type": "header", "parameters": [header_parameter]})
+        if parameters:
+            components.append({
+                "type": "body",
+                "parameters": [{"type": "text", "text": str(value)} for value in parameters]
+            })
+
+        template = dict(self._skeleton)
+        if components:
+            template["components"] = components
+        summary = f"[template] {self.name}" + (f" ({', '.join(map(str, parameters))})" if parameters else "")
+        return CompiledMessage({"type": "template", "template": template}, summary)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "language": self.language,
+            "body_parameters": self.body_parameters,
+            "header_format": self.header_format
+        }
+
+class TemplateRegistry:
+    """
+    Templates known to this process, keyed by name
+    """
+    def __init__(self):
+        self._templates: Dict[str, MessageTemplate] = {}
+
+    @classmethod
+    def from_settings(cls) -> "TemplateRegistry":
+        registry = cls()
+        for name, definition in settings.message_templates.items():
+            registry.register(MessageTemplate(name, **definition))
+        return registry
+
+    def register(self, template: MessageTemplate) -> MessageTemplate:
+        self._templates[template.name] = template
+        return template
+
+    def get(self, name: str) -> MessageTemplate:
+        """
+        Raises:
+            InvalidMessageException: If no template with this name is registered
+        """
+        template = self._templates.get(name)
+        if template is None:
+            raise InvalidMessageException(f"Unknown message template: {name}")
+        return template
+
+    def all(self) -> List[MessageTemplate]:
+        return list(self._templates.values())
+
+template_registry = TemplateRegistry.from_settings()
+
+# The message sent when a request does not specify one
+DEFAULT_TEXT_MESSAGE = text_message(DEFAULT_MESSAGE)
+
+def compile_message(spec: Optional[Dict[str, Any]]) -> CompiledMessage:
+    """
+    Compile a message specification from a request
+
+    Args:
+        spec: Dictionary with a ``type`` of text, template, image or document
+            and the fields of that type; ``None`` selects the default message
+
+    Raises:
+        InvalidMessageException: If the specification is incomplete or unknown
+    """
+    if not spec:
+        return DEFAULT_TEXT_MESSAGE
+
+    message_type = spec.get("type", "text")
+    if message_type == "text":
+        if not spec.get("text"):
+            raise InvalidMessageException("text is required for text messages")
+        return text_message(spec["text"], spec.get("preview_url", False))
+    if message_type == "template":
+        if not spec.get("template"):
+            raise InvalidMessageException("template is required for template messages")
+        return template_registry.get(spec["template"]).compile(spec.get("parameters"), spec.get("header"))
+    if message_type in MEDIA_TYPES:
+        return media_message(
+            message_type, spec.get("media_id"), spec.get("link"), spec.get("caption"), spec.get("filename")
+        )
+    raise InvalidMessageException(f"Unsupported message type: {message_type}")
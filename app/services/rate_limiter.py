@@ -0,0 +1,200 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+from app.config import settings
+from app.exceptions import WhatsAppAPIException
+
+# Graph API error codes signalling throttling rather than a bad request
+THROTTLING_ERROR_CODES = {4, 80007, 130429, 131048, 131056}
+PAIR_RATE_LIMIT_ERROR_CODE = 131056
+
+class TokenBucket:
+    """
+    Token bucket that hands out send slots at a steady rate
+
+    Callers reserve a slot and sleep until it is due, so concurrent senders are
+    queued in FIFO order and paced at ``rate`` instead of bursting and failing.
+    """
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def delay(self, now: Optional[float] = None) -> float:
+        """
+        Seconds until a slot would be available, without reserving it
+        """
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+        return max(wait, self.paused_until - now)
+
+    def reserve(self, now: Optional[float] = None) -> float:
+        """
+        Reserve the next slot and return how long to wait for it
+        """
+        now = time.monotonic() if now is None else now
+        wait = self.delay(now)
+        self.tokens -= 1
+        return wait
+
+    def set_rate(self, rate: float) -> None:
+        self._refill(time.monotonic())
+        self.rate = rate
+
+    def pause(self, seconds: float) -> None:
+        """
+        Hand out no slots for ``seconds`` (e.g. after a Retry-After)
+        """
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+class AdaptiveRateLimiter:
+    """
+    Client-side pacing of Graph API sends
+
+    Keeps one bucket per sender (``phone_number_id``) sized to its messaging
+    tier, plus a bounded set of per-recipient buckets for the pair rate limit.
+    Sender rates back off multiplicatively when the API throttles and recover
+    additively while responses are healthy.
+    """
+    def __init__(
+        self,
+        rate: float,
+        burst: float,
+        recipient_rate: float,
+        recipient_burst: float,
+        sender_rates: Optional[Dict[str, float]] = None,
+        min_rate: float = 1.0,
+        decrease_factor: float = 0.5,
+        recovery_step: float = 0.5,
+        max_wait: float = 30.0,
+        max_recipients: int = 100000
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.recipient_rate = recipient_rate
+        self.recipient_burst = recipient_burst
+        self.sender_rates = sender_rates or {}
+        self.min_rate = min_rate
+        self.decrease_factor = decrease_factor
+        self.recovery_step = recovery_step
+        self.max_wait = max_wait
+        self.max_recipients = max_recipients
+        self._senders: Dict[str, TokenBucket] = {}
+        self._recipients: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self.throttled_count = 0
+
+    @classmethod
+    def from_settings(cls) -> "AdaptiveRateLimiter":
+        return cls(
+            rate=settings.rate_limit_per_second,
+            burst=settings.rate_limit_burst,
+            recipient_rate=settings.rate_limit_recipient_per_second,
+            recipient_burst=settings.rate_limit_recipient_burst,
+            sender_rates=settings.rate_limit_sender_overrides,
+            min_rate=settings.rate_limit_min_per_second,
+            max_wait=settings.rate_limit_max_wait
+        )
+
+    def max_rate(self, sender_id: str) -> float:
+        """
+        Configured tier rate of a sender
+        """
+        return self.sender_rates.get(sender_id, self.rate)
+
+    def _sender_bucket(self, sender_id: str) -> TokenBucket:
+        bucket = self._senders.get(sender_id)
+        if bucket is None:
+            rate = self.max_rate(sender_id)
+            bucket = self._senders[sender_id] = TokenBucket(rate, min(self.burst, rate))
+        return bucket
+
+    def _recipient_bucket(self, recipient: str) -> TokenBucket:
+        bucket = self._recipients.get(recipient)
+        if bucket is None:
+            bucket = self._recipients[recipient] = TokenBucket(self.recipient_rate, self.recipient_burst)
+            # Least recently used recipients are forgotten; a fresh bucket is full anyway
+            if len(self._recipients) > self.max_recipients:
+                self._recipients.popitem(last=False)
+        else:
+            self._recipients.move_to_end(recipient)
+        return bucket
+
+    async def acquire(self, sender_id: str, recipient: str) -> None:
+        """
+        Wait for a send slot for ``recipient`` through ``sender_id``
+
+        Raises:
+            WhatsAppAPIException: If the slot is further away than ``max_wait``
+        """
+        now = time.monotonic()
+        sender_bucket = self._sender_bucket(sender_id)
+        recipient_bucket = self._recipient_bucket(recipient)
+
+        # Refuse before reserving so a long queue is not left holding slots
+        wait = max(sender_bucket.delay(now), recipient_bucket.delay(now))
+        if wait > self.max_wait:
+            raise WhatsAppAPIException(
+                f"Rate limit exceeded for {recipient}, next slot in {wait:.1f}s",
+                api_status_code=429,
+                retry_after=wait,
+                retryable=True
+            )
+
+        recipient_bucket.reserve(now)
+        wait = max(wait, sender_bucket.reserve(now))
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def on_success(self, sender_id: str) -> None:
+        """
+        Speed a throttled sender back up towards its tier rate
+        """
+        bucket = self._sender_bucket(sender_id)
+        max_rate = self.max_rate(sender_id)
+        if bucket.rate < max_rate:
+            bucket.set_rate(min(max_rate, bucket.rate + self.recovery_step))
+
+    def on_throttled(self, sender_id: str, retry_after: Optional[float] = None, recipient: Optional[str] = None) -> None:
+        """
+        Slow a sender down after a 429 / throttling error
+
+        Args:
+            sender_id: The sender that was throttled
+            retry_after: Seconds from the ``Retry-After`` header, if any
+            recipient: Set when only the recipient pair was throttled
+        """
+        self.throttled_count += 1
+        if recipient is not None:
+            self._recipient_bucket(recipient).pause(retry_after or 1 / self.recipient_rate)
+            return
+
+        bucket = self._sender_bucket(sender_id)
+        bucket.set_rate(max(self.min_rate, bucket.rate * self.decrease_factor))
+        if retry_after:
+            bucket.pause(retry_after)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Current pacing state per sender
+        """
+        return {
+            "throttled_count": self.throttled_count,
+            "tracked_recipients": len(self._recipients),
+            "senders": {
+                sender_id: {
+                    "rate": round(bucket.rate, 3),
+                    "max_rate": self.max_rate(sender_id),
+                    "paused_for": round(max(0.0, bucket.paused_until - time.monotonic()), 3)
+                }
+                for sender_id, bucket in self._senders.items()
+            }
+        }
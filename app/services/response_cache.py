@@ -0,0 +1,107 @@
+import hashlib
+import time
+import orjson
+from fastapi import Request, Response, status
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+
+from app.config import settings
+
+class CachedResponse(NamedTuple):
+    """
+    Serialized body of a read endpoint, with its ETag and extra headers
+    """
+    body: bytes
+    etag: str
+    headers: Dict[str, str]
+    expires_at: float
+
+class ResponseCache:
+    """
+    Short-lived cache of JSON read responses, keyed by path and query string
+
+    Entries live for ``ttl`` seconds and the whole cache is emptied whenever
+    this process writes message logs, so polling clients see their own
+    process's writes at once and other workers' writes within ``ttl``. A
+    response built while a write landed is served but not stored. ETags are
+    derived from the body, so ``If-None-Match`` also matches across workers
+    and after an entry expired.
+    """
+    def __init__(self, ttl: Optional[float] = None, max_entries: Optional[int] = None):
+        self.ttl = settings.response_cache_ttl if ttl is None else ttl
+        self.max_entries = max_entries or settings.response_cache_max_entries
+        self._entries: Dict[str, CachedResponse] = {}
+        self._generation = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def generation(self) -> int:
+        """
+        Count of invalidations, read before building a response for ``put``
+        """
+        return self._generation
+
+    def invalidate(self) -> None:
+        """
+        Drop every entry, called after message logs change
+        """
+        self._generation += 1
+        self._entries.clear()
+
+    def get(self, key: str, now: Optional[float] = None) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= (time.monotonic() if now is None else now):
+            del self._entries[key]
+            return None
+        return entry
+
+    def put(self, key: str, content: Any, headers: Dict[str, str], generation: int) -> CachedResponse:
+        """
+        Serialize a response, storing it unless the cache was invalidated
+        since ``generation`` was read
+        """
+        body = orjson.dumps(content)
+        entry = CachedResponse(body, _etag(body), headers, time.monotonic() + self.ttl)
+        if self.ttl > 0 and generation == self._generation:
+            if len(self._entries) >= self.max_entries:
+                # Insertion order: the first entry is the oldest
+                del self._entries[next(iter(self._entries))]
+            self._entries[key] = entry
+        return entry
+
+    async def respond(
+        self,
+        request: Request,
+        build: Callable[[], Awaitable[Tuple[Any, Dict[str, str]]]]
+    ) -> Response:
+        """
+        Serve a read endpoint from the cache, calling ``build`` for the
+        content and extra headers on a miss; 304 when the client's ETag matches
+        """
+        key = f"{request.url.path}?{'&'.join(sorted(request.url.query.split('&')))}"
+        entry = self.get(key)
+        if entry is None:
+            generation = self.generation
+            content, headers = await build()
+            entry = self.put(key, content, headers, generation)
+
+        headers = {**entry.headers, "ETag": entry.etag}
+        if _etag_matches(request.headers.get("if-none-match"), entry.etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(entry.body, media_type="application/json", headers=headers)
+
+def _etag(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Whether an If-None-Match header matches the ETag (weak comparison)
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+response_cache = ResponseCache()
@@ -0,0 +1,87 @@
+import random
+import httpx
+from datetime import datetime, timedelta
+from typing import Optional
+
+from app.config import settings
+from app.exceptions import WhatsAppAPIException
+from app.services.rate_limiter import THROTTLING_ERROR_CODES
+
+# Graph API responses worth retrying: throttling, server errors and the
+# generic "temporary" error codes
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+RETRYABLE_ERROR_CODES = THROTTLING_ERROR_CODES | {1, 2, 131000}
+
+# Transport failures worth retrying: timeouts, connection resets and
+# connections dropped by the server
+RETRYABLE_REQUEST_ERRORS = (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)
+
+def is_retryable_response(status_code: int, error_code: Optional[int] = None) -> bool:
+    """
+    Whether a failed Graph API response is transient
+    """
+    return status_code in RETRYABLE_STATUS_CODES or error_code in RETRYABLE_ERROR_CODES
+
+def is_retryable_request_error(error: httpx.RequestError) -> bool:
+    """
+    Whether a transport error is transient
+    """
+    return isinstance(error, RETRYABLE_REQUEST_ERRORS)
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter and a cap on attempts
+
+    ``inline_attempts`` and ``inline_max_delay`` bound the retries made while
+    a synchronous caller waits; queued messages use the full budget.
+    """
+    def __init__(
+        self,
+        max_attempts: int,
+        base_delay: float,
+        max_delay: float,
+        inline_attempts: int = 1,
+        inline_max_delay: float = 0.0,
+        jitter: bool = True
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.inline_attempts = min(inline_attempts, max_attempts)
+        self.inline_max_delay = inline_max_delay
+        self.jitter = jitter
+
+    @classmethod
+    def from_settings(cls) -> "RetryPolicy":
+        return cls(
+            max_attempts=settings.retry_max_attempts,
+            base_delay=settings.retry_base_delay,
+            max_delay=settings.retry_max_delay,
+            inline_attempts=settings.retry_inline_attempts,
+            inline_max_delay=settings.retry_inline_max_delay
+        )
+
+    def should_retry(self, error: WhatsAppAPIException, attempts: int) -> bool:
+        """
+        Whether another attempt should follow ``attempts`` failed ones
+        """
+        return error.retryable and attempts < self.max_attempts
+
+    def backoff(self, attempts: int, error: Optional[WhatsAppAPIException] = None) -> float:
+        """
+        Delay in seconds before the attempt following ``attempts`` failed ones
+
+        A ``Retry-After`` hint on the error is honoured as a lower bound.
+        """
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        if error is not None and error.retry_after:
+            delay = max(delay, error.retry_after)
+        return delay
+
+    def next_attempt_at(self, attempts: int, error: Optional[WhatsAppAPIException] = None) -> datetime:
+        """
+        Point in time for the next attempt of a queued message
+        """
+        return datetime.utcnow() + timedelta(seconds=self.backoff(attempts, error))
@@ -0,0 +1,163 @@
+import hashlib
+import math
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.exceptions import CircuitOpenException
+from app.services.circuit_breaker import CircuitBreaker
+
+ROUTING_POLICIES = ("sticky", "least_loaded", "weighted")
+
+class Sender:
+    """
+    One sending phone number with its credentials, load and circuit breaker
+    """
+    def __init__(
+        self,
+        api_url: str,
+        phone_number_id: str,
+        access_token: str,
+        weight: float = 1.0,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        self.phone_number_id = phone_number_id
+        self.weight = weight
+        self.breaker = breaker or CircuitBreaker()
+        # Endpoint and headers are the same for every send through this number
+        self.messages_endpoint = f"{api_url}/{phone_number_id}/messages"
+        self.headers = {
+            "Authorization": f"Bearer {access_token}",
+            "Content-Type": "application/json"
+        }
+        self.in_flight = 0
+        self.sent = 0
+        self.failed = 0
+        # Smooth weighted round robin state
+        self._current_weight = 0.0
+
+class SenderPool:
+    """
+    Routes each message to one of several sender phone numbers
+
+    Policies:
+        - ``sticky``: a recipient always goes through the same sender, chosen
+          by weighted rendezvous hashing, so every process agrees without
+          shared state and an open circuit only moves that sender's recipients
+        - ``least_loaded``: the sender with the fewest sends in flight
+          (including those waiting on the rate limiter) per unit of weight
+        - ``weighted``: smooth weighted round robin
+
+    Senders whose circuit breaker is open are skipped. Only transport errors
+    and server errors count against a sender; rejected messages and
+    throttling show that it is reachable. When no sender's circuit lets a
+    call through, sends fail fast with ``CircuitOpenException``.
+    """
+    def __init__(self, senders: List[Sender], policy: Optional[str] = None):
+        if not senders:
+            raise ValueError("A sender pool needs at least one sender")
+        self.senders = senders
+        self.policy = policy or settings.sender_routing
+        if self.policy not in ROUTING_POLICIES:
+            raise ValueError(f"Unknown sender routing policy: {self.policy}")
+
+    @classmethod
+    def from_settings(cls, api_url: str, phone_number_id: str, access_token: str) -> "SenderPool":
+        """
+        The primary sender plus any configured in ``whatsapp_senders``
+        """
+        senders = [Sender(api_url, phone_number_id, access_token)]
+        for config in settings.whatsapp_senders:
+            senders.append(Sender(
+                api_url,
+                config["phone_number_id"],
+                config.get("access_token") or access_token,
+                float(config.get("weight", 1.0))
+            ))
+        return cls(senders)
+
+    @property
+    def primary(self) -> Sender:
+        return self.senders[0]
+
+    def accepting(self) -> bool:
+        """
+        Whether any sender's circuit would let a call through
+        """
+        return any(sender.breaker.available() for sender in self.senders)
+
+    def choose(self, recipient: str) -> Sender:
+        """
+        Sender for a message to ``recipient``, reserving a call on its circuit
+        
+        Raises:
+            CircuitOpenException: If no sender's circuit lets a call through
+        """
+        candidates = [sender for sender in self.senders if sender.breaker.available()]
+        if not candidates:
+            raise CircuitOpenException(min(sender.breaker.retry_after() for sender in self.senders))
+        if len(candidates) == 1:
+            sender = candidates[0]
+        elif self.policy == "sticky":
+            sender = self._rendezvous(recipient, candidates)
+        elif self.policy == "least_loaded":
+            sender = min(candidates, key=lambda sender: ((sender.in_flight + 1) / sender.weight, sender.sent / sender.weight))
+        else:
+            sender = self._weighted_round_robin(candidates)
+        sender.breaker.acquire()
+        return sender
+
+    def on_success(self, sender: Sender) -> None:
+        sender.sent += 1
+        sender.breaker.record_success()
+
+    def on_rejected(self, sender: Sender) -> None:
+        """
+        Count a rejected or throttled message; the sender itself is reachable
+        """
+        sender.failed += 1
+        sender.breaker.record_success()
+
+    def on_failure(self, sender: Sender) -> None:
+        """
+        Count a failure that says something about the sender's health
+        """
+        sender.failed += 1
+        sender.breaker.record_failure()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "policy": self.policy,
+            "senders": {
+                sender.phone_number_id: {
+                    "weight": sender.weight,
+                    "in_flight": sender.in_flight,
+                    "sent": sender.sent,
+                    "failed": sender.failed,
+                    "circuit": sender.breaker.stats()
+                }
+                for sender in self.senders
+            }
+        }
+
+    def _rendezvous(self, recipient: str, candidates: List[Sender]) -> Sender:
+        key = recipient.encode()
+        best, best_score = candidates[0], -math.inf
+        for sender in candidates:
+            digest = hashlib.blake2b(key, digest_size=8, key=sender.phone_number_id.encode()[:64]).digest()
+            # Uniform in (0, 1); -weight / ln(u) gives weighted rendezvous scores
+            unit = (int.from_bytes(digest, "big") + 1) / (2 ** 64 + 1)
+            score = -sender.weight / math.log(unit)
+            if score > best_score:
+                best, best_score = sender, score
+        return best
+
+    def _weighted_round_robin(self, candidates: List[Sender]) -> Sender:
+        total = 0.0
+        best = candidates[0]
+        for sender in candidates:
+            sender._current_weight += sender.weight
+            total += sender.weight
+            if sender._current_weight > best._current_weight:
+                best = sender
+        best._current_weight -= total
+        return best
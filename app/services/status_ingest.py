@@ -0,0 +1,257 @@
+import asyncio
+import logging
+import time
+from sqlalchemy import Integer, String, Text, bindparam, case, column, func, select, update, values
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from typing import Dict, Any, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from app.config import settings
+from app.models import MessageLog
+from app.services.log_writer import LogWriter
+from app.services.response_cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+# Order of message states; a webhook only ever moves a message forward, so
+# late or replayed events cannot turn "read" back into "delivered"
+STATUS_RANKS = {
+    "pending": 0,
+    "sending": 1,
+    "sent": 2,
+    "delivered": 3,
+    "read": 4,
+    "failed": 5,
+}
+
+class StatusEvent(NamedTuple):
+    """
+    Delivery status reported by the Graph API webhook for one message
+    """
+    wamid: str
+    status: str
+    error_message: Optional[str] = None
+
+def parse_status_events(payload: Dict[str, Any]) -> List[StatusEvent]:
+    """
+    Extract the message status events from a webhook notification
+
+    Statuses the service does not track (e.g. "deleted") are ignored.
+    """
+    events = []
+    for entry in payload.get("entry") or []:
+        for change in entry.get("changes") or []:
+            for status in (change.get("value") or {}).get("statuses") or []:
+                wamid, state = status.get("id"), status.get("status")
+                if not wamid or state not in STATUS_RANKS:
+                    continue
+                error = (status.get("errors") or [{}])[0]
+                error_message = error.get("message") or error.get("title")
+                if error_message and error.get("code") is not None:
+                    error_message = f"Webhook Error: {error['code']} - {error_message}"
+                events.append(StatusEvent(wamid, state, error_message))
+    return events
+
+class StatusIngestor:
+    """
+    Buffers webhook status events and writes them to ``message_logs`` in batches
+
+    Events are collapsed per message in memory (only the most advanced state
+    is kept) and flushed every ``flush_interval`` seconds, or as soon as
+    ``max_buffered`` messages are waiting, in statements of up to
+    ``batch_size`` rows within a single transaction.
+
+    A status can arrive before the row carrying its wamid is written, e.g.
+    while a write-behind log or a queued send's outcome is still in flight.
+    Pending rows of this process's log writer are flushed first; events that
+    still match no row are held and retried on later flushes for
+    ``retry_window`` seconds before they are dropped.
+    """
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        flush_interval: Optional[float] = None,
+        batch_size: Optional[int] = None,
+        max_buffered: Optional[int] = None,
+        log_writer: Optional[LogWriter] = None,
+        retry_window: Optional[float] = None
+    ):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval or settings.webhook_flush_interval
+        self.batch_size = batch_size or settings.webhook_flush_batch_size
+        self.max_buffered = max_buffered or settings.webhook_buffer_max
+        self.log_writer = log_writer
+        self.retry_window = settings.webhook_unmatched_retry_seconds if retry_window is None else retry_window
+        self._buffer: Dict[str, StatusEvent] = {}
+        # Events that matched no message log yet, with the time they are given up
+        self._unmatched: Dict[str, Tuple[StatusEvent, float]] = {}
+        self._flush_requested = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.received = 0
+        self.updated = 0
+        self.dropped = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def add(self, events: Iterable[StatusEvent]) -> None:
+        """
+        Buffer events for the next flush; never touches the database
+        """
+        for event in events:
+            self.received += 1
+            self._merge(event)
+        if len(self._buffer) >= self.max_buffered:
+            self._flush_requested.set()
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run(), name="webhook-status-flusher")
+
+    async def stop(self) -> None:
+        """
+        Stop the flusher and write whatever is still buffered
+        """
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> int:
+        """
+        Write all buffered events
+
+        Returns:
+            Number of message logs updated
+        """
+        async with self._flush_lock:
+            if not self._buffer and not self._unmatched:
+                return 0
+            if self.log_writer is not None and self.log_writer.pending:
+                await self.log_writer.flush()
+            unmatched, self._unmatched = self._unmatched, {}
+            for event, _ in unmatched.values():
+                self._merge(event)
+            events, self._buffer = list(self._buffer.values()), {}
+            try:
+                async with self.session_factory() as db:
+                    updated = 0
+                    missing: Set[str] = set()
+                    for start in range(0, len(events), self.batch_size):
+                        batch = events[start:start + self.batch_size]
+                        applied = await apply_status_events(db, batch)
+                        updated += applied
+                        if applied < len(batch):
+                            missing |= await find_unmatched_wamids(db, batch)
+                    await db.commit()
+            except Exception:
+                # Keep the events for the next flush, unless newer ones arrived meanwhile
+                for event in events:
+                    self._merge(event)
+                self._unmatched.update(unmatched)
+                raise
+            response_cache.invalidate()
+            self.updated += updated
+            self._hold_unmatched([event for event in events if event.wamid in missing], unmatched)
+            return updated
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "buffered": len(self._buffer),
+            "unmatched": len(self._unmatched),
+            "received": self.received,
+            "updated": self.updated,
+            "dropped": self.dropped
+        }
+
+    def _hold_unmatched(self, events: List[StatusEvent], previous: Dict[str, Tuple[StatusEvent, float]]) -> None:
+        """
+        Keep events that matched no message log for a later flush, until
+        their retry window runs out
+        """
+        now = time.monotonic()
+        for event in events:
+            give_up_at = previous[event.wamid][1] if event.wamid in previous else now + self.retry_window
+            if give_up_at > now:
+                self._unmatched[event.wamid] = (event, give_up_at)
+            else:
+                self.dropped += 1
+
+    def _merge(self, event: StatusEvent) -> None:
+        current = self._buffer.get(event.wamid)
+        if current is None or STATUS_RANKS[event.status] > STATUS_RANKS[current.status]:
+            self._buffer[event.wamid] = event
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Failed to write webhook status events")
+
+async def find_unmatched_wamids(db: AsyncSession, events: List[StatusEvent]) -> Set[str]:
+    """
+    wamids of events that no message log carries (yet)
+    """
+    wamids = [event.wamid for event in events]
+    found = await db.scalars(select(MessageLog.wa_message_id).where(MessageLog.wa_message_id.in_(wamids)))
+    return set(wamids).difference(found)
+
+async def apply_status_events(db: AsyncSession, events: List[StatusEvent]) -> int:
+    """
+    Apply status events to their message logs
+
+    Rows are matched on their indexed ``wa_message_id`` and only
+    moved to a more advanced status. Postgres gets a single
+    ``UPDATE ... FROM (VALUES ...)``; other databases, which lack column
+    aliases on VALUES, get one executemany of the same update.
+
+    Returns:
+        Number of message logs updated
+    """
+    if not events:
+        return 0
+    current_rank = case(STATUS_RANKS, value=MessageLog.status, else_=0)
+    rows = [
+        {"b_wamid": event.wamid, "b_status": event.status, "b_rank": STATUS_RANKS[event.status], "b_error": event.error_message}
+        for event in events
+    ]
+
+    if db.bind.dialect.name == "postgresql":
+        event_rows = values(
+            column("wamid", String),
+            column("status", String),
+            column("status_rank", Integer),
+            column("error_message", Text),
+            name="events"
+        ).data([tuple(row.values()) for row in rows])
+        result = await db.execute(
+            update(MessageLog)
+            .where(MessageLog.wa_message_id == event_rows.c.wamid, current_rank < event_rows.c.status_rank)
+            .values(
+                status=event_rows.c.status,
+                error_message=func.coalesce(event_rows.c.error_message, MessageLog.error_message)
+            )
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+    message_logs = MessageLog.__table__
+    result = await db.execute(
+        update(message_logs)
+        .where(message_logs.c.wa_message_id == bindparam("b_wamid"), current_rank < bindparam("b_rank"))
+        .values(
+            status=bindparam("b_status"),
+            error_message=func.coalesce(bindparam("b_error", type_=Text), message_logs.c.error_message)
+        ),
+        rows
+    )
+    return result.rowcount
@@ -0,0 +1,205 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.config import settings
+from app.models import SuppressedNumber
+
+logger = logging.getLogger(__name__)
+
+SUPPRESSION_REASONS = ("opt_out", "invalid")
+
+# Graph API error code for recipients that cannot receive WhatsApp messages
+UNDELIVERABLE_ERROR_CODES = {131026}
+
+class SuppressionList:
+    """
+    In-memory mirror of the ``suppressed_numbers`` table
+
+    Numbers are held as E.164 strings in a plain set. A check is a single
+    hash lookup on a string whose hash is already cached (numbers come from
+    the validation cache), so it stays well under a microsecond with millions
+    of entries, at roughly 100 bytes per entry. Changes made in this process
+    are applied at once; ``refresh`` picks up the rest incrementally by
+    ``updated_at``. Numbers learned to be undeliverable from send failures
+    are suppressed in memory at once and written to the table on the next
+    refresh.
+    """
+    def __init__(self):
+        self._numbers: Set[str] = set()
+        self._learned: Dict[str, str] = {}
+        self.refreshed_at: Optional[datetime] = None
+        self._watermark: Optional[datetime] = None
+
+    def __len__(self) -> int:
+        return len(self._numbers)
+
+    @property
+    def unsaved(self) -> int:
+        """
+        Learned numbers not yet written to the database
+        """
+        return len(self._learned)
+
+    def contains(self, phone_number: str) -> bool:
+        """
+        Whether an E.164 number is suppressed
+        """
+        return phone_number in self._numbers
+
+    def partition(self, phone_numbers: Iterable[str]) -> Tuple[List[str], List[str]]:
+        """
+        Split E.164 numbers into (allowed, suppressed), keeping their order
+        """
+        allowed, suppressed = [], []
+        numbers = self._numbers
+        for phone_number in phone_numbers:
+            (suppressed if phone_number in numbers else allowed).append(phone_number)
+        return allowed, suppressed
+
+    def learn(self, phone_number: str, reason: str = "invalid") -> None:
+        """
+        Suppress a number found undeliverable, persisting it on the next refresh
+        """
+        self._numbers.add(phone_number)
+        self._learned[phone_number] = reason
+
+    async def add(self, db: AsyncSession, phone_numbers: List[str], reason: str = "opt_out") -> None:
+        """
+        Suppress E.164 numbers in the database and in memory
+        """
+        await write_suppressions(db, {phone_number: reason for phone_number in phone_numbers})
+        await db.commit()
+        self._numbers.update(phone_numbers)
+
+    async def remove(self, db: AsyncSession, phone_numbers: List[str]) -> int:
+        """
+        Lift the suppression of E.164 numbers
+
+        Returns:
+            Number of suppressions lifted
+        """
+        result = await db.execute(
+            update(SuppressedNumber)
+            .where(SuppressedNumber.phone_number.in_(phone_numbers), SuppressedNumber.active.is_(True))
+            .values(active=False)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        for phone_number in phone_numbers:
+            self._numbers.discard(phone_number)
+            self._learned.pop(phone_number, None)
+        return result.rowcount
+
+    async def refresh(self, db: AsyncSession) -> int:
+        """
+        Write learned numbers, then apply changes made since the last refresh
+
+        Rows are read from slightly before the previous high-water mark,
+        since a transaction may commit after a later one; applying a row
+        twice is harmless.
+
+        Returns:
+            Number of rows read
+        """
+        if self._learned:
+            learned, self._learned = self._learned, {}
+            try:
+                await write_suppressions(db, learned)
+                await db.commit()
+            except Exception:
+                self._learned = {**learned, **self._learned}
+                raise
+
+        query = select(SuppressedNumber.phone_number, SuppressedNumber.active, SuppressedNumber.updated_at)
+        if self._watermark is not None:
+            overlap = timedelta(seconds=settings.suppression_refresh_interval)
+            query = query.where(SuppressedNumber.updated_at >= self._watermark - overlap)
+        rows = 0
+        result = await db.stream(query.execution_options(yield_per=settings.export_batch_size))
+        async for partition in result.partitions():
+            for phone_number, active, updated_at in partition:
+                if active:
+                    self._numbers.add(phone_number)
+                elif phone_number not in self._learned:
+                    self._numbers.discard(phone_number)
+                if self._watermark is None or updated_at > self._watermark:
+                    self._watermark = updated_at
+            rows += len(partition)
+        self.refreshed_at = datetime.utcnow()
+        return rows
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._numbers),
+            "unsaved": len(self._learned),
+            "refreshed_at": self.refreshed_at.isoformat() if self.refreshed_at else None
+        }
+
+async def write_suppressions(db: AsyncSession, reasons: Dict[str, str]) -> None:
+    """
+    Insert or reactivate suppressed numbers, in batches of ``bulk_db_batch_size``
+    """
+    phone_numbers = list(reasons)
+    batch_size = settings.bulk_db_batch_size
+    for start in range(0, len(phone_numbers), batch_size):
+        batch = phone_numbers[start:start + batch_size]
+        existing = set((await db.scalars(
+            select(SuppressedNumber.phone_number).where(SuppressedNumber.phone_number.in_(batch))
+        )).all())
+        # Already listed numbers are rare; each update also bumps updated_at
+        for phone_number in existing:
+            await db.execute(
+                update(SuppressedNumber)
+                .where(SuppressedNumber.phone_number == phone_number)
+                .values(active=True, reason=reasons[phone_number])
+                .execution_options(synchronize_session=False)
+            )
+        db.add_all(
+            SuppressedNumber(phone_number=phone_number, reason=reasons[phone_number])
+            for phone_number in batch if phone_number not in existing
+        )
+        await db.flush()
+
+class SuppressionRefresher:
+    """
+    Periodically syncs the in-memory suppression list with the database
+    """
+    def __init__(self, suppression: SuppressionList, session_factory: async_sessionmaker, interval: Optional[float] = None):
+        self.suppression = suppression
+        self.session_factory = session_factory
+        self.interval = interval or settings.suppression_refresh_interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run(), name="suppression-refresher")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        # Keep numbers learned since the last refresh
+        if self.suppression.unsaved:
+            try:
+                async with self.session_factory() as db:
+                    await self.suppression.refresh(db)
+            except Exception:
+                logger.exception("Failed to save learned suppressions")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                async with self.session_factory() as db:
+                    await self.suppression.refresh(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Failed to refresh the suppression list")
+            await asyncio.sleep(self.interval)
+
+# Suppression list shared by every service instance in this process
+suppression_list = SuppressionList()
@@ -1,18 +1,56 @@
+import asyncio
 import httpx
-import json
-from sqlalchemy.orm import Session
-from typing import Dict, Any, Optional
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Any, List, NamedTuple, Optional
 
 from app.config import settings
+from app.metrics import Metrics, metrics as default_metrics
 from app.models import MessageLog
-from app.exceptions import WhatsAppAPIException, ConfigurationException
-from app.utils import dict_to_json_string
+from app.exceptions import (
+    WhatsAppAPIException, CircuitOpenException, ConfigurationException, DuplicateRequestException,
+    SuppressedRecipientException
+)
+from app.utils import dict_to_json_string, json_string_to_dict
+from app.services.http_client import create_http_client, get_pool_stats
+from app.services.log_writer import LogWriter
+from app.services.media_service import MediaService
+from app.services.message_queue import lease_deadline
+from app.services.message_scheduler import spread_times
+from app.services.message_stats import MessageStats, message_stats
+from app.services.message_templates import CompiledMessage, DEFAULT_TEXT_MESSAGE
+from app.services.rate_limiter import AdaptiveRateLimiter, THROTTLING_ERROR_CODES, PAIR_RATE_LIMIT_ERROR_CODE
+from app.services.response_cache import response_cache
+from app.services.sender_pool import Sender, SenderPool
+from app.services.suppression import SuppressionList, UNDELIVERABLE_ERROR_CODES, suppression_list
+from app.services.retry import RetryPolicy, is_retryable_request_error, is_retryable_response
+
+class DeliveryOutcome(NamedTuple):
+    """
+    Result of delivering one message, possibly over several attempts
+    """
+    response_data: Optional[Dict[str, Any]]
+    error: Optional[WhatsAppAPIException]
+    attempts: int
 
 class WhatsAppService:
     """
     Service class for interacting with the WhatsApp Business API
     """
-    def __init__(self):
+    def __init__(
+        self,
+        client: Optional[httpx.AsyncClient] = None,
+        rate_limiter: Optional[AdaptiveRateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        log_writer: Optional[LogWriter] = None,
+        stats: Optional[MessageStats] = None,
+        metrics: Optional[Metrics] = None,
+        senders: Optional[SenderPool] = None,
+        suppression: Optional[SuppressionList] = None
+    ):
         self.api_url = settings.whatsapp_api_url
         self.phone_number_id = settings.whatsapp_phone_number_id
         self.access_token = settings.whatsapp_access_token
@@ -22,80 +60,671 @@ class WhatsAppService:
             raise ConfigurationException(
                 "WhatsApp API credentials not configured. Please set WHATSAPP_PHONE_NUMBER_ID and WHATSAPP_ACCESS_TOKEN."
             )
+
+        # Sender numbers messages are routed across; the configured number
+        # is the primary one and also uploads media
+        self.senders = senders or SenderPool.from_settings(self.api_url, self.phone_number_id, self.access_token)
+
+        # Uploads and media ID cache for image and document messages
+        self.media = MediaService(self)
+
+        # In-process counters behind the stats endpoint, updated on every transition
+        self.stats = stats or message_stats
+        self.metrics = metrics or default_metrics
+
+        # Opted-out and undeliverable recipients, checked before any I/O
+        self.suppression = suppression if suppression is not None else suppression_list
+        # Shared HTTP client; the service only closes a client it created itself
+        self._client = client
+        self._owns_client = client is None
+
+        # Pacing shared by every send through this service
+        if rate_limiter is None and settings.rate_limit_enabled:
+            rate_limiter = AdaptiveRateLimiter.from_settings()
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy or RetryPolicy.from_settings()
+
+        # Optional write-behind buffer for the logs of synchronous sends
+        self.log_writer = log_writer
+
+        # Set when messages are enqueued so idle queue workers wake up
+        self._enqueued = asyncio.Event()
+        # Set when messages are scheduled so the scheduler reloads its window
+        self._scheduled = asyncio.Event()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """
+        Pooled HTTP client, created lazily when none was injected
+        """
+        if self._client is None or self._client.is_closed:
+            self._client = create_http_client()
+            self._owns_client = True
+        return self._client
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """
+        Connection pool statistics of the underlying HTTP client
+        """
+        return get_pool_stats(self._client)
+
+    def should_spill_over(self) -> bool:
+        """
+        Whether sends should be queued as pending instead of attempted,
+        because spillover is enabled and every sender's circuit is open
+        """
+        return settings.circuit_spillover and not self.senders.accepting()
+
+    def ensure_not_suppressed(self, recipient_phone: str) -> None:
+        """
+        Raises:
+            SuppressedRecipientException: If the recipient is on the suppression list
+        """
+        if self.suppression.contains(recipient_phone):
+            raise SuppressedRecipientException(recipient_phone)
+
+    def sender_stats(self) -> Dict[str, Any]:
+        """
+        Routing policy and health of each sender number
+        """
+        return self.senders.stats()
+
+    def rate_limit_stats(self) -> Dict[str, Any]:
+        """
+        Current client-side pacing state
+        """
+        if self.rate_limiter is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.rate_limiter.stats()}
+
+    async def aclose(self) -> None:
+        """
+        Close the HTTP client if it is owned by this service
+        """
+        if self._owns_client and self._client is not None:
+            await self._client.aclose()
+            self._client = None
     
-    async def send_message(self, db: Session, recipient_phone: str) -> Dict[str, Any]:
+    async def send_message(
+        self,
+        db: AsyncSession,
+        recipient_phone: str,
+        idempotency_key: Optional[str] = None,
+        message: Optional[CompiledMessage] = None
+    ) -> Dict[str, Any]:
         """
-        Send a text message via WhatsApp Business API
+        Send a message via WhatsApp Business API
+        
+        Transient failures are retried inline with exponential backoff. A
+        repeated call with the same ``idempotency_key`` replays the recorded
+        outcome instead of sending again. Without a key, and with a log writer
+        configured, the log is written behind instead of around the send.
         
         Args:
-            db: Database session
+            db: Async database session
             recipient_phone: The recipient's phone number in E.164 format
+            idempotency_key: Optional client-supplied key identifying the request
+            message: Compiled message to send, the default text if omitted
             
         Returns:
             API response as dictionary
             
         Raises:
             WhatsAppAPIException: If there's an error in the API call
+            SuppressedRecipientException: If the recipient is suppressed
+            DuplicateRequestException: If the same request is still in progress
         """
-        # Create message log entry with pending status
+        self.ensure_not_suppressed(recipient_phone)
+        if idempotency_key:
+            existing = (await self._idempotent_logs(db, [idempotency_key])).get(idempotency_key)
+            if existing is not None:
+                return _replay(existing)
+        
+        message = message or DEFAULT_TEXT_MESSAGE
+        if self.log_writer is not None and not idempotency_key:
+            return await self._send_write_behind(recipient_phone, message)
+        
+        # Create message log entry, leased to this request while it is sent
         message_log = MessageLog(
             phone_number=recipient_phone,
-            message="Hello, this is a test message from our TMBC bot!",
-            status="pending"
+            message=message.summary,
+            payload=_stored_payload(message),
+            status="sending",
+            locked_until=lease_deadline(),
+            idempotency_key=idempotency_key
         )
         db.add(message_log)
-        db.commit()
-        db.refresh(message_log)
-        
-        # Prepare API call
-        endpoint = f"{self.api_url}/{self.phone_number_id}/messages"
-        
-        # Prepare the message payload according to WhatsApp API requirements
-        payload = {
-            "messaging_product": "whatsapp",
-            "recipient_type": "individual",
-            "to": recipient_phone,
-            "type": "text",
-            "text": {
-                "preview_url": False,
-                "body": "Hello, this is a test message from our TMBC bot!"
-            }
-        }
-        
-        headers = {
-            "Authorization": f"Bearer {self.access_token}",
-            "Content-Type": "application/json"
-        }
-        
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(endpoint, json=payload, headers=headers)
-                
-                # Check if request was successful
-                if response.status_code != 200:
-                    # Update message log with failure
-                    message_log.status = "failed"
-                    message_log.error_message = f"API Error: {response.status_code} - {response.text}"
-                    db.commit()
-                    
-                    raise WhatsAppAPIException(
-                        f"WhatsApp API error: {response.status_code} - {response.text}"
-                    )
-                
-                # Process success response
-                response_data = response.json()
-                
-                # Update message log with success
-                message_log.status = "sent"
-                message_log.response_data = dict_to_json_string(response_data)
-                db.commit()
-                
-                return response_data
-                
-        except httpx.RequestError as e:
+            with self.metrics.stage("insert"):
+                await db.commit()
+        except IntegrityError:
+            # A concurrent request with the same key won the insert
+            await db.rollback()
+            existing = (await self._idempotent_logs(db, [idempotency_key])).get(idempotency_key)
+            if existing is None:
+                raise
+            return _replay(existing)
+        self.stats.record("sending")
+        response_cache.invalidate()
+        
+        outcome = await self._deliver(recipient_phone, message.render(recipient_phone))
+        message_log.attempts = outcome.attempts
+        message_log.locked_until = None
+        
+        if outcome.error is not None:
             # Update message log with failure
             message_log.status = "failed"
-            message_log.error_message = f"Request Error: {str(e)}"
-            db.commit()
+            message_log.error_message = outcome.error.log_message
+            with self.metrics.stage("commit"):
+                await db.commit()
+            self.stats.record("failed", "sending")
+            response_cache.invalidate()
             
-            raise WhatsAppAPIException(f"Error sending WhatsApp message: {str(e)}")
\ No newline at end of file
+            raise outcome.error
+        
+        # Update message log with success
+        message_log.status = "sent"
+        message_log.response_data = dict_to_json_string(outcome.response_data)
+        message_log.wa_message_id = _extract_message_id(outcome.response_data)
+        with self.metrics.stage("commit"):
+            await db.commit()
+        self.stats.record("sent", "sending")
+        response_cache.invalidate()
+        
+        return outcome.response_data
+
+    async def _send_write_behind(self, recipient_phone: str, message: CompiledMessage) -> Dict[str, Any]:
+        """
+        Send one message with its log buffered in the log writer
+        
+        The status transition usually lands before the row is flushed, so
+        the whole send is written as a single row.
+        """
+        with self.metrics.stage("insert"):
+            log_id = await self.log_writer.create(
+                phone_number=recipient_phone,
+                message=message.summary,
+                payload=_stored_payload(message),
+                status="sending",
+                locked_until=lease_deadline()
+            )
+        self.stats.record("sending")
+        outcome = await self._deliver(recipient_phone, message.render(recipient_phone))
+        if outcome.error is not None:
+            self.log_writer.update(
+                log_id, status="failed", error_message=outcome.error.log_message,
+                attempts=outcome.attempts, locked_until=None
+            )
+            self.stats.record("failed", "sending")
+            raise outcome.error
+        
+        self.log_writer.update(
+            log_id,
+            status="sent",
+            response_data=dict_to_json_string(outcome.response_data),
+            wa_message_id=_extract_message_id(outcome.response_data),
+            attempts=outcome.attempts,
+            locked_until=None
+        )
+        self.stats.record("sent", "sending")
+        return outcome.response_data
+
+    async def send_bulk(
+        self,
+        db: AsyncSession,
+        recipients: List[str],
+        idempotency_key: Optional[str] = None,
+        message: Optional[CompiledMessage] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Send the message to many recipients concurrently
+        
+        The message is compiled once for the whole call; each recipient only
+        costs splicing its number into the encoded payload. Log rows are inserted and updated in batches of ``bulk_db_batch_size``
+        with one commit per batch, while at most ``bulk_concurrency`` Graph API
+        calls are in flight.
+        
+        Args:
+            db: Async database session
+            recipients: Validated, de-duplicated phone numbers in E.164 format
+            idempotency_key: Optional client-supplied key identifying the request
+            message: Compiled message to send, the default text if omitted
+            
+        Returns:
+            One result dictionary per recipient, in input order
+        """
+        message = message or DEFAULT_TEXT_MESSAGE
+        semaphore = asyncio.Semaphore(settings.bulk_concurrency)
+        batch_size = settings.bulk_db_batch_size
+        results = []
+        
+        for start in range(0, len(recipients), batch_size):
+            batch = recipients[start:start + batch_size]
+            keys = _recipient_keys(idempotency_key, batch)
+            existing = await self._idempotent_logs(db, [key for key in keys if key])
+            
+            # Recipients already handled by an earlier call with the same key are replayed
+            to_send = [(phone, key) for phone, key in zip(batch, keys) if key not in existing]
+            
+            # Insert all rows of the batch in one statement, leased to this call
+            log_ids = await self._insert_logs(
+                db, [phone for phone, _ in to_send], [key for _, key in to_send], message,
+                status="sending", locked_until=lease_deadline()
+            )
+            await db.commit()
+            self.stats.record("sending", count=len(log_ids))
+            response_cache.invalidate()
+            
+            outcomes = await asyncio.gather(
+                *(self._deliver_limited(semaphore, phone, message) for phone, _ in to_send)
+            )
+            await self._record_outcomes(db, log_ids, outcomes)
+            await db.commit()
+            response_cache.invalidate()
+            
+            sent = {phone: (log_id, outcome) for (phone, _), log_id, outcome in zip(to_send, log_ids, outcomes)}
+            for phone, key in zip(batch, keys):
+                if phone in sent:
+                    log_id, outcome = sent[phone]
+                    results.append({
+                        "phone_number": phone,
+                        "success": outcome.error is None,
+                        "log_id": log_id,
+                        "message_id": _extract_message_id(outcome.response_data),
+                        "error": outcome.error.detail if outcome.error else None
+                    })
+                else:
+                    results.append(_replay_result(existing[key]))
+        
+        return results
+
+    async def enqueue_messages(
+        self,
+        db: AsyncSession,
+        recipients: List[str],
+        idempotency_key: Optional[str] = None,
+        message: Optional[CompiledMessage] = None,
+        scheduled_at: Optional[datetime] = None,
+        send_until: Optional[datetime] = None
+    ) -> List[int]:
+        """
+        Store messages as pending for delivery by the background workers
+        
+        With ``scheduled_at`` the messages are stored as scheduled instead and
+        released to the workers by the scheduler when they fall due; with
+        ``send_until`` as well, their send times are spread evenly over
+        [scheduled_at, send_until) in recipient order.
+        
+        Args:
+            db: Async database session
+            recipients: Validated phone numbers in E.164 format
+            idempotency_key: Optional client-supplied key identifying the request
+            message: Compiled message to send, the default text if omitted
+            scheduled_at: Naive UTC time to send at, or the start of the window
+            send_until: Naive UTC end of the send window
+            
+        Returns:
+            The message log IDs, in input order; recipients already enqueued
+            under the same key keep their original log ID
+        """
+        message = message or DEFAULT_TEXT_MESSAGE
+        status = "pending" if scheduled_at is None else "scheduled"
+        send_times = spread_times(scheduled_at, send_until, len(recipients)) if scheduled_at is not None else None
+        log_ids = []
+        new_logs = 0
+        batch_size = settings.bulk_db_batch_size
+        for start in range(0, len(recipients), batch_size):
+            batch = recipients[start:start + batch_size]
+            keys = _recipient_keys(idempotency_key, batch)
+            existing = await self._idempotent_logs(db, [key for key in keys if key])
+            to_insert = [
+                (phone, key, send_times[start + index] if send_times else None)
+                for index, (phone, key) in enumerate(zip(batch, keys)) if key not in existing
+            ]
+            inserted_ids = await self._insert_logs(
+                db, [phone for phone, _, _ in to_insert], [key for _, key, _ in to_insert], message,
+                row_values=[{"scheduled_at": at} for _, _, at in to_insert] if send_times else None,
+                status=status
+            )
+            inserted = iter(inserted_ids)
+            log_ids.extend(existing[key].id if key in existing else next(inserted) for key in keys)
+            new_logs += len(inserted_ids)
+        await db.commit()
+        self.stats.record(status, count=new_logs)
+        response_cache.invalidate()
+        
+        # Wake idle workers (or the scheduler) instead of waiting for their next poll
+        if scheduled_at is None:
+            self.notify_enqueued()
+        else:
+            self._scheduled.set()
+        return log_ids
+
+    def notify_enqueued(self) -> None:
+        """
+        Signal queue workers that pending messages are available
+        """
+        self._enqueued.set()
+
+    async def wait_for_enqueue(self, timeout: float) -> None:
+        """
+        Wait until new messages are enqueued or the timeout expires
+        """
+        try:
+            await asyncio.wait_for(self._enqueued.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._enqueued.clear()
+
+    async def wait_for_schedule(self, timeout: float) -> bool:
+        """
+        Wait until new messages are scheduled or the timeout expires
+        
+        Returns:
+            Whether messages were scheduled
+        """
+        try:
+            await asyncio.wait_for(self._scheduled.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        scheduled = self._scheduled.is_set()
+        self._scheduled.clear()
+        return scheduled
+
+    async def deliver_claimed(self, db: AsyncSession, message_logs: List[MessageLog]) -> None:
+        """
+        Deliver messages claimed from the queue and record their outcome
+        
+        Each claim makes a single attempt; transient failures go back to the
+        queue as pending with a backed-off ``next_attempt_at`` until
+        ``retry_max_attempts`` is reached. Stored payloads are compiled once
+        per batch, so messages of the same campaign share one skeleton.
+        
+        Args:
+            db: Async database session
+            message_logs: Log rows leased to the caller with status "sending"
+        """
+        self.stats.record("sending", "pending", len(message_logs))
+        semaphore = asyncio.Semaphore(settings.bulk_concurrency)
+        compiled: Dict[Optional[str], CompiledMessage] = {None: DEFAULT_TEXT_MESSAGE}
+        for log in message_logs:
+            if log.payload not in compiled:
+                compiled[log.payload] = CompiledMessage.from_json(log.payload, log.message)
+        outcomes = await asyncio.gather(
+            *(
+                self._deliver_limited(semaphore, log.phone_number, compiled[log.payload], inline_retries=False)
+                for log in message_logs
+            )
+        )
+        await self._record_outcomes(
+            db, [log.id for log in message_logs], outcomes,
+            previous_attempts=[log.attempts or 0 for log in message_logs]
+        )
+        await db.commit()
+        response_cache.invalidate()
+
+    async def _idempotent_logs(self, db: AsyncSession, keys: List[str]) -> Dict[str, MessageLog]:
+        """
+        Message logs already recorded under the given idempotency keys
+        """
+        if not keys:
+            return {}
+        result = await db.scalars(select(MessageLog).where(MessageLog.idempotency_key.in_(keys)))
+        return {log.idempotency_key: log for log in result}
+
+    async def _insert_logs(
+        self,
+        db: AsyncSession,
+        recipients: List[str],
+        idempotency_keys: List[Optional[str]],
+        message: CompiledMessage,
+        row_values: Optional[List[Dict[str, Any]]] = None,
+        **values: Any
+    ) -> List[int]:
+        """
+        Insert one message log per recipient in a single statement
+        
+        ``values`` apply to every row, ``row_values`` to each row in turn.
+        
+        Raises:
+            DuplicateRequestException: If a concurrent call claimed one of the keys
+        """
+        if not recipients:
+            return []
+        summary, payload = message.summary, _stored_payload(message)
+        try:
+            return (await db.scalars(
+                insert(MessageLog).returning(MessageLog.id, sort_by_parameter_order=True),
+                [
+                    {
+                        "phone_number": phone, "message": summary, "payload": payload, "idempotency_key": key,
+                        **values, **(row_values[index] if row_values else {})
+                    }
+                    for index, (phone, key) in enumerate(zip(recipients, idempotency_keys))
+                ]
+            )).all()
+        except IntegrityError:
+            await db.rollback()
+            raise DuplicateRequestException()
+
+    async def _record_outcomes(
+        self,
+        db: AsyncSession,
+        log_ids: List[int],
+        outcomes: List["DeliveryOutcome"],
+        previous_attempts: Optional[List[int]] = None
+    ) -> None:
+        """
+        Write the status transitions of many sends in one executemany
+        
+        With ``previous_attempts`` (queued messages), transient failures are
+        rescheduled instead of being marked failed.
+        """
+        updates = []
+        for index, (log_id, outcome) in enumerate(zip(log_ids, outcomes)):
+            attempts = outcome.attempts + (previous_attempts[index] if previous_attempts else 0)
+            status = "failed" if outcome.error else "sent"
+            next_attempt_at = None
+            if previous_attempts is not None and outcome.error is not None and self.retry_policy.should_retry(outcome.error, attempts):
+                status = "pending"
+                next_attempt_at = self.retry_policy.next_attempt_at(attempts, outcome.error)
+            updates.append({
+                "id": log_id,
+                "status": status,
+                "response_data": dict_to_json_string(outcome.response_data),
+                "wa_message_id": _extract_message_id(outcome.response_data),
+                "error_message": outcome.error.log_message if outcome.error else None,
+                "attempts": attempts,
+                "next_attempt_at": next_attempt_at,
+                "locked_until": None
+            })
+        if updates:
+            await db.execute(update(MessageLog), updates)
+            for status, count in Counter(row["status"] for row in updates).items():
+                self.stats.record(status, "sending", count)
+
+    async def _deliver_limited(
+        self,
+        semaphore: asyncio.Semaphore,
+        recipient_phone: str,
+        message: CompiledMessage,
+        inline_retries: bool = True
+    ) -> "DeliveryOutcome":
+        """
+        Deliver one message under the concurrency cap
+        """
+        async with semaphore:
+            return await self._deliver(recipient_phone, message.render(recipient_phone), inline_retries)
+
+    async def _deliver(self, recipient_phone: str, payload: bytes, inline_retries: bool = True) -> "DeliveryOutcome":
+        """
+        Post a payload, retrying transient failures inline, and return the
+        outcome instead of raising
+        
+        Inline retries stop after the policy's ``inline_attempts`` or when the
+        next backoff exceeds its ``inline_max_delay``. An open circuit is not
+        retried inline. A recipient suppressed since the message was queued
+        fails without a request.
+        """
+        if self.suppression.contains(recipient_phone):
+            return DeliveryOutcome(None, SuppressedRecipientException(recipient_phone), 0)
+        max_attempts = self.retry_policy.inline_attempts if inline_retries else 1
+        attempts = 0
+        while True:
+            attempts += 1
+            try:
+                return DeliveryOutcome(await self._post_message(recipient_phone, payload), None, attempts)
+            except CircuitOpenException as e:
+                # Failed fast without a request, so it does not use up an attempt
+                return DeliveryOutcome(None, e, attempts - 1)
+            except WhatsAppAPIException as e:
+                if attempts >= max_attempts or not self.retry_policy.should_retry(e, attempts):
+                    return DeliveryOutcome(None, e, attempts)
+                delay = self.retry_policy.backoff(attempts, e)
+                if delay > self.retry_policy.inline_max_delay:
+                    return DeliveryOutcome(None, e, attempts)
+                await asyncio.sleep(delay)
+
+    async def _post_message(self, recipient_phone: str, payload: bytes) -> Dict[str, Any]:
+        """
+        Post an encoded message payload to the Graph API through the sender
+        the pool routes the recipient to
+        
+        Raises:
+            CircuitOpenException: Without a request, if every sender's circuit is open
+            WhatsAppAPIException: If the request fails or the API rejects it
+        """
+        sender = self.senders.choose(recipient_phone)
+        sender.in_flight += 1
+        try:
+            return await self._post_via(sender, recipient_phone, payload)
+        except asyncio.CancelledError:
+            sender.breaker.release()
+            raise
+        finally:
+            sender.in_flight -= 1
+
+    async def _post_via(self, sender: Sender, recipient_phone: str, payload: bytes) -> Dict[str, Any]:
+        # Each sender number has its own rate budget
+        if self.rate_limiter is not None:
+            with self.metrics.stage("rate_limit"):
+                try:
+                    await self.rate_limiter.acquire(sender.phone_number_id, recipient_phone)
+                except WhatsAppAPIException:
+                    # Refused before any request was made
+                    sender.breaker.release()
+                    raise
+        
+        try:
+            with self.metrics.stage("api_call"):
+                response = await self.client.post(sender.messages_endpoint, content=payload, headers=sender.headers)
+        except httpx.RequestError as e:
+            self.metrics.count_error("RequestError")
+            self.senders.on_failure(sender)
+            raise WhatsAppAPIException(
+                f"Error sending WhatsApp message: {str(e)}",
+                log_message=f"Request Error: {str(e)}",
+                retryable=is_retryable_request_error(e)
+            )
+        
+        # Check if request was successful
+        if response.status_code != 200:
+            retry_after = _retry_after(response)
+            error_code = _graph_error_code(response)
+            if self.rate_limiter is not None and (
+                response.status_code == 429 or error_code in THROTTLING_ERROR_CODES
+            ):
+                self.rate_limiter.on_throttled(
+                    sender.phone_number_id,
+                    retry_after,
+                    recipient=recipient_phone if error_code == PAIR_RATE_LIMIT_ERROR_CODE else None
+                )
+            if error_code in UNDELIVERABLE_ERROR_CODES and settings.suppression_learn_undeliverable:
+                self.suppression.learn(recipient_phone)
+            # Rejected messages and throttling say nothing about the sender's health
+            if response.status_code >= 500:
+                self.senders.on_failure(sender)
+            else:
+                self.senders.on_rejected(sender)
+            
+            self.metrics.count_error("WhatsAppAPIException")
+            raise WhatsAppAPIException(
+                f"WhatsApp API error: {response.status_code} - {response.text}",
+                log_message=f"API Error: {response.status_code} - {response.text}",
+                api_status_code=response.status_code,
+                retry_after=retry_after,
+                retryable=is_retryable_response(response.status_code, error_code)
+            )
+        
+        self.senders.on_success(sender)
+        if self.rate_limiter is not None:
+            self.rate_limiter.on_success(sender.phone_number_id)
+        return response.json()
+
+def _extract_message_id(response_data: Optional[Dict[str, Any]]) -> Optional[str]:
+    """
+    Get the message ID from a Graph API response if available
+    """
+    if response_data and "messages" in response_data and len(response_data["messages"]) > 0:
+        return response_data["messages"][0].get("id")
+    return None
+
+def _stored_payload(message: CompiledMessage) -> Optional[str]:
+    """
+    Message content to store on the log; the default text is stored as NULL
+    """
+    return None if message is DEFAULT_TEXT_MESSAGE else message.to_json()
+
+def _recipient_keys(idempotency_key: Optional[str], recipients: List[str]) -> List[Optional[str]]:
+    """
+    Per-recipient idempotency keys derived from a request-level key
+    """
+    if not idempotency_key:
+        return [None] * len(recipients)
+    return [f"{idempotency_key}:{phone}" for phone in recipients]
+
+def _replay(message_log: MessageLog) -> Dict[str, Any]:
+    """
+    Return the recorded outcome of an idempotent request
+    
+    Raises:
+        WhatsAppAPIException: If the recorded request failed
+        DuplicateRequestException: If the recorded request is still in progress
+    """
+    if message_log.status == "sent":
+        return json_string_to_dict(message_log.response_data)
+    if message_log.status == "failed":
+        raise WhatsAppAPIException(message_log.error_message or "WhatsApp API error occurred")
+    raise DuplicateRequestException(log_id=message_log.id)
+
+def _replay_result(message_log: MessageLog) -> Dict[str, Any]:
+    """
+    Bulk result entry for a recipient handled by an earlier idempotent call
+    """
+    return {
+        "phone_number": message_log.phone_number,
+        "success": message_log.status != "failed",
+        "log_id": message_log.id,
+        "message_id": message_log.wa_message_id,
+        "error": message_log.error_message if message_log.status == "failed" else None
+    }
+
+def _graph_error_code(response: httpx.Response) -> Optional[int]:
+    """
+    Get the Graph API error code from an error response if available
+    """
+    try:
+        error = response.json().get("error")
+    except ValueError:
+        return None
+    return error.get("code") if isinstance(error, dict) else None
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    """
+    Get the Retry-After delay in seconds from a response if available
+    """
+    value = response.headers.get("Retry-After")
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except (TypeError, ValueError):
+        return None
\ No newline at end of file
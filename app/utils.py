@@ -1,12 +1,124 @@
 import re
 import json
-import phonenumbers
-from app.exceptions import InvalidPhoneNumberException
+import hmac
+import base64
+import binascii
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Tuple, Dict, Any, Iterable, List, Optional
+from app.config import settings
+from app.exceptions import InvalidPhoneNumberException, InvalidCursorException
+from app.metrics import metrics
+
+class PhoneNumberCache:
+    """
+    Bounded LRU cache of phone number normalization results
+    
+    Invalid numbers are cached too (as their error message), so audiences
+    that keep re-targeting bad numbers do not re-parse them either.
+    """
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[bool, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, phone_number: str) -> Optional[Tuple[bool, str]]:
+        """
+        Cached (is_valid, E.164 number or error message) for a raw number
+        """
+        with self._lock:
+            entry = self._entries.get(phone_number)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(phone_number)
+            self.hits += 1
+            return entry
+    
+    def put(self, phone_number: str, entry: Tuple[bool, str]) -> None:
+        with self._lock:
+            self._entries[phone_number] = entry
+            self._entries.move_to_end(phone_number)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+phone_number_cache = PhoneNumberCache(maxsize=settings.phone_cache_size)
 
 def validate_phone_number(phone_number: str) -> str:
     """
     Validates and formats the phone number to E.164 format
     
+    Results, including rejections, are memoized in ``phone_number_cache``.
+    
+    Args:
+        phone_number: Phone number to validate
+        
+    Returns:
+        Formatted phone number string in E.164 format
+        
+    Raises:
+        InvalidPhoneNumberException: If the phone number is invalid
+    """
+    with metrics.stage("validate"):
+        entry = phone_number_cache.get(phone_number)
+        if entry is None:
+            try:
+                entry = (True, _parse_phone_number(phone_number))
+            except InvalidPhoneNumberException as e:
+                entry = (False, e.detail)
+            phone_number_cache.put(phone_number, entry)
+    
+    is_valid, value = entry
+    if not is_valid:
+        metrics.count_error("InvalidPhoneNumberException")
+        raise InvalidPhoneNumberException(value)
+    return value
+
+def normalize_phone_numbers(phone_numbers: Iterable[str]) -> Tuple[List[str], Dict[str, str]]:
+    """
+    Validate many phone numbers in one pass
+    
+    Raw duplicates are parsed once and numbers that normalize to the same
+    E.164 value are returned once, in first-seen order.
+    
+    Args:
+        phone_numbers: Phone numbers to validate
+        
+    Returns:
+        Tuple of (unique E.164 numbers, mapping of invalid input to error message)
+    """
+    valid: Dict[str, None] = {}
+    invalid: Dict[str, str] = {}
+    for phone_number in dict.fromkeys(phone_numbers):
+        try:
+            valid.setdefault(validate_phone_number(phone_number), None)
+        except InvalidPhoneNumberException as e:
+            invalid[phone_number] = e.detail
+    return list(valid), invalid
+
+def _parse_phone_number(phone_number: str) -> str:
+    """
+    Parse and format a phone number to E.164 format without caching
+    
     Args:
         phone_number: Phone number to validate
         
@@ -16,6 +128,10 @@ def validate_phone_number(phone_number: str) -> str:
     Raises:
         InvalidPhoneNumberException: If the phone number is invalid
     """
+    # Imported on first use: its metadata is large and most numbers are
+    # answered from the cache
+    import phonenumbers
+    
     # Remove any whitespace or special characters
     cleaned_number = re.sub(r'[\s\-\(\)]', '', phone_number)
     
@@ -55,4 +171,47 @@ def json_string_to_dict(json_str: str) -> dict:
     try:
         return json.loads(json_str)
     except (json.JSONDecodeError, TypeError):
-        return {}
\ No newline at end of file
+        return {}
+
+def to_naive_utc(value: datetime) -> datetime:
+    """
+    Convert a datetime with an offset to the naive UTC stored in the database
+
+    Naive datetimes are taken to be UTC already.
+    """
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def encode_cursor(created_at: datetime, log_id: int) -> str:
+    """
+    Encode the (created_at, id) sort key of a row as an opaque page cursor
+    """
+    raw = json.dumps([created_at.isoformat(), log_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decode a page cursor produced by encode_cursor
+    
+    Raises:
+        InvalidCursorException: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, log_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(log_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidCursorException()
+
+def verify_webhook_signature(body: bytes, signature: Optional[str], app_secret: str) -> bool:
+    """
+    Check the X-Hub-Signature-256 header of a webhook delivery
+    
+    The Graph API signs the raw request body with the app secret as
+    ``sha256=<hex HMAC>``.
+    """
+    if not signature or not signature.startswith("sha256="):
+        return False
+    expected = hmac.new(app_secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature[len("sha256="):])
@@ -0,0 +1,200 @@
+"""
+Load benchmark of the API against a local fake Graph API
+
+Drives the real FastAPI app in-process (httpx.ASGITransport, no sockets)
+at a fixed concurrency. The app's Graph API client is pointed at
+benchmarks.fake_graph, which has configurable latency, error rate and 429
+injection. Three scenarios are run: single sends, bulk sends, and walking
+the message logs with cursor pagination. Each one reports throughput and
+p50/p95/p99 latency.
+
+Uses a throwaway SQLite database unless DATABASE_URL is set. Client-side
+rate limiting is off by default, since it would only measure the configured
+pacing.
+
+Results can be saved as a baseline and later runs compared against it;
+the run exits with status 1 when a scenario's throughput drops, or its p95
+rises, by more than --tolerance.
+
+Usage:
+    python -m benchmarks.bench_load [--requests 500] [--concurrency 20] [--latency 0.02]
+    python -m benchmarks.bench_load --save-baseline benchmarks/baseline.json
+    python -m benchmarks.bench_load --baseline benchmarks/baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Awaitable, Callable, Dict, List
+from unittest import mock
+
+BENCH_DIR = tempfile.mkdtemp(prefix="whatsapp-bench-")
+os.environ.setdefault("WHATSAPP_PHONE_NUMBER_ID", "benchmark")
+os.environ.setdefault("WHATSAPP_ACCESS_TOKEN", "benchmark")
+os.environ.setdefault("WHATSAPP_API_URL", "http://fake-graph/v18.0")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{BENCH_DIR}/bench.db")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("QUEUE_ENABLED", "false")
+os.environ.setdefault("DEBUG", "false")
+
+import httpx
+
+from benchmarks.fake_graph import FakeGraphAPI
+
+SCENARIOS = ("send", "bulk", "logs")
+
+# Arguments that change what is measured; a baseline only compares under the same ones
+LOAD_OPTIONS = ("requests", "concurrency", "bulk_size", "page_size", "latency", "jitter", "error_rate", "throttle_rate")
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """
+    Nearest-rank percentile of an ascending list
+    """
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+async def run_scenario(
+    request: Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]],
+    client: httpx.AsyncClient,
+    total: int,
+    concurrency: int
+) -> Dict[str, float]:
+    """
+    Issue ``total`` requests from ``concurrency`` concurrent callers
+    """
+    latencies: List[float] = []
+    failures = 0
+    counter = iter(range(total))
+
+    async def caller() -> None:
+        nonlocal failures
+        for index in counter:
+            start = time.perf_counter()
+            response = await request(client, index)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                failures += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(caller() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "failures": failures,
+        "throughput": total / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000
+    }
+
+def phone_number(index: int) -> str:
+    return f"+1415{2000000 + index:07d}"
+
+def make_requests(bulk_size: int, page_size: int) -> Dict[str, Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]]:
+    cursors: List[str] = []
+
+    async def send(client: httpx.AsyncClient, index: int) -> httpx.Response:
+        return await client.post("/api/v1/whatsapp/send_message", json={"phone_number": phone_number(index)})
+
+    async def bulk(client: httpx.AsyncClient, index: int) -> httpx.Response:
+        first = 1000000 + index * bulk_size
+        return await client.post(
+            "/api/v1/whatsapp/send_bulk",
+            json={"phone_numbers": [phone_number(first + offset) for offset in range(bulk_size)]}
+        )
+
+    async def logs(client: httpx.AsyncClient, index: int) -> httpx.Response:
+        # Each caller continues from the last cursor handed out, starting over at the end
+        params = {"limit": page_size}
+        if cursors:
+            params["cursor"] = cursors.pop()
+        response = await client.get("/api/v1/whatsapp/logs", params=params)
+        if "X-Next-Cursor" in response.headers:
+            cursors.append(response.headers["X-Next-Cursor"])
+        return response
+
+    return {"send": send, "bulk": bulk, "logs": logs}
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], tolerance: float) -> bool:
+    """
+    Print the change against the baseline and return whether it holds
+    """
+    ok = True
+    print(f"\n{'scenario':<8} {'throughput':>12} {'p95':>10}")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        throughput = result["throughput"] / baseline[name]["throughput"] - 1
+        p95 = result["p95_ms"] / baseline[name]["p95_ms"] - 1
+        regressed = throughput < -tolerance or p95 > tolerance
+        ok = ok and not regressed
+        print(f"{name:<8} {throughput:>+11.1%} {p95:>+9.1%}{'  REGRESSION' if regressed else ''}")
+    return ok
+
+async def run(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    import app.main
+    from app.main import app as api
+
+    fake_graph = FakeGraphAPI(
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate, seed=42
+    )
+    requests = make_requests(args.bulk_size, args.page_size)
+    totals = {"send": args.requests, "bulk": max(1, args.requests // args.bulk_size), "logs": args.requests}
+    results = {}
+    # Wire the Graph API client to the fake before startup, so everything
+    # lifespan builds on it (the queue workers' service too) uses the fake
+    fake_client = lambda: httpx.AsyncClient(transport=httpx.ASGITransport(app=fake_graph))
+    with mock.patch.object(app.main, "create_http_client", fake_client):
+        async with api.router.lifespan_context(api):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api), base_url="http://bench") as client:
+                for name in args.scenarios:
+                    results[name] = await run_scenario(requests[name], client, totals[name], args.concurrency)
+                    result = results[name]
+                    print(
+                        f"{name:<8} {result['requests']:>6} req  {result['throughput']:>9.1f} req/s  "
+                        f"p50 {result['p50_ms']:7.2f} ms  p95 {result['p95_ms']:7.2f} ms  "
+                        f"p99 {result['p99_ms']:7.2f} ms  failures {result['failures']}"
+                    )
+    print(f"fake graph: {fake_graph.stats()}")
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario (bulk: recipients)")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--bulk-size", type=int, default=50, help="recipients per bulk request")
+    parser.add_argument("--page-size", type=int, default=50, help="logs per page")
+    parser.add_argument("--latency", type=float, default=0.02, help="fake Graph API latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency, up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of Graph API 500s")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of Graph API 429s")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--baseline", help="compare against results saved with --save-baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    parser.add_argument("--save-baseline", help="write the results as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    options = {name: getattr(args, name) for name in LOAD_OPTIONS}
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({"options": options, "results": results}, f, indent=2)
+            f.write("\n")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["options"] != options:
+            print(f"\nwarning: baseline was recorded with {baseline['options']}")
+        if not compare(results, baseline["results"], args.tolerance):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Micro-benchmark of phone number normalization
+
+Compares the uncached parser with the memoized validate_phone_number and
+the batch API on an audience that repeats, as campaign audiences do.
+
+Usage:
+    python -m benchmarks.bench_phone_normalization [--size 20000] [--unique 2000]
+"""
+import argparse
+import os
+import random
+import time
+
+os.environ.setdefault("WHATSAPP_PHONE_NUMBER_ID", "benchmark")
+os.environ.setdefault("WHATSAPP_ACCESS_TOKEN", "benchmark")
+
+from app.exceptions import InvalidPhoneNumberException
+from app.utils import _parse_phone_number, validate_phone_number, normalize_phone_numbers, phone_number_cache
+
+def make_audience(size: int, unique: int) -> list:
+    rng = random.Random(42)
+    numbers = [f"+1 415 {rng.randint(200, 999)} {rng.randint(1000, 9999)}" for _ in range(unique)]
+    numbers += ["12345", "not-a-number"]
+    return [rng.choice(numbers) for _ in range(size)]
+
+def timed(label: str, func, audience: list) -> float:
+    start = time.perf_counter()
+    func(audience)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed * 1000:9.1f} ms  {len(audience) / elapsed:12,.0f} numbers/s")
+    return elapsed
+
+def uncached(audience: list) -> None:
+    for number in audience:
+        try:
+            _parse_phone_number(number)
+        except InvalidPhoneNumberException:
+            pass
+
+def cached(audience: list) -> None:
+    for number in audience:
+        try:
+            validate_phone_number(number)
+        except InvalidPhoneNumberException:
+            pass
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=20000, help="numbers in the audience")
+    parser.add_argument("--unique", type=int, default=2000, help="distinct numbers in the audience")
+    args = parser.parse_args()
+
+    audience = make_audience(args.size, args.unique)
+    baseline = timed("uncached parse", uncached, audience)
+
+    phone_number_cache.clear()
+    timed("validate (cold cache)", cached, audience)
+    warm = timed("validate (warm cache)", cached, audience)
+
+    phone_number_cache.clear()
+    timed("batch normalize (cold)", normalize_phone_numbers, audience)
+    batch = timed("batch normalize (warm)", normalize_phone_numbers, audience)
+
+    print(f"\nwarm cache speed-up: {baseline / warm:.1f}x, batch: {baseline / batch:.1f}x")
+    print(f"cache: {phone_number_cache.stats()}")
+
+if __name__ == "__main__":
+    main()
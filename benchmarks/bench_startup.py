@@ -0,0 +1,136 @@
+"""
+Cold-start benchmark: process start to first served request
+
+Each run starts a fresh interpreter that imports app.main, runs the app's
+lifespan startup and serves one GET /api/v1/whatsapp/logs in-process
+(httpx.ASGITransport), then exits. Reports the median of the import,
+startup, first request and total wall time (including interpreter start)
+over --runs runs. --importtime also lists the slowest imports of app.main
+from ``python -X importtime``.
+
+Uses a throwaway SQLite database unless DATABASE_URL is set; its schema is
+created by a warm-up run, so the measured runs only verify it. Pass
+--skip-schema to start with SCHEMA_INIT=false, as workers started by
+app.server and deployments whose schema is owned by migrations do.
+
+Results can be saved as a baseline and later runs compared against it;
+the run exits with status 1 when the median total rises by more than
+--tolerance.
+
+Usage:
+    python -m benchmarks.bench_startup [--runs 5] [--skip-schema] [--importtime 15]
+    python -m benchmarks.bench_startup --save-baseline benchmarks/startup_baseline.json
+    python -m benchmarks.bench_startup --baseline benchmarks/startup_baseline.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+PHASES = ("import", "startup", "first_request", "total")
+
+async def serve_first_request(started: float) -> Dict[str, float]:
+    """
+    Body of a measured run, inside the fresh interpreter
+    """
+    from app.main import app
+    imported = time.perf_counter()
+
+    import httpx
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter()
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            response = await client.get("/api/v1/whatsapp/logs")
+        served = time.perf_counter()
+    response.raise_for_status()
+    return {"import": imported - started, "startup": ready - imported, "first_request": served - ready}
+
+def run_child() -> None:
+    started = time.perf_counter()
+    import asyncio
+    print(json.dumps(asyncio.run(serve_first_request(started))))
+
+def measure(env: Dict[str, str]) -> Dict[str, float]:
+    """
+    Time one cold start in a fresh interpreter
+    """
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--child"],
+        env=env, check=True, capture_output=True, text=True
+    ).stdout
+    total = time.perf_counter() - start
+    return {**json.loads(output.strip().splitlines()[-1]), "total": total}
+
+def slowest_imports(env: Dict[str, str], count: int) -> List[str]:
+    """
+    The ``count`` modules imported by app.main with the largest cumulative import time
+    """
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        env=env, check=True, capture_output=True, text=True
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), name.rstrip()))
+    rows.sort(reverse=True)
+    return [f"{cumulative / 1000:8.1f} ms  {name}" for cumulative, name in rows[:count]]
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--skip-schema", action="store_true", help="start with SCHEMA_INIT=false")
+    parser.add_argument("--importtime", type=int, default=0, metavar="N", help="list the N slowest imports")
+    parser.add_argument("--baseline", help="compare against results saved with --save-baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    parser.add_argument("--save-baseline", help="write the results as JSON")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child()
+        return
+
+    env = dict(os.environ)
+    env.setdefault("WHATSAPP_PHONE_NUMBER_ID", "benchmark")
+    env.setdefault("WHATSAPP_ACCESS_TOKEN", "benchmark")
+    env.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='whatsapp-bench-')}/bench.db")
+    env.setdefault("DEBUG", "false")
+
+    # Warm-up: creates the schema and fills the OS file cache
+    measure(env)
+    if args.skip_schema:
+        env["SCHEMA_INIT"] = "false"
+
+    runs = [measure(env) for _ in range(args.runs)]
+    results = {phase: statistics.median([run[phase] for run in runs]) * 1000 for phase in PHASES}
+    print("  ".join(f"{phase} {results[phase]:7.1f} ms" for phase in PHASES))
+
+    if args.importtime:
+        print("\nslowest imports of app.main:")
+        print("\n".join(slowest_imports(env, args.importtime)))
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({"skip_schema": args.skip_schema, "results": results}, f, indent=2)
+            f.write("\n")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["skip_schema"] != args.skip_schema:
+            print(f"\nwarning: baseline was recorded with skip_schema={baseline['skip_schema']}")
+        change = results["total"] / baseline["results"]["total"] - 1
+        print(f"\ntotal {change:+.1%} against the baseline{'  REGRESSION' if change > args.tolerance else ''}")
+        if change > args.tolerance:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
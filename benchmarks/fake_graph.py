@@ -0,0 +1,124 @@
+"""
+Local stand-in for the Graph API ``/messages`` endpoint
+
+Answers every POST ending in ``/messages`` like the Cloud API does, after a
+configurable latency, and injects server errors and 429 throttling at the
+given rates. It is a plain ASGI app: the load benchmark mounts it in-process
+through ``httpx.ASGITransport``; served on a port it can stand in for the
+Graph API of a deployed instance (point WHATSAPP_API_URL at it).
+
+Usage:
+    python -m benchmarks.fake_graph [--port 8900] [--latency 0.05] [--error-rate 0.01] [--throttle-rate 0.01]
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+from typing import Any, Dict, Optional
+
+# Graph API error code for throughput throttling
+THROTTLED_ERROR_CODE = 130429
+
+class FakeGraphAPI:
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after: Optional[float] = None,
+        seed: Optional[int] = None
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._ids = itertools.count(1)
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"requests": self.requests, "errors": self.errors, "throttled": self.throttled}
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+
+        body = b""
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+        if scope["method"] != "POST" or not scope["path"].endswith("/messages"):
+            await self._respond(send, 404, {"error": {"message": "Unknown path", "code": 100}})
+            return
+
+        self.requests += 1
+        delay = self.latency + self._random.uniform(0, self.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+
+        roll = self._random.random()
+        if roll < self.throttle_rate:
+            self.throttled += 1
+            headers = [(b"retry-after", str(self.retry_after).encode())] if self.retry_after is not None else []
+            await self._respond(send, 429, {
+                "error": {"message": "(#130429) Rate limit hit", "code": THROTTLED_ERROR_CODE}
+            }, headers)
+            return
+        if roll < self.throttle_rate + self.error_rate:
+            self.errors += 1
+            await self._respond(send, 500, {"error": {"message": "An unexpected error has occurred", "code": 2}})
+            return
+
+        try:
+            recipient = json.loads(body).get("to", "")
+        except ValueError:
+            recipient = ""
+        await self._respond(send, 200, {
+            "messaging_product": "whatsapp",
+            "contacts": [{"input": recipient, "wa_id": recipient.lstrip("+")}],
+            "messages": [{"id": f"wamid.fake{next(self._ids)}"}]
+        })
+
+    async def _respond(self, send, status: int, payload: Dict[str, Any], headers: Optional[list] = None) -> None:
+        content = json.dumps(payload).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(content)).encode())]
+            + (headers or [])
+        })
+        await send({"type": "http.response.body", "body": content})
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency, up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of 500 responses")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of 429 responses")
+    parser.add_argument("--retry-after", type=float, default=None, help="Retry-After seconds on 429s")
+    args = parser.parse_args()
+
+    import uvicorn
+    uvicorn.run(
+        FakeGraphAPI(args.latency, args.jitter, args.error_rate, args.throttle_rate, args.retry_after),
+        host=args.host, port=args.port, log_level="warning"
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import os
+
+# Settings are read at import time; provide test defaults before importing app
+os.environ.setdefault("WHATSAPP_PHONE_NUMBER_ID", "12345")
+os.environ.setdefault("WHATSAPP_ACCESS_TOKEN", "test-token")
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test_whatsapp.db")
+
+import httpx
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from app.models import Base
+
+@pytest_asyncio.fixture
+async def async_session_factory(tmp_path):
+    """Session factory bound to a throwaway SQLite database"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+    await engine.dispose()
+
+@pytest_asyncio.fixture
+async def client_with_async_db(async_session_factory):
+    """HTTP client for the app with its database dependencies bound to the throwaway database"""
+    from app.main import app
+    from app.dependencies import get_async_db_session, get_async_session_factory
+
+    async def override_db():
+        async with async_session_factory() as db:
+            yield db
+
+    app.dependency_overrides[get_async_db_session] = override_db
+    app.dependency_overrides[get_async_session_factory] = lambda: async_session_factory
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as api:
+            yield api
+    finally:
+        app.dependency_overrides.pop(get_async_db_session, None)
+        app.dependency_overrides.pop(get_async_session_factory, None)
+
+@pytest_asyncio.fixture
+async def async_db(async_session_factory):
+    """Async database session against a throwaway SQLite database"""
+    async with async_session_factory() as session:
+        yield session
+
+@pytest.fixture(autouse=True)
+def empty_response_cache():
+    """Keep cached read responses from leaking between tests"""
+    from app.services.response_cache import response_cache
+    response_cache.invalidate()
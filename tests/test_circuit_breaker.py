@@ -0,0 +1,75 @@
+import httpx
+import pytest
+from types import SimpleNamespace
+from sqlalchemy import select
+from app.exceptions import CircuitOpenException
+from app.models import MessageLog
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.sender_pool import Sender, SenderPool
+from app.services.whatsapp_service import WhatsAppService
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.services.circuit_breaker.time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+def test_opens_on_failure_rate(clock):
+    """Test that the circuit opens once the failure rate over the window is reached"""
+    breaker = CircuitBreaker(failure_threshold=100, failure_rate=0.5, window=10, min_calls=4, open_seconds=5)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"  # below min_calls
+    breaker.record_success()
+    assert breaker.state == "open"
+    assert not breaker.acquire()
+    assert breaker.retry_after() == 5
+
+def test_half_open_probes(clock):
+    """Test that a half-open circuit admits one probe and follows its outcome"""
+    breaker = CircuitBreaker(failure_threshold=1, open_seconds=5, half_open_probes=1)
+    breaker.record_failure()
+    clock[0] += 5
+    assert breaker.acquire() and breaker.state == "half_open"
+    assert not breaker.acquire()
+
+    breaker.record_failure()
+    assert breaker.state == "open" and breaker.times_opened == 2
+
+    clock[0] += 5
+    assert breaker.acquire()
+    breaker.release()
+    assert breaker.acquire()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.stats()["recent_calls"] == 0
+
+@pytest.mark.asyncio
+async def test_open_circuit_fails_fast_without_request(async_db, clock, monkeypatch):
+    """Test fast-fail while open, attempts left untouched, and the spillover switch"""
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(503, text="Unavailable")
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    breaker = CircuitBreaker(failure_threshold=1, open_seconds=30)
+    senders = SenderPool([Sender("https://graph.test", "12345", "token", breaker=breaker)])
+    service = WhatsAppService(client=client, rate_limiter=None, senders=senders)
+
+    results = await service.send_bulk(async_db, ["+1234567890"])
+    assert not results[0]["success"] and len(requests) == 1
+
+    with pytest.raises(CircuitOpenException) as exc_info:
+        await service.send_message(async_db, "+1234567891")
+    assert exc_info.value.status_code == 503
+    assert len(requests) == 1
+    log = await async_db.scalar(select(MessageLog).where(MessageLog.phone_number == "+1234567891"))
+    assert log.status == "failed" and log.attempts == 0
+
+    assert not service.should_spill_over()
+    monkeypatch.setattr("app.services.whatsapp_service.settings.circuit_spillover", True)
+    assert service.should_spill_over()
+    await client.aclose()
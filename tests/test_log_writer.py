@@ -0,0 +1,73 @@
+import itertools
+import pytest
+import httpx
+from unittest.mock import MagicMock
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import MessageLog
+from app.services.log_writer import LogWriter
+from app.services.whatsapp_service import WhatsAppService
+
+@pytest.fixture
+def log_writer(async_session_factory):
+    # Stand-in for the Postgres sequence
+    counter = itertools.count(1000)
+
+    async def id_source(size):
+        return [next(counter) for _ in range(size)]
+
+    return LogWriter(async_session_factory, flush_interval=60, max_pending=100, id_block_size=10, id_source=id_source)
+
+@pytest.mark.asyncio
+async def test_updates_are_folded_into_pending_inserts(log_writer, async_session_factory):
+    """Test that a create plus status transition is written as one row"""
+    log_id = await log_writer.create(phone_number="+1234567890", message="hi", status="sending")
+    log_writer.update(log_id, status="sent", wa_message_id="wamid.1", attempts=1)
+    assert log_writer.stats()["pending_updates"] == 0
+
+    assert await log_writer.flush() == 1
+    async with async_session_factory() as db:
+        log = await db.scalar(select(MessageLog))
+    assert (log.id, log.status, log.wa_message_id, log.attempts) == (1000, "sent", "wamid.1", 1)
+    # Timestamps come from the column defaults, as for rows written through the ORM
+    assert log.created_at is not None and log.updated_at is not None
+
+    # Once written, later transitions become updates
+    log_writer.update(log_id, status="failed", error_message="late failure")
+    assert await log_writer.flush() == 1
+    async with async_session_factory() as db:
+        assert (await db.scalar(select(MessageLog.status))) == "failed"
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_rows(log_writer, async_session_factory):
+    """Test that rows survive a failed flush and are written by the next one"""
+    await log_writer.create(phone_number="+1234567890", message="hi", status="sent")
+    log_writer.session_factory = MagicMock(side_effect=RuntimeError("database unavailable"))
+    with pytest.raises(RuntimeError):
+        await log_writer.flush()
+    assert log_writer.pending == 1
+
+    log_writer.session_factory = async_session_factory
+    await log_writer.stop()
+    assert log_writer.pending == 0
+    async with async_session_factory() as db:
+        assert len((await db.scalars(select(MessageLog))).all()) == 1
+
+@pytest.mark.asyncio
+async def test_send_message_writes_behind(log_writer, async_session_factory):
+    """Test that a send with a log writer skips the request's session"""
+    client = httpx.AsyncClient(transport=httpx.MockTransport(
+        lambda request: httpx.Response(200, json={"messages": [{"id": "wamid.behind"}]})
+    ))
+    service = WhatsAppService(client=client, log_writer=log_writer)
+    mock_db = MagicMock(spec=AsyncSession)
+
+    result = await service.send_message(mock_db, "+1234567890")
+
+    assert result["messages"][0]["id"] == "wamid.behind"
+    mock_db.add.assert_not_called()
+    mock_db.commit.assert_not_called()
+    await log_writer.flush()
+    async with async_session_factory() as db:
+        log = await db.scalar(select(MessageLog))
+    assert (log.status, log.wa_message_id, log.locked_until) == ("sent", "wamid.behind", None)
@@ -0,0 +1,78 @@
+import asyncio
+import hashlib
+import pytest
+import httpx
+from app.exceptions import InvalidMessageException, WhatsAppAPIException
+from app.services.media_service import MediaService, file_sha256
+from app.services.whatsapp_service import WhatsAppService
+
+@pytest.fixture
+def media_root(tmp_path):
+    (tmp_path / "brochure.pdf").write_bytes(b"%PDF-1.4 brochure" * 1000)
+    (tmp_path / "other.pdf").write_bytes(b"%PDF-1.4 other")
+    return tmp_path
+
+@pytest.fixture
+def uploads():
+    """Request bodies seen by the fake /media endpoint"""
+    return []
+
+@pytest.fixture
+def media_service(media_root, uploads):
+    async def handler(request):
+        uploads.append(await request.aread())
+        # Let concurrent callers pile up behind the first upload
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"id": f"media-{len(uploads)}"})
+
+    service = WhatsAppService(client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    return MediaService(service, media_root=str(media_root), chunk_size=1024)
+
+@pytest.mark.asyncio
+async def test_same_content_is_uploaded_once(media_service, uploads):
+    """Test that concurrent and repeated sends of one asset share an upload"""
+    media_ids = await asyncio.gather(*(media_service.upload("brochure.pdf") for _ in range(5)))
+    media_ids.append(await media_service.upload("brochure.pdf"))
+
+    assert media_ids == ["media-1"] * 6
+    assert len(uploads) == 1
+    assert b"%PDF-1.4 brochure" in uploads[0]
+    assert b'name="type"' in uploads[0] and b"application/pdf" in uploads[0]
+    assert media_service.stats() == {"cached_media": 1, "uploads": 1, "cache_hits": 5}
+
+    assert await media_service.upload("other.pdf") == "media-2"
+
+@pytest.mark.asyncio
+async def test_expired_media_id_is_uploaded_again(media_service, uploads):
+    """Test that cached media IDs are dropped after the TTL"""
+    media_service.cache_ttl = 0
+    await media_service.upload("brochure.pdf")
+    await media_service.upload("brochure.pdf")
+
+    assert len(uploads) == 2
+
+@pytest.mark.asyncio
+async def test_paths_outside_media_root_are_rejected(media_service):
+    """Test that uploads cannot read arbitrary files"""
+    with pytest.raises(InvalidMessageException):
+        await media_service.upload("../secrets.txt")
+    with pytest.raises(InvalidMessageException):
+        await media_service.upload("missing.pdf")
+
+@pytest.mark.asyncio
+async def test_failed_upload_is_not_cached(media_root):
+    """Test that an API error surfaces and the next call retries"""
+    responses = iter([httpx.Response(500, text="oops"), httpx.Response(200, json={"id": "media-ok"})])
+    service = WhatsAppService(client=httpx.AsyncClient(transport=httpx.MockTransport(lambda request: next(responses))))
+    media_service = MediaService(service, media_root=str(media_root))
+
+    with pytest.raises(WhatsAppAPIException) as exc_info:
+        await media_service.upload("brochure.pdf")
+    assert exc_info.value.retryable
+
+    assert await media_service.upload("brochure.pdf") == "media-ok"
+
+def test_file_sha256_matches_hashlib(media_root):
+    """Test chunked hashing against a one-shot digest"""
+    content = (media_root / "brochure.pdf").read_bytes()
+    assert file_sha256(media_root / "brochure.pdf", 1000) == hashlib.sha256(content).hexdigest()
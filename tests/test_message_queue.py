@@ -0,0 +1,112 @@
+import asyncio
+import pytest
+import httpx
+import json
+from datetime import datetime, timedelta
+from sqlalchemy import select, update
+from app.models import MessageLog
+from app.services.whatsapp_service import WhatsAppService
+from app.services.message_queue import MessageWorkerPool, claim_pending_messages, release_expired_leases
+from app.services.message_templates import media_message
+
+@pytest.fixture
+def graph_api_requests():
+    """Recipients seen by the fake Graph API"""
+    return []
+
+@pytest.fixture
+def whatsapp_service(graph_api_requests):
+    def handler(request):
+        recipient = json.loads(request.content)["to"]
+        graph_api_requests.append(recipient)
+        return httpx.Response(200, json={"messages": [{"id": f"wamid.{recipient}"}]})
+
+    return WhatsAppService(client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+@pytest.mark.asyncio
+async def test_enqueued_messages_are_delivered_by_workers(whatsapp_service, async_session_factory, graph_api_requests):
+    """Test that enqueued rows are claimed and delivered"""
+    async with async_session_factory() as db:
+        log_ids = await whatsapp_service.enqueue_messages(db, ["+1234567890", "+1234567891"])
+
+    pool = MessageWorkerPool(whatsapp_service, async_session_factory, workers=1, batch_size=10)
+    assert await pool.run_once() == 2
+    assert await pool.run_once() == 0
+
+    async with async_session_factory() as db:
+        logs = (await db.scalars(select(MessageLog).order_by(MessageLog.id))).all()
+    assert [log.id for log in logs] == log_ids
+    assert [log.status for log in logs] == ["sent", "sent"]
+    assert all(log.locked_until is None for log in logs)
+    assert sorted(graph_api_requests) == ["+1234567890", "+1234567891"]
+
+@pytest.mark.asyncio
+async def test_claims_do_not_overlap(whatsapp_service, async_session_factory):
+    """Test that concurrent claimers never receive the same row"""
+    async with async_session_factory() as db:
+        await whatsapp_service.enqueue_messages(db, [f"+123456789{i}" for i in range(5)])
+
+    async with async_session_factory() as first, async_session_factory() as second:
+        claimed_first = await claim_pending_messages(first, 3)
+        claimed_second = await claim_pending_messages(second, 3)
+
+    assert len(claimed_first) == 3
+    assert len(claimed_second) == 2
+    assert not {log.id for log in claimed_first} & {log.id for log in claimed_second}
+
+@pytest.mark.asyncio
+async def test_expired_lease_is_returned_to_queue(whatsapp_service, async_session_factory):
+    """Test that a message stranded mid-send is delivered again"""
+    async with async_session_factory() as db:
+        await whatsapp_service.enqueue_messages(db, ["+1234567890"])
+        claimed = await claim_pending_messages(db, 10)
+        assert len(claimed) == 1
+
+        # Simulate a worker that died without recording the outcome
+        await db.execute(
+            update(MessageLog).values(locked_until=datetime.utcnow() - timedelta(seconds=1))
+        )
+        await db.commit()
+        assert await release_expired_leases(db) == 1
+
+    pool = MessageWorkerPool(whatsapp_service, async_session_factory, workers=1, batch_size=10)
+    assert await pool.run_once() == 1
+
+@pytest.mark.asyncio
+async def test_worker_pool_drains_queue_in_background(whatsapp_service, async_session_factory, graph_api_requests):
+    """Test that started workers pick up new messages and stop cleanly"""
+    pool = MessageWorkerPool(whatsapp_service, async_session_factory, workers=2, batch_size=5, poll_interval=0.05)
+    pool.start()
+    try:
+        async with async_session_factory() as db:
+            await whatsapp_service.enqueue_messages(db, ["+1234567890"])
+        for _ in range(50):
+            if graph_api_requests:
+                break
+            await asyncio.sleep(0.02)
+    finally:
+        await pool.stop(timeout=1.0)
+
+    assert graph_api_requests == ["+1234567890"]
+
+@pytest.mark.asyncio
+async def test_queued_messages_keep_their_content(async_session_factory):
+    """Test that workers rebuild the stored message instead of the default text"""
+    payloads = []
+
+    def handler(request):
+        payloads.append(json.loads(request.content))
+        return httpx.Response(200, json={"messages": [{"id": f"wamid.{payloads[-1]['to']}"}]})
+
+    service = WhatsAppService(client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    message = media_message("document", link="https://example.com/invoice.pdf", caption="Your invoice")
+    async with async_session_factory() as db:
+        await service.enqueue_messages(db, ["+1234567890", "+1234567891"], message=message)
+
+    pool = MessageWorkerPool(service, async_session_factory, workers=1, batch_size=10)
+    assert await pool.run_once() == 2
+
+    assert [payload["to"] for payload in payloads] == ["+1234567890", "+1234567891"]
+    assert all(payload["document"]["caption"] == "Your invoice" for payload in payloads)
+    async with async_session_factory() as db:
+        assert (await db.scalars(select(MessageLog.message))).all() == ["Your invoice", "Your invoice"]
@@ -0,0 +1,97 @@
+import pytest
+import httpx
+import json
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select
+from app.models import MessageLog
+from app.schemas import BulkMessageRequest
+from app.services.message_queue import MessageWorkerPool
+from app.services.message_scheduler import MessageScheduler, spread_times
+from app.services.message_stats import MessageStats
+from app.services.whatsapp_service import WhatsAppService
+
+@pytest.fixture
+def whatsapp_service():
+    def handler(request):
+        recipient = json.loads(request.content)["to"]
+        return httpx.Response(200, json={"messages": [{"id": f"wamid.{recipient}"}]})
+
+    return WhatsAppService(
+        client=httpx.AsyncClient(transport=httpx.MockTransport(handler)), stats=MessageStats()
+    )
+
+def test_spread_times():
+    """Test that a send window is divided evenly and excludes its end"""
+    start = datetime(2024, 1, 1, 9)
+    assert spread_times(start, datetime(2024, 1, 1, 11), 4) == [
+        datetime(2024, 1, 1, 9), datetime(2024, 1, 1, 9, 30), datetime(2024, 1, 1, 10), datetime(2024, 1, 1, 10, 30)
+    ]
+    assert spread_times(start, None, 2) == [start, start]
+
+def test_schedule_times_are_stored_as_utc():
+    """Test that offsets are normalized and an inverted window is rejected"""
+    request = BulkMessageRequest(
+        phone_numbers=["+1234567890"],
+        scheduled_at=datetime(2024, 1, 1, 9, tzinfo=timezone(timedelta(hours=-5))),
+        send_until="2024-01-01T16:00:00Z"
+    )
+    assert request.scheduled_at == datetime(2024, 1, 1, 14)
+    assert request.send_until == datetime(2024, 1, 1, 16)
+
+    with pytest.raises(ValueError):
+        BulkMessageRequest(phone_numbers=["+1234567890"], scheduled_at="2024-01-01T10:00:00", send_until="2024-01-01T09:00:00")
+    with pytest.raises(ValueError):
+        BulkMessageRequest(phone_numbers=["+1234567890"], send_until="2024-01-01T09:00:00")
+
+@pytest.mark.asyncio
+async def test_scheduled_messages_wait_for_their_time(whatsapp_service, async_session_factory):
+    """Test that scheduled messages are only handed to the workers once due"""
+    start = datetime(2024, 1, 1, 9)
+    async with async_session_factory() as db:
+        log_ids = await whatsapp_service.enqueue_messages(
+            db, ["+1234567890", "+1234567891"], scheduled_at=start, send_until=start + timedelta(hours=2)
+        )
+    assert whatsapp_service.stats.counts["scheduled"] == 2
+
+    pool = MessageWorkerPool(whatsapp_service, async_session_factory, workers=1, batch_size=10)
+    scheduler = MessageScheduler(whatsapp_service, async_session_factory, horizon=3600, refresh_interval=60)
+
+    # Nothing due yet, and the workers do not touch scheduled rows
+    assert await scheduler.run_once(now=start - timedelta(minutes=1)) == 0
+    assert await pool.run_once() == 0
+
+    assert await scheduler.run_once(now=start) == 1
+    assert await pool.run_once() == 1
+    assert await scheduler.run_once(now=start + timedelta(minutes=59)) == 0
+    # The second message is beyond the first load's horizon and comes in on a reload
+    assert await scheduler.run_once(now=start + timedelta(hours=1, minutes=1)) == 1
+    assert await pool.run_once() == 1
+
+    async with async_session_factory() as db:
+        logs = (await db.scalars(select(MessageLog).order_by(MessageLog.id))).all()
+    assert [log.id for log in logs] == log_ids
+    assert [log.status for log in logs] == ["sent", "sent"]
+    assert [log.scheduled_at for log in logs] == [start, start + timedelta(hours=1)]
+    assert whatsapp_service.stats.counts["scheduled"] == 0
+
+@pytest.mark.asyncio
+async def test_scheduler_memory_is_bounded(whatsapp_service, async_session_factory):
+    """Test that only a batch is held and the rest is loaded as it drains"""
+    start = datetime(2024, 1, 1, 9)
+    async with async_session_factory() as db:
+        await whatsapp_service.enqueue_messages(
+            db, [f"+12345678{i:02d}" for i in range(10)], scheduled_at=start, send_until=start + timedelta(seconds=10)
+        )
+
+    scheduler = MessageScheduler(whatsapp_service, async_session_factory, horizon=3600, batch_size=3)
+    released = 0
+    now = start
+    while released < 10:
+        released += await scheduler.run_once(now=now)
+        assert scheduler.pending() <= 3
+        now += timedelta(seconds=1)
+    assert now <= start + timedelta(seconds=11)
+
+    async with async_session_factory() as db:
+        statuses = (await db.scalars(select(MessageLog.status))).all()
+    assert statuses == ["pending"] * 10
@@ -0,0 +1,70 @@
+import httpx
+import pytest
+from app.models import MessageLog
+from app.services.log_maintenance import LogMaintenance
+from app.services.message_stats import MessageStats, SlidingWindowCounter
+from app.services.whatsapp_service import WhatsAppService
+
+def test_sliding_window_drops_old_buckets():
+    """Test that totals only cover the window and reused slots are reset"""
+    counter = SlidingWindowCounter(120)
+    counter.add(3, now=1000.5)
+    counter.add(2, now=1059)
+    counter.add(1, now=1119)
+
+    assert counter.total(60, now=1119) == 1
+    assert counter.total(120, now=1119) == 6
+    # Second 1120 reuses the slot of second 1000
+    counter.add(4, now=1120)
+    assert counter.total(120, now=1120) == 7
+    assert counter.per_minute(now=1120) == [2, 5]
+
+def test_record_moves_counts_between_statuses():
+    """Test status transitions and the sent/failed rates"""
+    stats = MessageStats(window_minutes=2)
+    stats.record("pending", count=3)
+    stats.record("sending", "pending", 3)
+    stats.record("sent", "sending", 2)
+    stats.record("failed", "sending")
+
+    snapshot = stats.snapshot()
+    assert snapshot["counts"] == {"pending": 0, "sending": 0, "sent": 2, "failed": 1}
+    assert snapshot["last_minute"] == {"sent": 2, "failed": 1}
+    assert len(snapshot["per_minute"]) == 2
+    assert sum(minute["sent"] for minute in snapshot["per_minute"]) == 2
+    assert snapshot["reconciled_at"] is None
+
+@pytest.mark.asyncio
+async def test_maintenance_reconciles_counts_from_the_rollup(async_session_factory):
+    """Test that a maintenance pass takes the counts from the refreshed hourly rollup"""
+    async with async_session_factory() as db:
+        db.add_all([
+            MessageLog(phone_number="+1234567890", message="hi", status=status)
+            for status in ["sent", "sent", "delivered"]
+        ])
+        await db.commit()
+    stats = MessageStats(window_minutes=1)
+    stats.record("failed")
+
+    assert await LogMaintenance(async_session_factory.kw["bind"], stats=stats).run_once()
+
+    assert stats.counts == {"sent": 2, "delivered": 1}
+    assert stats.snapshot()["reconciled_at"] is not None
+
+@pytest.mark.asyncio
+async def test_service_records_send_outcomes(async_db):
+    """Test that sends update the counters without reading them back"""
+    def handler(request):
+        if b"+1234567891" in request.content:
+            return httpx.Response(400, text="Bad Request")
+        return httpx.Response(200, json={"messages": [{"id": f"wamid.{len(request.content)}"}]})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    stats = MessageStats(window_minutes=1)
+    service = WhatsAppService(client=client, stats=stats)
+
+    await service.send_bulk(async_db, ["+1234567890", "+1234567891"])
+    await service.enqueue_messages(async_db, ["+1234567892"])
+
+    assert stats.counts == {"sending": 0, "sent": 1, "failed": 1, "pending": 1}
+    await client.aclose()
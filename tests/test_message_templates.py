@@ -0,0 +1,65 @@
+import json
+import pytest
+from app.exceptions import InvalidMessageException
+from app.services.message_templates import (
+    CompiledMessage, MessageTemplate, TemplateRegistry, DEFAULT_TEXT_MESSAGE, DEFAULT_MESSAGE,
+    compile_message, media_message, text_message
+)
+
+def test_rendered_payload_matches_graph_api_format():
+    """Test that splicing the recipient yields the full message payload"""
+    payload = json.loads(text_message("Hi there").render("+1234567890"))
+
+    assert payload == {
+        "messaging_product": "whatsapp",
+        "recipient_type": "individual",
+        "type": "text",
+        "text": {"preview_url": False, "body": "Hi there"},
+        "to": "+1234567890"
+    }
+
+def test_default_message_is_compiled_once():
+    """Test that requests without a message share the default skeleton"""
+    assert compile_message(None) is DEFAULT_TEXT_MESSAGE
+    assert json.loads(DEFAULT_TEXT_MESSAGE.render("+1234567890"))["text"]["body"] == DEFAULT_MESSAGE
+
+def test_template_fills_parameters():
+    """Test template compilation with a media header and body parameters"""
+    template = MessageTemplate("shipping", language="de", body_parameters=1, header_format="image")
+    message = template.compile(["ABC123"], header="https://example.com/box.png")
+    payload = json.loads(message.render("+1234567890"))
+
+    assert payload["type"] == "template"
+    assert payload["template"]["language"] == {"code": "de"}
+    assert payload["template"]["components"] == [
+        {"type": "header", "parameters": [{"type": "image", "image": {"link": "https://example.com/box.png"}}]},
+        {"type": "body", "parameters": [{"type": "text", "text": "ABC123"}]}
+    ]
+    assert message.summary == "[template] shipping (ABC123)"
+
+def test_template_rejects_wrong_parameter_count():
+    """Test that parameters must match the registered template"""
+    registry = TemplateRegistry()
+    registry.register(MessageTemplate("welcome", body_parameters=1))
+
+    with pytest.raises(InvalidMessageException):
+        registry.get("welcome").compile([])
+    with pytest.raises(InvalidMessageException):
+        registry.get("unknown")
+
+def test_media_message_validation():
+    """Test that media needs exactly one of an ID and a link"""
+    document = media_message("document", media_id="123", filename="invoice.pdf")
+    assert json.loads(document.render("+1"))["document"] == {"id": "123", "filename": "invoice.pdf"}
+
+    with pytest.raises(InvalidMessageException):
+        media_message("image", media_id="123", link="https://example.com/a.png")
+    with pytest.raises(InvalidMessageException):
+        compile_message({"type": "image"})
+
+def test_stored_content_round_trips():
+    """Test that queued messages rebuild the same payload"""
+    message = compile_message({"type": "image", "link": "https://example.com/a.png", "caption": "Sale"})
+    restored = CompiledMessage.from_json(message.to_json(), message.summary)
+
+    assert restored.render("+1234567890") == message.render("+1234567890")
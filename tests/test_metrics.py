@@ -0,0 +1,75 @@
+import httpx
+import pytest
+from app.metrics import Metrics
+from app.services.retry import RetryPolicy
+from app.services.whatsapp_service import WhatsAppService
+from app.utils import PhoneNumberCache
+from app.exceptions import WhatsAppAPIException
+
+def stage_count(metrics, stage):
+    return metrics.registry.get_sample_value("whatsapp_send_stage_seconds_count", {"stage": stage})
+
+def error_count(metrics, error):
+    return metrics.registry.get_sample_value("whatsapp_send_errors_total", {"error": error})
+
+@pytest.mark.asyncio
+async def test_send_message_times_each_stage(async_db):
+    """Test that a synchronous send observes insert, API call and commit"""
+    client = httpx.AsyncClient(transport=httpx.MockTransport(
+        lambda request: httpx.Response(200, json={"messages": [{"id": "wamid.1"}]})
+    ))
+    metrics = Metrics()
+    service = WhatsAppService(client=client, metrics=metrics)
+
+    await service.send_message(async_db, "+1234567890")
+
+    for stage in ("insert", "rate_limit", "api_call", "commit"):
+        assert stage_count(metrics, stage) == 1
+    assert stage_count(metrics, "validate") == 0
+    await client.aclose()
+
+@pytest.mark.asyncio
+async def test_errors_are_counted_by_class(async_db):
+    """Test the API rejection and transport error counters"""
+    def handler(request):
+        if b"+1234567891" in request.content:
+            raise httpx.ConnectError("connection refused")
+        return httpx.Response(400, text="Bad Request")
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    metrics = Metrics()
+    retry_policy = RetryPolicy(max_attempts=3, base_delay=0.0, max_delay=0.0, inline_attempts=2)
+    service = WhatsAppService(client=client, retry_policy=retry_policy, metrics=metrics)
+
+    with pytest.raises(WhatsAppAPIException):
+        await service.send_message(async_db, "+1234567890")
+    await service.send_bulk(async_db, ["+1234567891"])
+
+    assert error_count(metrics, "WhatsAppAPIException") == 1
+    # Connection errors are retried inline, each attempt is counted
+    assert error_count(metrics, "RequestError") == 2
+    await client.aclose()
+
+def test_pool_and_queue_gauges():
+    """Test that sampled gauges end up in the rendered exposition"""
+    metrics = Metrics()
+    metrics.sample_pools({"active": 2, "idle": 3})
+    metrics.sample_queue({"pending": 7})
+
+    output = metrics.render().decode()
+    assert 'whatsapp_http_pool_connections{state="idle"} 3.0' in output
+    assert 'whatsapp_queue_depth{status="pending"} 7.0' in output
+    assert 'whatsapp_queue_depth{status="sending"} 0.0' in output
+
+def test_phone_cache_gauges():
+    """Test that phone number cache hits and misses are exported"""
+    cache = PhoneNumberCache(maxsize=10)
+    cache.get("+14155552671")
+    cache.put("+14155552671", (True, "+14155552671"))
+    cache.get("+14155552671")
+    metrics = Metrics()
+    metrics.sample_phone_cache(cache.stats())
+
+    assert metrics.registry.get_sample_value("whatsapp_phone_cache", {"value": "hits"}) == 1
+    assert metrics.registry.get_sample_value("whatsapp_phone_cache", {"value": "misses"}) == 1
+    assert metrics.registry.get_sample_value("whatsapp_phone_cache", {"value": "size"}) == 1
\ No newline at end of file
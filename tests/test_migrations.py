@@ -0,0 +1,40 @@
+import json
+from sqlalchemy import create_engine, inspect, text
+from app.migrations import upgrade_schema, backfill_wa_message_ids
+from app.models import Base
+
+def test_upgrade_adds_and_backfills_wa_message_id(tmp_path):
+    """Test upgrading a message_logs table from before wa_message_id"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE message_logs (id INTEGER PRIMARY KEY, phone_number VARCHAR(20) NOT NULL, "
+            "message TEXT NOT NULL, status VARCHAR(20) NOT NULL, response_data TEXT, error_message TEXT, "
+            "created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL)"
+        ))
+        for i in range(5):
+            response_data = json.dumps({"messages": [{"id": f"wamid.{i}"}]}) if i != 3 else None
+            connection.execute(
+                text("INSERT INTO message_logs VALUES (:id, '+1234567890', 'hi', 'sent', :data, NULL, '2024-01-01', '2024-01-01')"),
+                {"id": i + 1, "data": response_data}
+            )
+
+    with engine.begin() as connection:
+        Base.metadata.create_all(connection)
+        upgrade_schema(connection)
+
+    with engine.connect() as connection:
+        # Startup only runs the DDL; the backfill is committed batch by batch
+        assert connection.execute(text("SELECT count(wa_message_id) FROM message_logs")).scalar() == 0
+        assert backfill_wa_message_ids(connection, batch_size=2) == 4
+
+    with engine.begin() as connection:
+        rows = connection.execute(text("SELECT id, wa_message_id, attempts FROM message_logs ORDER BY id")).all()
+        assert [row.wa_message_id for row in rows] == ["wamid.0", "wamid.1", "wamid.2", None, "wamid.4"]
+        assert all(row.attempts == 0 for row in rows)
+        assert "ix_message_logs_wa_message_id" in {index["name"] for index in inspect(connection).get_indexes("message_logs")}
+
+    with engine.connect() as connection:
+        # Running again finds nothing left to do
+        assert backfill_wa_message_ids(connection, batch_size=2) == 0
+    engine.dispose()
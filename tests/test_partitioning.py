@@ -0,0 +1,99 @@
+from datetime import datetime
+from unittest.mock import MagicMock
+from sqlalchemy import create_engine, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex, CreateTable
+from app.models import Base, MessageLog, MessageStatsHourly
+from app.partitioning import (
+    KEY_GUARD_DDL, KEY_TABLE, drop_expired_partitions, partition_bounds, partitioned_logs_table, run_log_maintenance
+)
+
+def test_partition_bounds():
+    """Test partition names and ranges, including the year rollover"""
+    assert partition_bounds(datetime(2024, 12, 15, 8), "monthly") == (
+        "message_logs_p2024_12", datetime(2024, 12, 1), datetime(2025, 1, 1)
+    )
+    assert partition_bounds(datetime(2024, 2, 29, 23), "daily") == (
+        "message_logs_p2024_02_29", datetime(2024, 2, 29), datetime(2024, 3, 1)
+    )
+
+def test_partitioned_table_keys_include_created_at():
+    """Test that the partitioned definition satisfies Postgres' unique key rule"""
+    table = partitioned_logs_table()
+    ddl = str(CreateTable(table).compile(dialect=postgresql.dialect()))
+
+    assert "PRIMARY KEY (id, created_at)" in ddl
+    assert "PARTITION BY RANGE (created_at)" in ddl
+    unique_indexes = [index for index in table.indexes if index.unique]
+    assert unique_indexes and all(index.columns.keys()[-1] == "created_at" for index in unique_indexes)
+    assert "(wa_message_id, created_at)" in " ".join(
+        str(CreateIndex(index).compile(dialect=postgresql.dialect())) for index in unique_indexes
+    )
+    # The mapped table keeps its single-column key
+    assert MessageLog.__table__.primary_key.columns.keys() == ["id"]
+
+def test_key_guard_covers_idempotency_keys_and_wamids():
+    """Test that the guard table keys on the value alone, without created_at"""
+    ddl = " ".join(KEY_GUARD_DDL)
+
+    assert "PRIMARY KEY (kind, key)" in ddl
+    assert "'idempotency', NEW.idempotency_key" in ddl
+    assert "'wamid', NEW.wa_message_id" in ddl
+    assert "UPDATE OF idempotency_key, wa_message_id ON message_logs" in ddl
+
+def test_drop_expired_partitions_clears_guard_keys(monkeypatch):
+    """Test that a partition's guard keys are removed before it is dropped"""
+    monkeypatch.setattr("app.partitioning.settings.log_retention_days", 30)
+    monkeypatch.setattr(
+        "app.partitioning.list_partitions", lambda connection: ["message_logs_p2024_01", "message_logs_p2024_03"]
+    )
+    connection = MagicMock()
+
+    assert drop_expired_partitions(connection, now=datetime(2024, 3, 15)) == ["message_logs_p2024_01"]
+    statements = [(str(call.args[0]), call.args[1:]) for call in connection.execute.call_args_list]
+    assert statements == [
+        (
+            f"DELETE FROM {KEY_TABLE} WHERE created_at >= :start AND created_at < :end",
+            ({"start": datetime(2024, 1, 1), "end": datetime(2024, 2, 1)},)
+        ),
+        ("DROP TABLE message_logs_p2024_01", ())
+    ]
+
+def test_hourly_rollup(tmp_path):
+    """Test that the rollup counts by hour and status and refreshes recent hours"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'rollup.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        for minute, status in [(0, "sent"), (10, "sent"), (59, "failed")]:
+            connection.execute(MessageLog.__table__.insert().values(
+                phone_number="+1234567890", message="hi", status=status,
+                created_at=datetime(2024, 1, 1, 10, minute), updated_at=datetime(2024, 1, 1, 10, minute)
+            ))
+        connection.execute(MessageLog.__table__.insert().values(
+            phone_number="+1234567890", message="hi", status="sent",
+            created_at=datetime(2024, 1, 1, 11, 30), updated_at=datetime(2024, 1, 1, 11, 30)
+        ))
+
+    with engine.begin() as connection:
+        assert run_log_maintenance(connection, now=datetime(2024, 1, 1, 12))
+
+    def rollup():
+        with engine.connect() as connection:
+            rows = connection.execute(
+                select(MessageStatsHourly.hour, MessageStatsHourly.status, MessageStatsHourly.count)
+                .order_by(MessageStatsHourly.hour, MessageStatsHourly.status)
+            ).all()
+        return [tuple(row) for row in rows]
+
+    assert rollup() == [
+        (datetime(2024, 1, 1, 10), "failed", 1),
+        (datetime(2024, 1, 1, 10), "sent", 2),
+        (datetime(2024, 1, 1, 11), "sent", 1),
+    ]
+
+    # A status change inside the lookback window is picked up on the next run
+    with engine.begin() as connection:
+        connection.execute(MessageLog.__table__.update().where(MessageLog.id == 4).values(status="read"))
+        run_log_maintenance(connection, now=datetime(2024, 1, 1, 12))
+    assert rollup()[-1] == (datetime(2024, 1, 1, 11), "read", 1)
+    engine.dispose()
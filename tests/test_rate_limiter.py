@@ -0,0 +1,75 @@
+import pytest
+import httpx
+from app.exceptions import WhatsAppAPIException
+from app.services.message_templates import DEFAULT_TEXT_MESSAGE
+from app.services.rate_limiter import AdaptiveRateLimiter, TokenBucket
+from app.services.whatsapp_service import WhatsAppService
+
+def make_limiter(**overrides):
+    options = dict(rate=10.0, burst=2.0, recipient_rate=1.0, recipient_burst=5.0, max_wait=30.0)
+    options.update(overrides)
+    return AdaptiveRateLimiter(**options)
+
+def test_token_bucket_paces_after_burst():
+    """Test that reservations beyond the burst are spaced at the rate"""
+    bucket = TokenBucket(rate=10.0, burst=2.0)
+    now = bucket.updated_at
+
+    waits = [bucket.reserve(now) for _ in range(4)]
+
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2] == pytest.approx(0.1)
+    assert waits[3] == pytest.approx(0.2)
+
+def test_throttling_backs_off_and_recovers():
+    """Test multiplicative decrease on 429 and additive recovery on success"""
+    limiter = make_limiter(recovery_step=2.0)
+
+    limiter.on_throttled("sender", retry_after=5)
+    stats = limiter.stats()["senders"]["sender"]
+    assert stats["rate"] == 5.0
+    assert stats["paused_for"] > 4
+
+    limiter.on_success("sender")
+    limiter.on_success("sender")
+    limiter.on_success("sender")
+    assert limiter.stats()["senders"]["sender"]["rate"] == 10.0
+
+def test_sender_overrides_set_tier_rate():
+    """Test per phone_number_id rate configuration"""
+    limiter = make_limiter(sender_rates={"big": 250.0})
+
+    assert limiter.max_rate("big") == 250.0
+    assert limiter.max_rate("other") == 10.0
+
+@pytest.mark.asyncio
+async def test_recipient_limit_refuses_long_waits():
+    """Test that a saturated recipient fails fast instead of queueing"""
+    limiter = make_limiter(recipient_rate=0.01, recipient_burst=1.0, max_wait=1.0)
+
+    await limiter.acquire("sender", "+1234567890")
+    with pytest.raises(WhatsAppAPIException) as exc_info:
+        await limiter.acquire("sender", "+1234567890")
+
+    assert exc_info.value.api_status_code == 429
+    # Other recipients are unaffected
+    await limiter.acquire("sender", "+1234567891")
+
+@pytest.mark.asyncio
+async def test_service_reports_retry_after_to_limiter():
+    """Test that a 429 from the Graph API slows the sender down"""
+    def handler(request):
+        return httpx.Response(429, headers={"Retry-After": "2"}, json={"error": {"code": 130429}})
+
+    limiter = make_limiter()
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    service = WhatsAppService(client=client, rate_limiter=limiter)
+
+    with pytest.raises(WhatsAppAPIException) as exc_info:
+        await service._post_message("+1234567890", DEFAULT_TEXT_MESSAGE.render("+1234567890"))
+
+    assert exc_info.value.retry_after == 2.0
+    stats = service.rate_limit_stats()
+    assert stats["throttled_count"] == 1
+    assert stats["senders"][service.phone_number_id]["rate"] == 5.0
+    await client.aclose()
@@ -0,0 +1,73 @@
+import time
+import orjson
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from app.models import MessageLog
+from app.services.log_maintenance import LogMaintenance
+from app.services.message_queue import claim_pending_messages, release_expired_leases
+from app.services.message_scheduler import release_scheduled_messages
+from app.services.response_cache import ResponseCache, _etag_matches, response_cache
+
+def test_entries_expire_and_are_evicted_oldest_first():
+    """Test TTL expiry and the entry limit"""
+    cache = ResponseCache(ttl=5, max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.put(key, {"key": key}, {}, cache.generation)
+    assert cache.get("a") is None
+    assert orjson.loads(cache.get("b").body) == {"key": "b"}
+    assert cache.get("c", now=time.monotonic() + 10) is None
+    assert len(cache) == 1
+
+def test_response_built_during_a_write_is_not_stored():
+    """Test that an invalidation while a response is built keeps it out of the cache"""
+    cache = ResponseCache(ttl=5)
+    generation = cache.generation
+    cache.invalidate()
+    entry = cache.put("logs", [1, 2], {"X-Next-Cursor": "abc"}, generation)
+    assert entry.body == b"[1,2]"
+    assert cache.get("logs") is None
+
+    cache.put("logs", [1, 2], {}, cache.generation)
+    cache.invalidate()
+    assert cache.get("logs") is None
+
+def test_etag_matching():
+    """Test If-None-Match lists, weak tags and wildcards"""
+    etag = ResponseCache(ttl=5).put("logs", [], {}, 0).etag
+    assert _etag_matches(etag, etag)
+    assert _etag_matches(f'"other", W/{etag}', etag)
+    assert _etag_matches("*", etag)
+    assert not _etag_matches(None, etag)
+    assert not _etag_matches('"other"', etag)
+
+@pytest.mark.asyncio
+async def test_queue_scheduler_and_maintenance_writes_invalidate(async_session_factory):
+    """Test that every writer of statuses or rollup rows empties the cache, idle polls do not"""
+    async with async_session_factory() as db:
+        generation = response_cache.generation
+        assert await claim_pending_messages(db, 10) == []
+        assert await release_expired_leases(db) == 0
+        assert response_cache.generation == generation
+
+        scheduled = MessageLog(phone_number="+1234567890", message="hi", status="scheduled", scheduled_at=datetime.utcnow())
+        db.add_all([scheduled, MessageLog(phone_number="+1234567891", message="hi", status="pending")])
+        await db.commit()
+
+        generation = response_cache.generation
+        assert await release_scheduled_messages(db, [scheduled.id]) == 1
+        assert response_cache.generation > generation
+
+        generation = response_cache.generation
+        assert len(await claim_pending_messages(db, 10)) == 2
+        assert response_cache.generation > generation
+
+        await db.execute(update(MessageLog).values(locked_until=datetime.utcnow() - timedelta(seconds=1)))
+        await db.commit()
+        generation = response_cache.generation
+        assert await release_expired_leases(db) == 2
+        assert response_cache.generation > generation
+
+    generation = response_cache.generation
+    assert await LogMaintenance(async_session_factory.kw["bind"]).run_once()
+    assert response_cache.generation > generation
@@ -0,0 +1,120 @@
+import pytest
+import httpx
+from datetime import datetime
+from unittest.mock import patch
+from sqlalchemy import select
+from app.exceptions import WhatsAppAPIException, DuplicateRequestException
+from app.models import MessageLog
+from app.services.retry import RetryPolicy, is_retryable_response, is_retryable_request_error
+from app.services.whatsapp_service import WhatsAppService
+from app.services.message_queue import MessageWorkerPool
+
+def make_service(handler, **policy):
+    options = dict(max_attempts=3, base_delay=0.0, max_delay=0.0, inline_attempts=3, inline_max_delay=1.0)
+    options.update(policy)
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return WhatsAppService(client=client, rate_limiter=None, retry_policy=RetryPolicy(**options))
+
+def test_error_classification():
+    """Test which failures are treated as transient"""
+    assert is_retryable_response(503)
+    assert is_retryable_response(429)
+    assert is_retryable_response(400, error_code=131056)
+    assert not is_retryable_response(400, error_code=100)
+    assert is_retryable_request_error(httpx.ConnectTimeout("timeout"))
+    assert is_retryable_request_error(httpx.ReadError("connection reset"))
+    assert not is_retryable_request_error(httpx.UnsupportedProtocol("bad url"))
+
+def test_backoff_grows_exponentially_and_honours_retry_after():
+    """Test the backoff schedule without jitter"""
+    policy = RetryPolicy(max_attempts=5, base_delay=1.0, max_delay=5.0, jitter=False)
+
+    assert [policy.backoff(n) for n in range(1, 5)] == [1.0, 2.0, 4.0, 5.0]
+    assert policy.backoff(1, WhatsAppAPIException(retry_after=30.0)) == 30.0
+
+    jittered = RetryPolicy(max_attempts=5, base_delay=1.0, max_delay=5.0)
+    assert all(0 <= jittered.backoff(3) <= 4.0 for _ in range(20))
+
+@pytest.mark.asyncio
+async def test_transient_failure_is_retried_inline(async_db):
+    """Test that a 503 followed by success ends up sent with two attempts"""
+    responses = iter([
+        httpx.Response(503, text="Service Unavailable"),
+        httpx.Response(200, json={"messages": [{"id": "wamid.retry"}]})
+    ])
+    service = make_service(lambda request: next(responses))
+
+    result = await service.send_message(async_db, "+1234567890")
+
+    assert result["messages"][0]["id"] == "wamid.retry"
+    log = (await async_db.scalars(select(MessageLog))).one()
+    assert log.status == "sent"
+    assert log.attempts == 2
+
+@pytest.mark.asyncio
+async def test_permanent_failure_is_not_retried(async_db):
+    """Test that a 400 fails after a single attempt"""
+    calls = []
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(400, json={"error": {"code": 100}})
+    service = make_service(handler)
+
+    with pytest.raises(WhatsAppAPIException):
+        await service.send_message(async_db, "+1234567890")
+
+    assert len(calls) == 1
+    log = (await async_db.scalars(select(MessageLog))).one()
+    assert (log.status, log.attempts) == ("failed", 1)
+
+@pytest.mark.asyncio
+async def test_idempotency_key_prevents_double_send(async_db):
+    """Test that a retried request replays the recorded response"""
+    calls = []
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={"messages": [{"id": "wamid.once"}]})
+    service = make_service(handler)
+
+    first = await service.send_message(async_db, "+1234567890", idempotency_key="req-1")
+    second = await service.send_message(async_db, "+1234567890", idempotency_key="req-1")
+
+    assert first == second
+    assert len(calls) == 1
+    assert len((await async_db.scalars(select(MessageLog))).all()) == 1
+
+@pytest.mark.asyncio
+async def test_idempotency_key_in_progress_conflicts(async_db):
+    """Test that a duplicate of an in-flight request is rejected"""
+    service = make_service(lambda request: httpx.Response(200, json={}))
+    await service.enqueue_messages(async_db, ["+1234567890"], idempotency_key="req-2")
+
+    with pytest.raises(DuplicateRequestException):
+        await service.send_message(async_db, "+1234567890", idempotency_key="req-2:+1234567890")
+
+    # Enqueueing again returns the original log
+    assert await service.enqueue_messages(async_db, ["+1234567890"], idempotency_key="req-2") == [1]
+
+@pytest.mark.asyncio
+async def test_queued_failure_is_rescheduled_then_failed(async_session_factory):
+    """Test that queued messages back off and give up after max attempts"""
+    service = make_service(lambda request: httpx.Response(500, text="boom"), max_attempts=2, base_delay=60.0, max_delay=60.0)
+    pool = MessageWorkerPool(service, async_session_factory, workers=1, batch_size=10)
+    async with async_session_factory() as db:
+        await service.enqueue_messages(db, ["+1234567890"])
+
+    assert await pool.run_once() == 1
+    async with async_session_factory() as db:
+        log = (await db.scalars(select(MessageLog))).one()
+    assert (log.status, log.attempts) == ("pending", 1)
+    assert log.next_attempt_at > datetime.utcnow()
+
+    # Not claimable until the backoff has elapsed
+    assert await pool.run_once() == 0
+    with patch("app.services.message_queue.datetime") as mock_datetime:
+        mock_datetime.utcnow.return_value = log.next_attempt_at
+        assert await pool.run_once() == 1
+
+    async with async_session_factory() as db:
+        log = (await db.scalars(select(MessageLog))).one()
+    assert (log.status, log.attempts) == ("failed", 2)
@@ -1,14 +1,28 @@
 import pytest
+import hmac
+import hashlib
+import json
+from datetime import datetime, timedelta
 from fastapi.testclient import TestClient
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.main import app
+from app.config import settings
+from app.dependencies import get_async_db_session, get_whatsapp_service, get_status_ingestor
+from app.models import MessageLog
+from app.schemas import MessageLogSchema
+from app.services.message_stats import MessageStats
+from app.services.message_templates import DEFAULT_TEXT_MESSAGE, MessageTemplate, template_registry
+from app.services.status_ingest import StatusIngestor
+from app.services.suppression import SuppressionList
+from app.services.whatsapp_service import WhatsAppService
 
 client = TestClient(app)
 
 @pytest.fixture
 def mock_db_session():
     """Mock database session for testing"""
-    mock = MagicMock()
+    mock = MagicMock(spec=AsyncSession)
     return mock
 
 @pytest.fixture
@@ -16,12 +30,16 @@ def mock_whatsapp_service():
     """Mock WhatsApp service for testing"""
     with patch("app.routes.whatsapp.WhatsAppService") as mock:
         mock_instance = mock.return_value
-        mock_instance.send_message.return_value = {
+        mock_instance.send_message = AsyncMock(return_value={
             "messaging_product": "whatsapp",
             "contacts": [{"input": "+1234567890", "wa_id": "1234567890"}],
             "messages": [{"id": "wamid.test123"}]
-        }
+        })
+        mock_instance.should_spill_over.return_value = False
+        mock_instance.suppression = SuppressionList()
+        app.dependency_overrides[get_whatsapp_service] = lambda: mock_instance
         yield mock_instance
+        app.dependency_overrides.pop(get_whatsapp_service, None)
 
 def test_root_endpoint():
     """Test the root endpoint"""
@@ -33,25 +51,278 @@ def test_root_endpoint():
 @pytest.mark.asyncio
 async def test_send_message_success(mock_db_session, mock_whatsapp_service):
     """Test successful message sending"""
-    with patch("app.routes.whatsapp.get_db", return_value=mock_db_session):
-        with patch("app.routes.whatsapp.get_whatsapp_service", return_value=mock_whatsapp_service):
-            response = client.get("/api/v1/whatsapp/send_message?phone_number=+1234567890")
-            
-            assert response.status_code == 200
-            assert response.json()["success"] is True
-            assert "Message sent successfully" in response.json()["message"]
-            assert response.json()["message_id"] == "wamid.test123"
+    app.dependency_overrides[get_async_db_session] = lambda: mock_db_session
+    try:
+        response = client.get("/api/v1/whatsapp/send_message", params={"phone_number": "+14155552671"})
+
+        assert response.status_code == 200
+        assert response.json()["success"] is True
+        assert "Message sent successfully" in response.json()["message"]
+        assert response.json()["message_id"] == "wamid.test123"
+    finally:
+        app.dependency_overrides.pop(get_async_db_session, None)
 
 @pytest.mark.asyncio
 async def test_send_message_invalid_phone(mock_db_session, mock_whatsapp_service):
     """Test sending message with invalid phone number"""
-    with patch("app.routes.whatsapp.get_db", return_value=mock_db_session):
-        with patch("app.routes.whatsapp.get_whatsapp_service", return_value=mock_whatsapp_service):
-            with patch("app.routes.whatsapp.MessageRequest") as mock_request:
-                mock_request.return_value.phone_number = "invalid"
-                mock_request.return_value.validate_phone_number.side_effect = ValueError("Invalid phone number")
-                
-                response = client.get("/api/v1/whatsapp/send_message?phone_number=invalid")
-                
-                assert response.status_code == 400
-                assert response.json()["success"] is False
\ No newline at end of file
+    app.dependency_overrides[get_async_db_session] = lambda: mock_db_session
+    try:
+        response = client.get("/api/v1/whatsapp/send_message?phone_number=invalid")
+
+        assert response.status_code == 400
+        assert response.json()["success"] is False
+        mock_whatsapp_service.send_message.assert_not_called()
+    finally:
+        app.dependency_overrides.pop(get_async_db_session, None)
+
+def test_send_bulk_validates_and_deduplicates(mock_db_session, mock_whatsapp_service):
+    """Test bulk sending reports invalid numbers and sends duplicates once"""
+    mock_whatsapp_service.send_bulk = AsyncMock(return_value=[
+        {"phone_number": "+14155552671", "success": True, "log_id": 1, "message_id": "wamid.test123", "error": None}
+    ])
+    app.dependency_overrides[get_async_db_session] = lambda: mock_db_session
+    try:
+        response = client.post(
+            "/api/v1/whatsapp/send_bulk",
+            json={"phone_numbers": ["+14155552671", "+1 415 555 2671", "invalid"]}
+        )
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["total"] == 2
+        assert body["sent"] == 1
+        assert body["failed"] == 1
+        assert body["results"][1]["phone_number"] == "invalid"
+        mock_whatsapp_service.send_bulk.assert_awaited_once_with(
+            mock_db_session, ["+14155552671"], None, DEFAULT_TEXT_MESSAGE
+        )
+    finally:
+        app.dependency_overrides.pop(get_async_db_session, None)
+
+def test_send_bulk_scheduled(mock_db_session, mock_whatsapp_service):
+    """Test that a scheduled bulk send is stored for later and acknowledged with 202"""
+    mock_whatsapp_service.enqueue_messages = AsyncMock(return_value=[1, 2])
+    app.dependency_overrides[get_async_db_session] = lambda: mock_db_session
+    try:
+        response = client.post(
+            "/api/v1/whatsapp/send_bulk",
+            json={
+                "phone_numbers": ["+14155552671", "+14155552672"],
+                "scheduled_at": "2024-01-01T09:00:00-05:00",
+                "send_until": "2024-01-01T11:00:00-05:00"
+            }
+        )
+
+        assert response.status_code == 202
+        assert response.json()["queued"] == 2
+        mock_whatsapp_service.enqueue_messages.assert_awaited_once_with(
+            mock_db_session, ["+14155552671", "+14155552672"], None, DEFAULT_TEXT_MESSAGE,
+            datetime(2024, 1, 1, 14), datetime(2024, 1, 1, 16)
+        )
+        mock_whatsapp_service.send_bulk.assert_not_called()
+    finally:
+        app.dependency_overrides.pop(get_async_db_session, None)
+
+def test_send_bulk_skips_suppressed(mock_db_session, mock_whatsapp_service):
+    """Test that suppressed recipients are reported and not handed to the service"""
+    mock_whatsapp_service.suppression.learn("+14155552672", "opt_out")
+    mock_whatsapp_service.send_bulk = AsyncMock(return_value=[
+        {"phone_number": "+14155552671", "success": True, "log_id": 1, "message_id": "wamid.test123", "error": None}
+    ])
+    app.dependency_overrides[get_async_db_session] = lambda: mock_db_session
+    try:
+        response = client.post(
+            "/api/v1/whatsapp/send_bulk",
+            json={"phone_numbers": ["+14155552671", "+14155552672"]}
+        )
+
+        assert response.status_code == 200
+        assert response.json()["results"][1] == {
+            "phone_number": "+14155552672", "success": False, "log_id": None,
+            "message_id": None, "error": "Recipient is suppressed"
+        }
+        mock_whatsapp_service.send_bulk.assert_awaited_once_with(
+            mock_db_session, ["+14155552671"], None, DEFAULT_TEXT_MESSAGE
+        )
+    finally:
+        app.dependency_overrides.pop(get_async_db_session, None)
+
+def test_send_template_message(mock_db_session, mock_whatsapp_service):
+    """Test that a template message is compiled and handed to the service"""
+    template_registry.register(MessageTemplate("order_update", body_parameters=2))
+    app.dependency_overrides[get_async_db_session] = lambda: mock_db_session
+    try:
+        response = client.post(
+            "/api/v1/whatsapp/send_message",
+            json={
+                "phone_number": "+14155552671",
+                "message": {"type": "template", "template": "order_update", "parameters": ["Ann", "#42"]}
+            }
+        )
+
+        assert response.status_code == 200
+        message = mock_whatsapp_service.send_message.await_args.args[3]
+        assert json.loads(message.render("+14155552671"))["template"]["components"][0]["parameters"][1] == {
+            "type": "text", "text": "#42"
+        }
+
+        response = client.post(
+            "/api/v1/whatsapp/send_message",
+            json={"phone_number": "+14155552671", "message": {"type": "template", "template": "missing"}}
+        )
+        assert response.status_code == 400
+        assert "Unknown message template" in response.json()["message"]
+    finally:
+        app.dependency_overrides.pop(get_async_db_session, None)
+
+@pytest.mark.asyncio
+async def test_logs_keyset_pagination_and_filters(async_session_factory, client_with_async_db):
+    """Test cursor paging over (created_at, id) with filters"""
+    base = datetime(2024, 1, 1, 12, 0, 0)
+    async with async_session_factory() as db:
+        for i in range(5):
+            db.add(MessageLog(
+                phone_number="+14155552671" if i % 2 else "+14155552672",
+                message="hi",
+                status="sent" if i < 4 else "failed",
+                # Two rows share a timestamp so the id tie-breaker matters
+                created_at=base + timedelta(minutes=min(i, 3)),
+                updated_at=base
+            ))
+        await db.commit()
+
+    seen = []
+    params = {"limit": 2}
+    while True:
+        response = await client_with_async_db.get("/api/v1/whatsapp/logs", params=params)
+        assert response.status_code == 200
+        seen.extend(log["id"] for log in response.json())
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["X-Next-Cursor"]
+    assert seen == [5, 4, 3, 2, 1]
+
+    response = await client_with_async_db.get(
+        "/api/v1/whatsapp/logs", params={"status": "sent", "phone_number": "+14155552671"}
+    )
+    assert [log["id"] for log in response.json()] == [4, 2]
+
+    response = await client_with_async_db.get("/api/v1/whatsapp/logs", params={"created_after": "2024-01-01T12:02:00"})
+    assert [log["id"] for log in response.json()] == [5, 4, 3]
+
+    response = await client_with_async_db.get("/api/v1/whatsapp/logs", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_logs_are_cached_until_the_service_writes(async_session_factory, client_with_async_db):
+    """Test that log pages are served from the cache with ETags until a log is written"""
+    async with async_session_factory() as db:
+        log = MessageLog(phone_number="+14155552671", message="hi", status="sent", created_at=datetime(2024, 1, 1, 12))
+        db.add(log)
+        await db.commit()
+
+    response = await client_with_async_db.get("/api/v1/whatsapp/logs")
+    assert response.json() == [MessageLogSchema.model_validate(log).model_dump(mode="json")]
+    etag = response.headers["ETag"]
+
+    # Written behind the service's back: still served from the cache
+    async with async_session_factory() as db:
+        db.add(MessageLog(phone_number="+14155552672", message="hi", status="sent"))
+        await db.commit()
+    response = await client_with_async_db.get("/api/v1/whatsapp/logs", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+    async with async_session_factory() as db:
+        await WhatsAppService(stats=MessageStats()).enqueue_messages(db, ["+14155552673"])
+    response = await client_with_async_db.get("/api/v1/whatsapp/logs", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert [log["phone_number"] for log in response.json()] == ["+14155552673", "+14155552672", "+14155552671"]
+
+def test_cached_endpoints_document_their_models():
+    """Test that the cached read endpoints still publish their response schema"""
+    paths = app.openapi()["paths"]
+    for path, model in [("/api/v1/whatsapp/logs", "MessageLogSchema"), ("/api/v1/whatsapp/stats/hourly", "HourlyStatsSchema")]:
+        responses = paths[path]["get"]["responses"]
+        assert responses["200"]["content"]["application/json"]["schema"]["items"]["$ref"].endswith(model)
+        assert "ETag" in responses["200"]["headers"]
+        assert "304" in responses
+
+@pytest.mark.asyncio
+async def test_export_logs_streams_ndjson_and_csv(async_session_factory, client_with_async_db):
+    """Test streaming export in both formats with filters"""
+    async with async_session_factory() as db:
+        for i in range(3):
+            db.add(MessageLog(phone_number="+14155552671", message="hi", status="sent" if i else "failed"))
+        await db.commit()
+
+    response = await client_with_async_db.get("/api/v1/whatsapp/logs/export", params={"status": "sent"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["id"] for row in rows] == [2, 3]
+    assert rows[0]["status"] == "sent"
+
+    response = await client_with_async_db.get("/api/v1/whatsapp/logs/export", params={"format": "csv"})
+    lines = response.text.splitlines()
+    assert lines[0].startswith("id,phone_number,message,status")
+    assert len(lines) == 4
+
+def test_webhook_verification(monkeypatch):
+    """Test the subscription handshake"""
+    monkeypatch.setattr(settings, "whatsapp_webhook_verify_token", "verify-me")
+    params = {"hub.mode": "subscribe", "hub.verify_token": "verify-me", "hub.challenge": "1158201444"}
+
+    response = client.get("/api/v1/whatsapp/webhook", params=params)
+    assert response.status_code == 200
+    assert response.text == "1158201444"
+
+    response = client.get("/api/v1/whatsapp/webhook", params={**params, "hub.verify_token": "wrong"})
+    assert response.status_code == 403
+
+def test_webhook_requires_valid_signature(monkeypatch):
+    """Test that signed status notifications are buffered and others rejected"""
+    monkeypatch.setattr(settings, "whatsapp_app_secret", "app-secret")
+    ingestor = StatusIngestor(MagicMock())
+    app.dependency_overrides[get_status_ingestor] = lambda: ingestor
+    body = json.dumps({"entry": [{"changes": [{"value": {"statuses": [{"id": "wamid.1", "status": "read"}]}}]}]}).encode()
+    signature = "sha256=" + hmac.new(b"app-secret", body, hashlib.sha256).hexdigest()
+    try:
+        response = client.post(
+            "/api/v1/whatsapp/webhook", content=body, headers={"X-Hub-Signature-256": "sha256=bad"}
+        )
+        assert response.status_code == 403
+
+        response = client.post(
+            "/api/v1/whatsapp/webhook", content=body, headers={"X-Hub-Signature-256": signature}
+        )
+        assert response.status_code == 200
+        assert ingestor.stats()["buffered"] == 1
+    finally:
+        app.dependency_overrides.pop(get_status_ingestor, None)
+
+@pytest.mark.asyncio
+async def test_get_message_by_wamid(async_session_factory, client_with_async_db):
+    """Test the lookup of a log by its WhatsApp message ID"""
+    async with async_session_factory() as db:
+        db.add(MessageLog(phone_number="+14155552671", message="hi", status="delivered", wa_message_id="wamid.abc"))
+        await db.commit()
+
+    response = await client_with_async_db.get("/api/v1/whatsapp/messages/wamid.abc")
+    assert response.status_code == 200
+    assert response.json()["status"] == "delivered"
+    assert response.json()["wa_message_id"] == "wamid.abc"
+
+    response = await client_with_async_db.get("/api/v1/whatsapp/messages/wamid.missing")
+    assert response.status_code == 404
+
+
+def test_metrics_endpoint():
+    """Test that /metrics serves the Prometheus exposition format"""
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "whatsapp_send_stage_seconds_bucket" in response.text
+    assert "whatsapp_queue_depth" in response.text
+    assert 'whatsapp_phone_cache{value="hits"}' in response.text
\ No newline at end of file
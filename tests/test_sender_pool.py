@@ -0,0 +1,90 @@
+import httpx
+from types import SimpleNamespace
+import json
+import pytest
+from collections import Counter
+from app.exceptions import CircuitOpenException
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.retry import RetryPolicy
+from app.services.sender_pool import Sender, SenderPool
+from app.services.whatsapp_service import WhatsAppService
+
+def make_pool(policy, weights=(1.0, 1.0, 1.0), **breaker_options):
+    senders = [
+        Sender("https://graph.test", f"sender{i}", "token", weight, CircuitBreaker(**breaker_options))
+        for i, weight in enumerate(weights)
+    ]
+    return SenderPool(senders, policy=policy)
+
+def test_sticky_routing_only_moves_recipients_of_open_circuits():
+    """Test that recipients keep their sender unless its circuit opens"""
+    pool = make_pool("sticky", failure_threshold=1, open_seconds=60)
+    recipients = [f"+1415555{i:04d}" for i in range(300)]
+    before = {phone: pool.choose(phone) for phone in recipients}
+
+    assert all(pool.choose(phone) is sender for phone, sender in before.items())
+    assert len(set(before.values())) == 3
+
+    tripped = pool.senders[0]
+    pool.on_failure(tripped)
+    after = {phone: pool.choose(phone) for phone in recipients}
+    assert tripped not in after.values()
+    assert all(after[phone] is before[phone] for phone in recipients if before[phone] is not tripped)
+
+def test_weighted_round_robin_follows_weights():
+    """Test that weighted routing splits traffic by weight"""
+    pool = make_pool("weighted", weights=(3.0, 1.0))
+    picks = Counter(pool.choose("+14155550000").phone_number_id for _ in range(400))
+    assert picks == {"sender0": 300, "sender1": 100}
+
+def test_least_loaded_prefers_idle_senders():
+    """Test that least-loaded routing avoids busy senders"""
+    pool = make_pool("least_loaded")
+    pool.senders[0].in_flight = 5
+    pool.senders[1].in_flight = 1
+    assert pool.choose("+14155550000") is pool.senders[2]
+
+def test_open_circuits_are_skipped_and_all_open_fails_fast(monkeypatch):
+    """Test routing around an open circuit, failing fast when all are open and recovery"""
+    now = [1000.0]
+    monkeypatch.setattr("app.services.circuit_breaker.time", SimpleNamespace(monotonic=lambda: now[0]))
+    pool = make_pool("least_loaded", weights=(1.0, 1.0), failure_threshold=2, open_seconds=30)
+
+    pool.on_failure(pool.senders[0])
+    assert pool.stats()["senders"]["sender0"]["circuit"]["state"] == "closed"
+    pool.on_failure(pool.senders[0])
+    assert pool.stats()["senders"]["sender0"]["circuit"]["state"] == "open"
+    assert pool.choose("+14155550000") is pool.senders[1]
+
+    pool.on_failure(pool.senders[1])
+    pool.on_failure(pool.senders[1])
+    assert not pool.accepting()
+    with pytest.raises(CircuitOpenException) as exc_info:
+        pool.choose("+14155550000")
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.retry_after == 30
+
+    now[0] += 31
+    assert pool.choose("+14155550000").breaker.state == "half_open"
+    pool.on_rejected(pool.senders[0])
+    assert pool.stats()["senders"]["sender0"]["circuit"]["state"] == "closed"
+
+@pytest.mark.asyncio
+async def test_service_routes_sends_and_opens_failing_sender_circuit(async_db):
+    """Test that sends go through each sender's endpoint and a failing sender's circuit opens"""
+    def handler(request):
+        if "/sender0/" in request.url.path:
+            return httpx.Response(503, text="Unavailable")
+        return httpx.Response(200, json={"messages": [{"id": f"wamid.{json.loads(request.content)['to']}"}]})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    pool = make_pool("weighted", weights=(1.0, 1.0), failure_threshold=2, open_seconds=60)
+    retry_policy = RetryPolicy(max_attempts=1, base_delay=0.0, max_delay=0.0)
+    service = WhatsAppService(client=client, rate_limiter=None, retry_policy=retry_policy, senders=pool)
+
+    results = await service.send_bulk(async_db, [f"+1415555{i:04d}" for i in range(6)])
+
+    assert [r["success"] for r in results].count(False) == 2
+    assert service.sender_stats()["senders"]["sender0"]["circuit"]["state"] == "open"
+    assert service.sender_stats()["senders"]["sender1"]["sent"] == 4
+    await client.aclose()
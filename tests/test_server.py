@@ -0,0 +1,48 @@
+import os
+import subprocess
+import sys
+from unittest.mock import patch
+from app import server
+from app.config import settings, worker_pool_limits
+
+def test_worker_pool_limits_split_the_connection_budget(monkeypatch):
+    """Test that each worker gets its share of DB_MAX_CONNECTIONS"""
+    monkeypatch.setattr(settings, "db_pool_size", 10)
+    monkeypatch.setattr(settings, "db_max_overflow", 20)
+    monkeypatch.setattr(settings, "db_max_connections", None)
+    assert worker_pool_limits() == (10, 20)
+
+    monkeypatch.setattr(settings, "db_max_connections", 100)
+    monkeypatch.setattr(settings, "web_concurrency", 8)
+    assert worker_pool_limits() == (10, 2)
+    monkeypatch.setattr(settings, "web_concurrency", 32)
+    assert worker_pool_limits() == (3, 0)
+
+def test_server_initializes_schema_once_before_workers(monkeypatch):
+    """Test that the schema is set up in the parent and skipped by the workers"""
+    monkeypatch.setattr(sys, "argv", ["app.server", "--workers", "3"])
+    monkeypatch.setattr(settings, "schema_init", True)
+    monkeypatch.setattr(settings, "debug", False)
+    monkeypatch.setenv("SCHEMA_INIT", "true")
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    calls = []
+    with patch.object(server, "init_schema_once", lambda: calls.append("schema")), \
+            patch("uvicorn.run", lambda *args, **kwargs: calls.append((args, kwargs))):
+        server.main()
+
+    assert calls[0] == "schema"
+    (app_path,), options = calls[1]
+    assert app_path == "app.main:app"
+    assert options["workers"] == 3
+    assert "reload" not in options
+    assert os.environ["SCHEMA_INIT"] == "false"
+    assert os.environ["WEB_CONCURRENCY"] == "3"
+
+def test_importing_the_app_defers_drivers_and_phonenumbers():
+    """Test that importing the app loads neither database drivers nor phonenumbers"""
+    code = (
+        "import sys, app.main; "
+        "print(sorted(m for m in ('phonenumbers', 'asyncpg', 'aiosqlite', 'psycopg2') if m in sys.modules))"
+    )
+    output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+    assert output.strip() == "[]"
@@ -1,8 +1,12 @@
 import pytest
 import httpx
-from unittest.mock import patch, MagicMock
+import json
+from unittest.mock import patch, MagicMock, AsyncMock
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.services.whatsapp_service import WhatsAppService
 from app.exceptions import WhatsAppAPIException, ConfigurationException
+from app.models import MessageLog
 
 @pytest.fixture
 def mock_settings():
@@ -14,14 +18,14 @@ def mock_settings():
 
 @pytest.fixture
 def mock_httpx_client():
-    with patch("httpx.AsyncClient") as mock:
-        mock_instance = MagicMock()
-        mock.return_value.__aenter__.return_value = mock_instance
-        yield mock_instance
+    mock_instance = MagicMock()
+    mock_instance.is_closed = False
+    mock_instance.post = AsyncMock()
+    yield mock_instance
 
 @pytest.fixture
-def whatsapp_service(mock_settings):
-    return WhatsAppService()
+def whatsapp_service(mock_settings, mock_httpx_client):
+    return WhatsAppService(client=mock_httpx_client)
 
 @pytest.mark.asyncio
 async def test_send_message_success(whatsapp_service, mock_httpx_client):
@@ -37,7 +41,7 @@ async def test_send_message_success(whatsapp_service, mock_httpx_client):
     mock_httpx_client.post.return_value = mock_response
     
     # Mock the database
-    mock_db = MagicMock()
+    mock_db = MagicMock(spec=AsyncSession)
     
     # Call the method
     result = await whatsapp_service.send_message(mock_db, "+1234567890")
@@ -62,7 +66,7 @@ async def test_send_message_api_error(whatsapp_service, mock_httpx_client):
     mock_httpx_client.post.return_value = mock_response
     
     # Mock the database
-    mock_db = MagicMock()
+    mock_db = MagicMock(spec=AsyncSession)
     
     # Call the method and expect exception
     with pytest.raises(WhatsAppAPIException) as exc_info:
@@ -81,7 +85,7 @@ async def test_send_message_network_error(whatsapp_service, mock_httpx_client):
     mock_httpx_client.post.side_effect = httpx.RequestError("Connection error", request=MagicMock())
     
     # Mock the database
-    mock_db = MagicMock()
+    mock_db = MagicMock(spec=AsyncSession)
     
     # Call the method and expect exception
     with pytest.raises(WhatsAppAPIException) as exc_info:
@@ -105,4 +109,89 @@ def test_missing_configuration():
         with pytest.raises(ConfigurationException) as exc_info:
             WhatsAppService()
         
-        assert "WhatsApp API credentials not configured" in str(exc_info.value)
\ No newline at end of file
+        assert "WhatsApp API credentials not configured" in str(exc_info.value)
+
+@pytest.mark.asyncio
+async def test_shared_client_is_reused(whatsapp_service, mock_httpx_client):
+    """Test that consecutive sends go through the same pooled client"""
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_response.json.return_value = {"messages": [{"id": "wamid.test123"}]}
+    mock_httpx_client.post.return_value = mock_response
+
+    mock_db = MagicMock(spec=AsyncSession)
+    await whatsapp_service.send_message(mock_db, "+1234567890")
+    await whatsapp_service.send_message(mock_db, "+1234567890")
+
+    assert mock_httpx_client.post.await_count == 2
+    assert whatsapp_service.client is mock_httpx_client
+
+    # An injected client belongs to the app and is not closed by the service
+    await whatsapp_service.aclose()
+    mock_httpx_client.aclose.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_pool_stats_reports_limits(mock_settings):
+    """Test pool statistics of a lazily created client"""
+    mock_settings.http_max_connections = 10
+    mock_settings.http_max_keepalive_connections = 5
+    service = WhatsAppService()
+    with patch("app.services.http_client.settings", mock_settings):
+        mock_settings.http_timeout = 30.0
+        mock_settings.http_connect_timeout = 5.0
+        mock_settings.http_pool_timeout = 10.0
+        mock_settings.http_keepalive_expiry = 30.0
+        mock_settings.http2_enabled = False
+
+        client = service.client
+        stats = service.pool_stats()
+
+    assert stats["connections"] == 0
+    assert stats["max_connections"] == 10
+    assert stats["closed"] is False
+
+    await service.aclose()
+    assert client.is_closed
+@pytest.mark.asyncio
+async def test_send_message_writes_log_with_async_session(whatsapp_service, mock_httpx_client, async_db):
+    """Test that the message log is written through the async session"""
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_response.json.return_value = {"messages": [{"id": "wamid.test123"}]}
+    mock_httpx_client.post.return_value = mock_response
+
+    await whatsapp_service.send_message(async_db, "+1234567890")
+
+    result = await async_db.execute(select(MessageLog))
+    logs = result.scalars().all()
+    assert len(logs) == 1
+    assert logs[0].status == "sent"
+    assert "wamid.test123" in logs[0].response_data
+
+@pytest.mark.asyncio
+async def test_send_bulk_batches_logs_and_reports_per_recipient(mock_settings, async_db):
+    """Test bulk sending with batched log writes and mixed outcomes"""
+    mock_settings.bulk_concurrency = 2
+    mock_settings.bulk_db_batch_size = 2
+
+    def handler(request):
+        recipient = json.loads(request.content)["to"]
+        if recipient == "+1234567891":
+            return httpx.Response(400, text="Bad Request")
+        return httpx.Response(200, json={"messages": [{"id": f"wamid.{recipient}"}]})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    service = WhatsAppService(client=client)
+    recipients = ["+1234567890", "+1234567891", "+1234567892"]
+
+    results = await service.send_bulk(async_db, recipients)
+
+    assert [r["phone_number"] for r in results] == recipients
+    assert [r["success"] for r in results] == [True, False, True]
+    assert results[0]["message_id"] == "wamid.+1234567890"
+    assert "400" in results[1]["error"]
+
+    logs = (await async_db.execute(select(MessageLog).order_by(MessageLog.id))).scalars().all()
+    assert [log.status for log in logs] == ["sent", "failed", "sent"]
+    assert [log.id for log in logs] == [r["log_id"] for r in results]
+    await client.aclose()
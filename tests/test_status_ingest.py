@@ -0,0 +1,116 @@
+import itertools
+import pytest
+from sqlalchemy import select
+from app.models import MessageLog
+from app.services.log_writer import LogWriter
+from app.services.status_ingest import StatusEvent, StatusIngestor, parse_status_events
+
+def webhook_payload(*statuses):
+    return {
+        "object": "whatsapp_business_account",
+        "entry": [{"id": "1", "changes": [{"field": "messages", "value": {"statuses": list(statuses)}}]}]
+    }
+
+def test_parse_status_events():
+    """Test extraction of tracked statuses and their errors"""
+    payload = webhook_payload(
+        {"id": "wamid.1", "status": "delivered"},
+        {"id": "wamid.2", "status": "failed", "errors": [{"code": 131026, "title": "Message undeliverable"}]},
+        {"id": "wamid.3", "status": "deleted"}
+    )
+
+    assert parse_status_events(payload) == [
+        StatusEvent("wamid.1", "delivered"),
+        StatusEvent("wamid.2", "failed", "Webhook Error: 131026 - Message undeliverable")
+    ]
+
+@pytest.mark.asyncio
+async def test_flush_updates_logs_in_batches(async_session_factory):
+    """Test that buffered events are collapsed, batched and only move forward"""
+    async with async_session_factory() as db:
+        for i, status in enumerate(["sent", "sent", "read", "sent"]):
+            db.add(MessageLog(
+                phone_number=f"+123456789{i}",
+                message="hi",
+                status=status,
+                wa_message_id=f"wamid.{i}"
+            ))
+        await db.commit()
+
+    ingestor = StatusIngestor(async_session_factory, batch_size=2)
+    ingestor.add([
+        StatusEvent("wamid.0", "read"),
+        StatusEvent("wamid.0", "delivered"),  # arrives late, must not win
+        StatusEvent("wamid.1", "delivered"),
+        StatusEvent("wamid.2", "delivered"),  # already read
+        StatusEvent("wamid.3", "failed", "Webhook Error: 131026 - Message undeliverable"),
+        StatusEvent("wamid.unknown", "read")
+    ])
+    assert ingestor.stats()["buffered"] == 5
+
+    assert await ingestor.flush() == 3
+    assert ingestor.stats() == {"buffered": 0, "unmatched": 1, "received": 6, "updated": 3, "dropped": 0}
+
+    async with async_session_factory() as db:
+        logs = (await db.scalars(select(MessageLog).order_by(MessageLog.id))).all()
+    assert [log.status for log in logs] == ["read", "delivered", "read", "failed"]
+    assert logs[3].error_message == "Webhook Error: 131026 - Message undeliverable"
+
+@pytest.mark.asyncio
+async def test_stop_flushes_buffered_events(async_session_factory):
+    """Test that shutdown writes events still in the buffer"""
+    async with async_session_factory() as db:
+        db.add(MessageLog(
+            phone_number="+1234567890", message="hi", status="sent", wa_message_id="wamid.stop"
+        ))
+        await db.commit()
+
+    ingestor = StatusIngestor(async_session_factory, flush_interval=60)
+    ingestor.start()
+    ingestor.add([StatusEvent("wamid.stop", "delivered")])
+    await ingestor.stop()
+
+    async with async_session_factory() as db:
+        assert (await db.scalar(select(MessageLog.status))) == "delivered"
+
+@pytest.mark.asyncio
+async def test_unmatched_events_are_retried_until_the_window_ends(async_session_factory):
+    """Test that a status arriving before its log is applied once the log exists"""
+    ingestor = StatusIngestor(async_session_factory, retry_window=60)
+    ingestor.add([StatusEvent("wamid.late", "delivered")])
+    assert await ingestor.flush() == 0
+    assert ingestor.stats()["unmatched"] == 1
+
+    async with async_session_factory() as db:
+        db.add(MessageLog(phone_number="+1234567890", message="hi", status="sent", wa_message_id="wamid.late"))
+        await db.commit()
+    ingestor.add([StatusEvent("wamid.late", "read")])
+    assert await ingestor.flush() == 1
+    assert ingestor.stats()["unmatched"] == 0
+    async with async_session_factory() as db:
+        assert (await db.scalar(select(MessageLog.status))) == "read"
+
+    ingestor.retry_window = 0
+    ingestor.add([StatusEvent("wamid.never", "read")])
+    assert await ingestor.flush() == 0
+    assert ingestor.stats()["unmatched"] == 0
+    assert ingestor.stats()["dropped"] == 1
+
+@pytest.mark.asyncio
+async def test_write_behind_logs_are_flushed_before_statuses(async_session_factory):
+    """Test that a status for a log still buffered in the log writer is not lost"""
+    counter = itertools.count(1000)
+
+    async def id_source(size):
+        return [next(counter) for _ in range(size)]
+
+    log_writer = LogWriter(async_session_factory, flush_interval=60, id_source=id_source)
+    log_id = await log_writer.create(phone_number="+1234567890", message="hi", status="sent", wa_message_id="wamid.wb")
+
+    ingestor = StatusIngestor(async_session_factory, log_writer=log_writer)
+    ingestor.add([StatusEvent("wamid.wb", "delivered")])
+    assert await ingestor.flush() == 1
+    assert log_writer.pending == 0
+
+    async with async_session_factory() as db:
+        assert (await db.get(MessageLog, log_id)).status == "delivered"
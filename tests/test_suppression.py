@@ -0,0 +1,103 @@
+import pytest
+import httpx
+import json
+from sqlalchemy import select
+from app.exceptions import SuppressedRecipientException
+from app.models import MessageLog, SuppressedNumber
+from app.services.message_queue import MessageWorkerPool
+from app.services.message_stats import MessageStats
+from app.services.suppression import SuppressionList
+from app.services.whatsapp_service import WhatsAppService
+
+@pytest.fixture
+def graph_api_requests():
+    """Recipients seen by the fake Graph API"""
+    return []
+
+@pytest.fixture
+def suppression():
+    return SuppressionList()
+
+@pytest.fixture
+def whatsapp_service(graph_api_requests, suppression):
+    def handler(request):
+        recipient = json.loads(request.content)["to"]
+        graph_api_requests.append(recipient)
+        if recipient.endswith("99"):
+            return httpx.Response(400, json={"error": {"message": "Message undeliverable", "code": 131026}})
+        return httpx.Response(200, json={"messages": [{"id": f"wamid.{recipient}"}]})
+
+    return WhatsAppService(
+        client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        stats=MessageStats(),
+        suppression=suppression
+    )
+
+@pytest.mark.asyncio
+async def test_suppressions_sync_between_processes(async_session_factory, suppression):
+    """Test that additions and lifts reach another process's list on refresh"""
+    other = SuppressionList()
+    async with async_session_factory() as db:
+        await suppression.add(db, ["+14155552671", "+14155552672"])
+        assert suppression.contains("+14155552671")
+        assert suppression.partition(["+14155552673", "+14155552672"]) == (["+14155552673"], ["+14155552672"])
+
+        assert await other.refresh(db) == 2
+        assert other.contains("+14155552672")
+
+        assert await suppression.remove(db, ["+14155552672"]) == 1
+        assert not suppression.contains("+14155552672")
+        assert await suppression.remove(db, ["+14155552672"]) == 0
+
+        await other.refresh(db)
+        assert not other.contains("+14155552672")
+        assert other.contains("+14155552671")
+        assert len(other) == 1
+
+@pytest.mark.asyncio
+async def test_suppressed_recipient_is_not_sent(async_session_factory, whatsapp_service, suppression, graph_api_requests):
+    """Test that a suppressed recipient fails before any I/O"""
+    async with async_session_factory() as db:
+        await suppression.add(db, ["+14155552671"])
+        with pytest.raises(SuppressedRecipientException):
+            await whatsapp_service.send_message(db, "+14155552671")
+
+        logs = (await db.scalars(select(MessageLog))).all()
+    assert logs == []
+    assert graph_api_requests == []
+
+@pytest.mark.asyncio
+async def test_queued_message_to_suppressed_recipient_fails(async_session_factory, whatsapp_service, suppression, graph_api_requests):
+    """Test that a recipient suppressed after enqueueing is skipped by the workers"""
+    async with async_session_factory() as db:
+        await whatsapp_service.enqueue_messages(db, ["+14155552671", "+14155552672"])
+        await suppression.add(db, ["+14155552671"])
+
+    pool = MessageWorkerPool(whatsapp_service, async_session_factory, workers=1, batch_size=10)
+    assert await pool.run_once() == 2
+
+    async with async_session_factory() as db:
+        logs = (await db.scalars(select(MessageLog).order_by(MessageLog.id))).all()
+    assert [log.status for log in logs] == ["failed", "sent"]
+    assert "suppressed" in logs[0].error_message
+    assert logs[0].attempts == 0
+    assert graph_api_requests == ["+14155552672"]
+
+@pytest.mark.asyncio
+async def test_undeliverable_recipient_is_learned(async_session_factory, whatsapp_service, suppression, graph_api_requests):
+    """Test that an undeliverable number is suppressed and saved on refresh"""
+    async with async_session_factory() as db:
+        results = await whatsapp_service.send_bulk(db, ["+14155552699", "+14155552671"])
+        assert [result["success"] for result in results] == [False, True]
+        assert suppression.contains("+14155552699")
+        assert suppression.unsaved == 1
+
+        await suppression.refresh(db)
+        saved = (await db.scalars(select(SuppressedNumber))).all()
+    assert [(row.phone_number, row.reason, row.active) for row in saved] == [("+14155552699", "invalid", True)]
+    assert suppression.unsaved == 0
+
+    async with async_session_factory() as db:
+        results = await whatsapp_service.send_bulk(db, ["+14155552699"])
+    assert results[0]["success"] is False
+    assert graph_api_requests.count("+14155552699") == 1
@@ -0,0 +1,55 @@
+import pytest
+from app.exceptions import InvalidPhoneNumberException
+from app.utils import (
+    PhoneNumberCache, phone_number_cache, validate_phone_number, normalize_phone_numbers,
+    encode_cursor, decode_cursor
+)
+from datetime import datetime
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    phone_number_cache.clear()
+    yield
+    phone_number_cache.clear()
+
+def test_validate_phone_number_is_memoized():
+    """Test that repeated lookups hit the cache"""
+    assert validate_phone_number("+1 (415) 555-2671") == "+14155552671"
+    assert validate_phone_number("+1 (415) 555-2671") == "+14155552671"
+
+    stats = phone_number_cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+
+def test_invalid_numbers_are_cached():
+    """Test that rejections are cached and re-raised"""
+    for _ in range(2):
+        with pytest.raises(InvalidPhoneNumberException) as exc_info:
+            validate_phone_number("12345")
+        assert "not valid" in exc_info.value.detail
+
+    assert phone_number_cache.stats()["hits"] == 1
+
+def test_cache_is_bounded():
+    """Test least recently used eviction"""
+    cache = PhoneNumberCache(maxsize=2)
+    cache.put("a", (True, "+1"))
+    cache.put("b", (True, "+2"))
+    cache.get("a")
+    cache.put("c", (True, "+3"))
+
+    assert cache.get("b") is None
+    assert cache.get("a") == (True, "+1")
+
+def test_normalize_phone_numbers_deduplicates():
+    """Test batch normalization with raw and normalized duplicates"""
+    valid, invalid = normalize_phone_numbers(
+        ["+14155552671", "+1 415 555 2671", "bad", "+14155552672", "bad"]
+    )
+
+    assert valid == ["+14155552671", "+14155552672"]
+    assert list(invalid) == ["bad"]
+
+def test_cursor_round_trip():
+    """Test that page cursors decode to the encoded sort key"""
+    created_at = datetime(2024, 1, 1, 12, 30, 15, 123456)
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)